@@ -0,0 +1,235 @@
+# Copyright 2019 CNRS - Airbus SAS
+# Author: Joseph Mirabel
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+## Calibration of the gains and thresholds of the tasks.
+#
+# The gains and thresholds of the tasks are class attributes, tuned for the
+# worst case. This module proposes values for each type of transition, from
+# the convergence of the task errors recorded during executions.
+#
+# Usage:
+# 1. set the parameter \c recordCalibration of factory.Factory to True.
+#    The errors of the tasks are traced and an index of the traces is
+#    written in \c /tmp/calibration-index.json.
+# 2. run the typical transitions.
+# 3. compute and save the proposed values:
+#    \code{.py}
+#    from agimus_sot.calibration import Calibration
+#    calib = Calibration ()
+#    calib.recordIndex ("/tmp/calibration-index.json", segments)
+#    calib.save ("calibration.json", calib.propose())
+#    \endcode
+#    where \c segments is a list of (start, end) SoT times during which a
+#    transition was executed.
+# 4. set the parameter \c calibrationFile of factory.Factory to the saved file.
+#
+# The file is a dictionnary:
+# - key: a type of transition (\c "grasp", \c "pregrasp", \c "preplace",
+#   \c "gripper_open", \c "gripper_close") or \c "supervisor",
+# - value: a dictionnary of attribute names and values set on the tasks of
+#   this type (or the supervisor).
+#
+# For \c "supervisor", the norm of the control is recorded instead of a task
+# error and the threshold \c controlNormThreshold of the done events is
+# proposed.
+
+import json
+import numpy as np
+
+## Description of the calibrated attributes of each type of transition:
+# (name of the gain attribute or None, indices of the gains in it, name of
+# the threshold attribute or None).
+_attributes = {
+        "grasp"        : ("gainParameters", (0, 1, 3), None),
+        "pregrasp"     : ("gainParameters", (0, 1)   , None),
+        "preplace"     : ("gainParameters", (0, 1)   , None),
+        "gripper_open" : ("positionGain"  , (0, 1)   , "thr_task_error"),
+        "gripper_close": ("positionGain"  , (0, 1)   , "thr_task_error"),
+        "supervisor"   : (None            , ()       , "controlNormThreshold"),
+        }
+
+## Names of the calibrated attributes of a type of transition.
+# \return a tuple (name of the gain attribute or None, indices of the
+#         calibrated gains in it, name of the threshold attribute or None).
+def calibratedAttributes (type):
+    try:
+        return _attributes[type]
+    except KeyError:
+        raise ValueError ("Unknown type of transition " + type)
+
+## Load a calibration file.
+# \return a dictionnary, see the module documentation.
+def load (filename):
+    with open(filename, 'r') as f:
+        values = json.load (f)
+    return { str(type): { str(k): tuple(v) if isinstance(v, list) else v
+        for k, v in attrs.iteritems() } for type, attrs in values.iteritems() }
+
+## Read the error norms from a file written by a tracer.
+# \param start, end SoT times. If not None, only the errors in [start, end]
+#        are returned.
+def readTracerFile (filename, start = None, end = None):
+    data = np.atleast_2d (np.loadtxt (filename))
+    t = data[:,0]
+    keep = np.ones (len(t), dtype=bool)
+    if start is not None: keep &= (t >= start)
+    if end   is not None: keep &= (t <= end)
+    return np.linalg.norm (data[keep,1:], axis=1)
+
+## Read the times and the values of a file written by a tracer.
+def _readTrace (filename):
+    data = np.atleast_2d (np.loadtxt (filename))
+    return data[:,0].astype(int), data[:,1]
+
+## Iterations between the convergence of the tasks of a solver and its done
+## event.
+# \param done file of trace "done" written when the parameter
+#        addTracerToConvergence of factory.Factory is True.
+# \param sinces files of the traces "<task>.since" of the tasks of the
+#        solver.
+# \return a list of (time, latency) for each time at which trace "done"
+#         becomes 1 while all the tasks are below the threshold. latency
+#         is this time minus the largest since.
+def doneLatencies (done, sinces):
+    times, values = _readTrace (done)
+    values = values > 0.5
+    rises = np.nonzero (values & ~np.concatenate (([False], values[:-1])))[0]
+    sinces = [ dict (zip (*_readTrace (f))) for f in sinces ]
+    latencies = []
+    for t in times[rises]:
+        s = [ since.get (t, -1) for since in sinces ]
+        if len(s) > 0 and min(s) >= 0:
+            latencies.append ((int(t), int(t - max(s))))
+    return latencies
+
+## Records convergence profiles and proposes gains and thresholds.
+class Calibration(object):
+    ## Factor applied to the gains when the errors overshoot.
+    decreaseFactor = 0.8
+    ## Factor applied to the gains when the errors decrease as fast as the
+    ## gain at zero error commands.
+    increaseFactor = 1.25
+    ## Margin between the residual errors and the proposed threshold.
+    thresholdMargin = 2.
+
+    def __init__ (self):
+        ## Profiles of each type of transition. A profile is a tuple
+        # (errors, period, attributes) where attributes are the values of
+        # the calibrated attributes during the recording.
+        self.profiles = dict()
+
+    ## Record the convergence of a task.
+    # \param type a type of transition, see the module documentation.
+    # \param errors the norms of the task error, at each iteration.
+    # \param period the duration of an iteration, in seconds.
+    # \param attributes the values of the calibrated attributes.
+    def record (self, type, errors, period, attributes):
+        calibratedAttributes (type)
+        self.profiles.setdefault (type, []).append (
+                (np.asarray(errors, dtype=float), period, dict(attributes)))
+
+    ## Record the traces of an index written by the factory.
+    # \param segments list of (start, end) SoT times.
+    def recordIndex (self, indexFile, segments):
+        import os
+        with open(indexFile, 'r') as f:
+            index = json.load (f)
+        directory = os.path.dirname (indexFile)
+        for trace in index["traces"]:
+            filename = os.path.join (directory, trace["file"])
+            if not os.path.exists (filename): continue
+            for start, end in segments:
+                errors = readTracerFile (filename, start, end)
+                if len(errors) > 1:
+                    self.record (str(trace["type"]), errors, index["period"],
+                            trace["attributes"])
+
+    ## Propose values for the calibrated attributes.
+    # \return a dictionnary which can be saved with Calibration.save.
+    #
+    # The threshold is the largest residual error, times thresholdMargin.
+    # The gains are decreased when an error overshoots and increased when
+    # the errors decrease as fast as the gain at zero error commands,
+    # which means the task is not limited by other tasks.
+    #
+    # The first gain parameter is the gain at zero error, in 1/s, both for
+    # GainAdaptive (grasp) and SafeGainAdaptive (the others). It is compared
+    # with the convergence rate of the smallest errors (see _rate). The
+    # second one is not: it is a gain in 1/s for GainAdaptive but a
+    # velocity for SafeGainAdaptive.
+    def propose (self):
+        values = dict()
+        for type, profiles in self.profiles.iteritems():
+            gainName, indices, thrName = calibratedAttributes (type)
+            residuals, overshoot, follows = [], False, True
+            for errors, period, attributes in profiles:
+                residual = np.median (errors[-max(1, len(errors) // 10):])
+                residuals.append (residual)
+                overshoot |= self._overshoots (errors, residual)
+                rate = self._rate (errors, residual, period)
+                gains = attributes.get(gainName) if gainName is not None else None
+                if rate is None or gains is None or rate < 0.8 * gains[0]:
+                    follows = False
+            value = dict()
+            gains = profiles[-1][2].get(gainName) if gainName is not None else None
+            if gains is not None:
+                factor = self.decreaseFactor if overshoot else \
+                        (self.increaseFactor if follows else 1.)
+                value[gainName] = tuple(g * factor if i in indices else g
+                        for i, g in enumerate(gains))
+            if thrName is not None:
+                value[thrName] = float(self.thresholdMargin * max(residuals))
+            values[type] = value
+        return values
+
+    ## Save a dictionnary of values, as returned by Calibration.propose.
+    def save (self, filename, values):
+        with open(filename, 'w') as f:
+            json.dump (values, f, indent=2, sort_keys=True)
+
+    ## Whether the error increases significantly after having decreased.
+    @staticmethod
+    def _overshoots (errors, residual):
+        minimum = np.minimum.accumulate (errors)
+        return bool (np.any ((errors > 1.2 * minimum) & (minimum > 2 * residual)))
+
+    ## Exponential convergence rate of the errors, in 1/s, during the last
+    ## decade before they reach ten times the residual error.
+    #
+    # At these errors, the gain is close to its value at zero error.
+    # \return the rate or None if there are less than two errors in this
+    #         decade.
+    @staticmethod
+    def _rate (errors, residual, period):
+        above = np.nonzero (errors > 10 * residual)[0]
+        if len(above) == 0: return None
+        end = above[-1] + 1
+        start = end
+        while start > 0 and errors[start-1] <= 100 * residual: start -= 1
+        if end - start < 2: return None
+        t = period * np.arange (start, end)
+        slope = np.polyfit (t, np.log(np.maximum(errors[start:end], 1e-12)), 1)[0]
+        return -slope
@@ -41,6 +41,7 @@ class Controller:
             self.function = IntegratorEulerVectorMatrix (name + "_H")
         for n in nums  : self.function.pushNumCoef   (n)
         for n in denoms: self.function.pushDenomCoef (n)
+        self.nums, self.denoms = tuple(nums), tuple(denoms)
 
         self.function.sin.value = initialValue
         self.function.initialize()
@@ -55,6 +56,19 @@ class Controller:
             self.ref_m_meas.setCoeff2(-1)
             plug(self.ref_m_meas.sout, self.function.sin)
 
+    def setCoefficients (self, nums, denoms):
+        """
+        Replace the coefficients of the transfer function.
+        The number of coefficients must not change. The state of the
+        integrator is kept.
+        """
+        assert len(nums) == len(self.nums) and len(denoms) == len(self.denoms)
+        for _ in self.nums  : self.function.popNumCoef ()
+        for _ in self.denoms: self.function.popDenomCoef ()
+        for n in nums  : self.function.pushNumCoef   (n)
+        for n in denoms: self.function.pushDenomCoef (n)
+        self.nums, self.denoms = tuple(nums), tuple(denoms)
+
     @property
     def hasFeedback (self):
         return self.ref_m_meas is not None
@@ -122,9 +136,15 @@ def secondOrderClosedLoop (name, wn, z, period, initialValue):
     - wm: corner frequency
     - z : damping
     """
-    from math import sqrt
-    nums =   ( wn**2 ,)
-    denoms = ( 0, 2*z*wn, 1. )
+    nums, denoms = secondOrderClosedLoopCoefficients (wn, z)
     control = Controller (name, nums, denoms, period, initialValue)
     control.addFeedback()
     return control
+
+def secondOrderClosedLoopCoefficients (wn, z):
+    """
+    Coefficients of the controller created by secondOrderClosedLoop.
+    """
+    nums =   ( wn**2 ,)
+    denoms = ( 0, 2*z*wn, 1. )
+    return nums, denoms
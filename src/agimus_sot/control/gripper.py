@@ -25,6 +25,8 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 from dynamic_graph import plug
+from agimus_sot.tools import modelIndex
+from agimus_sot.parameters import store
 
 class AdmittanceControl(object):
     """
@@ -54,7 +56,15 @@ class AdmittanceControl(object):
         from agimus_sot.control.controllers import Controller
         self.torque_controller = Controller (self.name + "_torque", nums, denoms, self.dt, [0. for _ in self.est_theta_closed])
         self.torque_controller.addFeedback()
-        self.torque_controller.reference.value = self.desired_torque
+        reference = self.torque_controller.reference
+        def setReference (v): reference.value = v
+        store.bind (self.name + "_desired_torque", tuple(self.desired_torque),
+                setReference)
+        controller = self.torque_controller
+        store.bind (self.name + "_nums", controller.nums,
+                lambda v: controller.setCoefficients (v, controller.denoms))
+        store.bind (self.name + "_denoms", controller.denoms,
+                lambda v: controller.setCoefficients (controller.nums, v))
 
     ### Internal method
     def _makeIntegrationOfVelocity (self):
@@ -121,12 +131,8 @@ class AdmittanceControl(object):
         # Input formattting
         from dynamic_graph.sot.core.operator import Selec_of_vector
         self. _joint_selec = Selec_of_vector (self.name + "_joint_selec")
-        model = robot.dynamic.model
-        for jn in jointNames:
-            jid = model.getJointId (jn)
-            assert jid < len(model.joints)
-            jmodel = model.joints[jid]
-            self. _joint_selec.addSelec (jmodel.idx_v,jmodel.idx_v + jmodel.nv)
+        for idx_v, nv in modelIndex(robot.dynamic.model).velocityRanges(jointNames):
+            self. _joint_selec.addSelec (idx_v,idx_v + nv)
         plug (robot.dynamic.position, self. _joint_selec.sin)
         self.setCurrentPositionIn(self._joint_selec.sout)
 
@@ -136,14 +142,10 @@ class AdmittanceControl(object):
         # Input formattting
         from dynamic_graph.sot.core.operator import Selec_of_vector
         self._current_selec = Selec_of_vector (self.name + "_current_selec")
-        model = robot.dynamic.model
-        for jn in jointNames:
-            jid = model.getJointId (jn)
-            assert jid < len(model.joints)
-            jmodel = model.joints[jid]
+        for idx_v, nv in modelIndex(robot.dynamic.model).velocityRanges(jointNames):
             # TODO there is no value for the 6 first DoF
-            assert jmodel.idx_v >= 6
-            self._current_selec.addSelec (jmodel.idx_v-6,jmodel.idx_v-6 + jmodel.nv)
+            assert idx_v >= 6
+            self._current_selec.addSelec (idx_v-6,idx_v-6 + nv)
 
         from dynamic_graph.sot.core.operator import Multiply_of_vector
         plug (robot.device.currents, self._current_selec.sin)
@@ -165,14 +167,10 @@ class AdmittanceControl(object):
         # Input formattting
         from dynamic_graph.sot.core.operator import Selec_of_vector
         self._torque_selec = Selec_of_vector (self.name + "_torque_selec")
-        model = robot.dynamic.model
-        for jn in jointNames:
-            jid = model.getJointId (jn)
-            assert jid < len(model.joints)
-            jmodel = model.joints[jid]
+        for idx_v, nv in modelIndex(robot.dynamic.model).velocityRanges(jointNames):
             # TODO there is no value for the 6 first DoF
-            assert jmodel.idx_v >= 6
-            self._torque_selec.addSelec (jmodel.idx_v-6,jmodel.idx_v-6 + jmodel.nv)
+            assert idx_v >= 6
+            self._torque_selec.addSelec (idx_v-6,idx_v-6 + nv)
         plug (robot.device.ptorques, self._torque_selec.sin)
 
         plug (self._torque_selec.sout, self.currentTorqueIn)
@@ -183,11 +181,8 @@ class AdmittanceControl(object):
         i = mix_of_vector.getSignalNumber()
         mix_of_vector.setSignalNumber(i+1)
         plug (self.outputVelocity, mix_of_vector.signal("sin"+str(i)))
-        model = robot.dynamic.model
-        for jn in jointNames:
-            jid = model.getJointId (jn)
-            jmodel = model.joints[jid]
-            mix_of_vector.addSelec(i, jmodel.idx_v, jmodel.nv)
+        for idx_v, nv in modelIndex(robot.dynamic.model).velocityRanges(jointNames):
+            mix_of_vector.addSelec(i, idx_v, nv)
 
     def addTracerRealTime (self, robot):
         from dynamic_graph.tracer_real_time import TracerRealTime
@@ -275,9 +270,18 @@ class PositionAndAdmittanceControl(AdmittanceControl):
         * z = 1: t = - log(0.05) / wn
         * z < 1: t = - log(0.05 * sqrt(1-z**2)) / (z * wn),
         """
-        from agimus_sot.control.controllers import secondOrderClosedLoop
+        from agimus_sot.control.controllers import secondOrderClosedLoop, \
+                secondOrderClosedLoopCoefficients
         self.position_controller = secondOrderClosedLoop (self.name + "_position", wn, z, self.dt, [0. for _ in self.est_theta_closed])
-        self.position_controller.reference.value = self.est_theta_closed
+        reference = self.position_controller.reference
+        def setReference (v): reference.value = v
+        store.bind (self.name + "_theta_closed", tuple(self.est_theta_closed),
+                setReference)
+        controller = self.position_controller
+        def setGains (v):
+            controller.setCoefficients (*secondOrderClosedLoopCoefficients (*v))
+        # Parameter (wn, z)
+        store.bind (self.name + "_position_gains", (wn, z), setGains)
 
     ### Setup switch between the two control scheme
     def _makeControllerSwich (self):
@@ -33,18 +33,53 @@ from dynamic_graph import plug
 # TODO This should be removed when dynamic-graph-python
 # provides the automatic convertion from expression to cascade of
 # entities.
-def logical_and_entity(name, inputs):
-    from dynamic_graph.sot.core.operator import And
-    a = And(name)
-    a.setSignalNumber (len(inputs))
-    for i,sig in enumerate(inputs): plug(sig, a.signal("sin"+str(i)))
+def _logical_entity (operator, neutral, name, inputs, expressions):
+    signals = dict()
+    for sig in inputs:
+        if isinstance(sig, (bool, int)):
+            # A neutral input is removed and an absorbing one gives the result.
+            if bool(sig) != neutral: return not neutral
+        else:
+            signals[sig.name] = sig
+    if len(signals) == 0: return neutral
+    if len(signals) == 1: return signals.values()[0]
+    key = (operator.__name__, tuple(sorted(signals.keys())))
+    if expressions is not None and expressions.has_key(key):
+        return expressions[key].sout
+    a = operator(name)
+    a.setSignalNumber (len(key[1]))
+    for i,n in enumerate(key[1]): plug(signals[n], a.signal("sin"+str(i)))
+    if expressions is not None: expressions[key] = a
     return a.sout
-def logical_or_entity (name, inputs):
+
+## Signal which is the conjunction of the inputs.
+# \param name name of the And entity, if one must be created.
+# \param inputs boolean signals or bool values.
+# \param expressions dictionnary of the entities already created, or None.
+#        - key: (operator name, sorted tuple of the names of the input signals),
+#        - value: the entity.
+# \return a signal or a bool.
+#
+# Constant inputs are folded and duplicated inputs are removed.
+# If \c expressions contains an entity computing the same expression, its
+# output is returned, whatever the name of this entity is.
+# \sa Factory._expressions
+def logical_and_entity(name, inputs, expressions = None):
+    from dynamic_graph.sot.core.operator import And
+    return _logical_entity (And, True, name, inputs, expressions)
+## Signal which is the disjunction of the inputs.
+# \sa logical_and_entity
+def logical_or_entity (name, inputs, expressions = None):
     from dynamic_graph.sot.core.operator import Or
-    a = Or(name)
-    a.setSignalNumber (len(inputs))
-    for i,sig in enumerate(inputs): plug(sig, a.signal("sin"+str(i)))
-    return a.sout
+    return _logical_entity (Or, False, name, inputs, expressions)
+## Signal which is True when \c input has been True during the last
+## \c duration iterations.
+def sustained_condition (name, input, duration):
+    from agimus_sot.sot import SustainedCondition
+    s = SustainedCondition (name)
+    s.setDuration (duration)
+    plug (input, s.condition)
+    return s.sout
 def norm_superior_to (name, input, thr):
     from dynamic_graph.sot.core.operator import Norm_of_vector, CompareDouble
     norm = Norm_of_vector (name + "_norm")
@@ -64,14 +99,44 @@ def norm_inferior_to (name, input, thr):
     comparison.sin2.value = thr
     return norm, comparison
 
+## Events triggered by the selected condition.
+#
+# The condition is only evaluated while the events are armed.
+# The check of the event is registered once in the robot device. While the
+# events are disarmed, it reads a constant False instead of the condition.
+#
+# The conditions of the solvers are inputs of a SwitchBoolean, which only
+# pulls the selected one. The cost of an iteration does not depend on the
+# number of solvers, so they are not gathered in a vector.
+# \sa arm, disarm
 class Events:
     def __init__ (self, name, robot):
         self.name = name
+        self.robot = robot
 
         # Setup entity that triggers the event.
+        # The switch only pulls the selected condition.
         self.switch = SwitchBoolean (name + "_switch")
+        # The global condition triggers the event whatever the selected
+        # condition is.
+        from dynamic_graph.sot.core.operator import Or
+        self.global_or = Or (name + "_global_or")
+        self.global_or.setSignalNumber (2)
+        plug (self.switch.sout, self.global_or.sin0)
+        self.global_or.sin1.value = False
+        # The gate selects either a constant False (disarmed) or the
+        # condition (armed). Like the switch above, it only pulls the
+        # selected input.
+        self.gate = SwitchBoolean (name + "_gate")
+        self.gate.setSignalNumber (2)
+        self.gate.sin0.value = False
+        plug (self.global_or.sout, self.gate.sin1)
+        self.gate.selection.value = 0
+        self.armed = False
+        ## Input signals set to the time at which the events are armed.
+        self.armTimeSignals = []
         self.event = Event (name + "_event")
-        plug (self.switch.sout, self.event.condition)
+        plug (self.gate.sout, self.event.condition)
         robot.device.after.addSignal (name + "_event.check")
 
         self.ros_publish = RosPublish (name + '_ros_publish')
@@ -82,6 +147,33 @@ class Events:
         self.event.addSignal (name + "_ros_publish.trigger")
         self.switch_string = {}
 
+    ## Check the selected condition at each iteration of the robot device.
+    # \param time time from which the conditions are checked. If None, the
+    #        current time of the device.
+    #
+    # The signals registered with addArmTimeSignal are set to \c time.
+    def arm (self, time = None):
+        if time is None: time = self.robot.device.control.time
+        for s in self.armTimeSignals: s.value = time
+        self.gate.selection.value = 1
+        self.armed = True
+
+    ## Register an input signal of type int set to the time at which the
+    ## events are armed.
+    # Conditions counting iterations, like ConvergenceDetector, use it to
+    # not count the iterations before their solver is used.
+    def addArmTimeSignal (self, signal):
+        self.armTimeSignals.append (signal)
+
+    ## Stop checking the condition. The condition is not computed until
+    ## arm is called.
+    ##
+    ## Only the value of a signal is changed, so that the signals called
+    ## by the device are not modified while it is running.
+    def disarm (self):
+        self.gate.selection.value = 0
+        self.armed = False
+
     def getSignalNumber (self):
         return self.switch.getSignalNumber()
 
@@ -100,6 +192,9 @@ class Events:
         self.norm, self.norm_comparision = norm_inferior_to (self.name+"_control",
                 control, thr)
 
+    def setControlNormThreshold (self, thr):
+        self.norm_comparision.sin2.value = thr
+
     ## Creates entities to check whether the norm is
     ## superior to the threshold \c thr
     ##
@@ -111,6 +206,12 @@ class Events:
     def setFutureTime (self, time):
         self.time.setTime (time)
 
+    ## Input signal which triggers the event, whatever the selected
+    ## condition is. Its default value is False.
+    @property
+    def globalCondition (self):
+        return self.global_or.sin1
+
     def conditionSignal (self, i):
         return self.switch.signal("sin"+str(i))
 
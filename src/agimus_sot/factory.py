@@ -24,8 +24,9 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import numpy as np
 from hpp.corbaserver.manipulation.constraint_graph_factory import ConstraintFactoryAbstract, GraphFactoryAbstract
-from .task import Task, Grasp, PreGrasp, PreGraspPostAction, OpFrame, EndEffector
+from .task import Task, TaskStack, Grasp, PreGrasp, PreGraspPostAction, OpFrame, EndEffector
 from .solver import Solver
 
 ## Affordance between a gripper and a handle.
@@ -131,6 +132,8 @@ class TaskFactory(ConstraintFactoryAbstract):
     def __init__ (self, graphfactory):
         super(TaskFactory, self).__init__ (graphfactory)
         self._grippers = dict()
+        ## EndEffector instances, indexed by TaskFactory._gripperControlKey
+        self._gripperControls = dict()
         self._grasps = dict()
         self._placements = dict()
 
@@ -149,23 +152,50 @@ class TaskFactory(ConstraintFactoryAbstract):
         if not gripperFrame.enabled:
             self._grippers[key] = Task ()
             return self._grippers[key]
+        # Handles whose affordances lead to the same controller share it.
+        controlKey = self._gripperControlKey (type, gripper, aff)
+        if self._gripperControls.has_key (controlKey):
+            self._grippers[key] = self._gripperControls[controlKey]
+            return self._grippers[key]
         robot = gf.sotrobot
         if aff.controlType[type] == "position":
             ee = EndEffector (robot, gripperFrame, "p" + type + ("_" + handle if handle is not None else ""))
+            gf._calibrate ("gripper_" + type, ee)
             ee.makePositionControl (aff.ref["angle_"+type])
-            self._grippers[key] = ee
         elif aff.controlType[type] == "torque" or aff.controlType[type] == "position_torque":
             ee = EndEffector (robot, gripperFrame, "pt_" + type + ("_" + handle if handle is not None else ""))
+            gf._calibrate ("gripper_" + type, ee)
             ee.makeAdmittanceControl (aff, type,
                     period = gf.parameters["period"],
                     simulateTorqueFeedback = gf.parameters.get("simulateTorqueFeedback",False))
             if gf.parameters["addTracerToAdmittanceController"]:
                 tracer = ee.ac.addTracerRealTime (robot)
                 gf.tracers[tracer.name] = tracer
-            self._grippers[key] = ee
         else:
             raise NotImplementedError ("Control type " + type + " is not implemented for gripper.")
-        return self._grippers[key]
+        self._gripperControls[controlKey] = ee
+        self._grippers[key] = ee
+        return ee
+
+    ## Key identifying the controller built by _buildGripper.
+    #
+    # Only the values that _buildGripper and EndEffector use are part of
+    # the key: reference values and simulation parameters are ignored
+    # for position control.
+    @staticmethod
+    def _gripperControlKey (type, gripper, aff):
+        def freeze (v):
+            if isinstance (v, dict):
+                return tuple(sorted((k, freeze(x)) for k, x in v.iteritems()))
+            if isinstance (v, (list, tuple, np.ndarray)):
+                return tuple(freeze(x) for x in v)
+            return v
+        controlType = aff.controlType[type]
+        if controlType == "position":
+            return (type, gripper, controlType, freeze(aff.ref["angle_"+type]))
+        return (type, gripper, controlType, freeze(aff.ref),
+                freeze(aff.getControlParameter()),
+                freeze(aff.getSimulationParameters()))
 
     def buildGrasp (self, g, h, otherGrasp=None):
         gf = self.graphfactory
@@ -193,10 +223,13 @@ class TaskFactory(ConstraintFactoryAbstract):
 
         gripper_close = self._buildGripper ("close", g, h)
         pregrasp = PreGrasp (gripper, handle, otherGrasp)
+        pregrasp.measurementDelay = gf._measurementDelay()
+        gf._calibrate ("pregrasp", pregrasp)
         pregrasp.makeTasks (gf.sotrobot,
                 useMeasurementOfObjectPose,
                 useMeasurementOfGripperPose,
-                useMeasurementOfOtherGripperPose)
+                useMeasurementOfOtherGripperPose,
+                withDerivative = gf.parameters["withDerivative"])
         if gf.parameters["addTracerToVisualServoing"] and \
                 (useMeasurementOfObjectPose \
                 or useMeasurementOfGripperPose \
@@ -212,7 +245,8 @@ class TaskFactory(ConstraintFactoryAbstract):
             grasp = Task()
         else:
             grasp = Grasp (gripper, handle, otherGrasp)
-            grasp.makeTasks (gf.sotrobot)
+            gf._calibrate ("grasp", grasp)
+            grasp.makeTasks (gf.sotrobot, withDerivative = gf.parameters["withDerivative"])
         return { 'grasp': grasp,
                  'pregrasp': pregrasp,
                  'pregrasp_postaction': pregrasp_pa,
@@ -249,10 +283,13 @@ class TaskFactory(ConstraintFactoryAbstract):
 
         #                   (gripper, handle)
         preplace = PreGrasp (env    , obj   , grasp)
+        preplace.measurementDelay = gf._measurementDelay()
+        gf._calibrate ("preplace", preplace)
         preplace.makeTasks (gf.sotrobot,
                 useMeasOfObject,
                 useMeasOfEnvContact,
-                useMeasOfOtherGripper)
+                useMeasOfOtherGripper,
+                withDerivative = gf.parameters["withDerivative"])
 
         preplace_pa = PreGraspPostAction (env, grasp[0])
         preplace_pa.makeTasks (gf.sotrobot)
@@ -315,7 +352,7 @@ class TaskFactory(ConstraintFactoryAbstract):
 # from agimus_sot import Supervisor
 # from agimus_sot.factory import Factory, Affordance
 # from agimus_sot.task import Task
-# from agimus_sot.srdf_parser import parse_srdf
+# from agimus_sot.srdf_parser import parse_srdf_many
 # from hpp.corbaserver.manipulation import Rule
 #
 # # Constraint graph definition. Should be the same as the one used for planning
@@ -332,14 +369,11 @@ class TaskFactory(ConstraintFactoryAbstract):
 #           ]
 #
 # # Parse SRDF files to extract gripper and handle information.
-# srdf = {}
-# srdfTalos = parse_srdf ("srdf/talos.srdf", packageName = "talos_data", prefix="talos")
-# srdfBox   = parse_srdf ("srdf/cobblestone.srdf", packageName = "gerard_bauzil", prefix="box")
-# srdfTable = parse_srdf ("srdf/pedestal_table.srdf", packageName = "gerard_bauzil", prefix="table")
-# for w in [ "grippers", "handles" ]:
-#     srdf[w] = dict()
-#     for d in [ srdfTalos, srdfBox, srdfTable ]:
-#         srdf[w].update (d[w])
+# srdf = parse_srdf_many ([
+#     ("srdf/talos.srdf", "talos_data", "talos"),
+#     ("srdf/cobblestone.srdf", "gerard_bauzil", "box"),
+#     ("srdf/pedestal_table.srdf", "gerard_bauzil", "table"),
+#     ])
 #
 #
 # supervisor = Supervisor (robot, hpTasks = hpTasks(robot))
@@ -382,7 +416,7 @@ class Factory(GraphFactoryAbstract):
         def __init__ (self, tasks, grasps, factory):
             self.name = factory._stateName (grasps)
             self.grasps = grasps
-            self.manifold = Task()
+            self.manifold = factory.emptyManifold
 
             self.objectsAlreadyGrasped = {}
 
@@ -413,6 +447,9 @@ class Factory(GraphFactoryAbstract):
     def __init__ (self, supervisor):
         super(Factory, self).__init__ ()
         self.tasks = TaskFactory (self)
+        ## Root of the manifolds of the states.
+        # States with the same grasps share the same TaskStack.
+        self.emptyManifold = TaskStack()
         self.hpTasks = supervisor.hpTasks
         self.lpTasks = supervisor.lpTasks
         self.affordances = dict()
@@ -439,13 +476,269 @@ class Factory(GraphFactoryAbstract):
         ## - simulateTorqueFeedback: [boolean, False]
         ##                           do not use torque feedback from the robot
         ##                           but simulate it instead.
+        ## - withDerivative: [boolean, False]
+        ##                   use the velocity from HPP as feed-forward term
+        ##                   in the pregrasp, preplace and grasp tasks.
+        ## - compressHierarchy: [boolean, False]
+        ##                   merge consecutive gripper tasks, and consecutive
+        ##                   grasp tasks, of a solver into a single priority
+        ##                   level.
+        ## - reduceSearchSpace: [boolean, False]
+        ##                   remove the locked joints from the search space of
+        ##                   the solvers. See lockedJoints.
+        ## - lockedJoints: [list of joint names, []]
+        ##                   joints that the solvers must not move, in addition
+        ##                   to the joints of the disabled grippers.
+        ##                   Only used when reduceSearchSpace is True.
+        ## - visualMeasurementLatency: [double, 0.]
+        ##                   latency of the visual measurements, in seconds.
+        ##                   Measurements are propagated to the current time
+        ##                   using the robot kinematics.
+        ## - taskErrorThreshold: [double, None]
+        ##                   a solver fails when the error norm of one of its
+        ##                   tasks, except the low priority ones, is above
+        ##                   this threshold. None disables the check.
+        ## - controlNormErrorThreshold: [double, None]
+        ##                   a solver fails when the norm of its control is
+        ##                   above this threshold. None disables the check.
+        ##                   The velocity limits of the joints are not
+        ##                   checked.
+        ## - detectGraspFailure: [boolean, False]
+        ##                   a grasp fails when the gripper reaches its closed
+        ##                   position without the expected torque. Only for
+        ##                   grippers with torque control.
+        ## - errorDuration: [double, 0.01]
+        ##                   time, in seconds, during which the above
+        ##                   conditions must hold for the solver to fail.
+        ## - doneSignal: [string, "controlNorm"]
+        ##                   how the solvers detect that their tasks are
+        ##                   done, in addition to the end of the motion:
+        ##                   - "controlNorm": the norm of the control is small,
+        ##                   - "convergence": the error of each task, except
+        ##                     the low priority ones, has converged.
+        ## - convergenceThreshold: [double, 1e-3]
+        ##                   a task converges when its error norm stays below
+        ##                   this threshold during convergenceWindow.
+        ## - convergenceHysteresis: [double, 2.]
+        ##                   a converged task is not converged anymore when
+        ##                   its error norm is above convergenceHysteresis
+        ##                   times convergenceThreshold.
+        ## - convergenceWindow: [double, 0.02]
+        ##                   time, in seconds.
+        ## - addTracerToConvergence: [boolean, False]
+        ##                   trace the convergence of the tasks, in order to
+        ##                   measure the time between the convergence and the
+        ##                   done event: the time at which trace "done"
+        ##                   becomes 1 minus the largest trace "since" of the
+        ##                   tasks of the solver. See
+        ##                   calibration.doneLatencies.
+        ## - calibrationFile: [string, None]
+        ##                   file of gains and thresholds per type of
+        ##                   transition. See module calibration.
+        ## - recordCalibration: [boolean, False]
+        ##                   trace the errors of the tasks to compute a
+        ##                   calibration file. See module calibration.
         self.parameters = {
                 "addTracerToAdmittanceController": False,
                 "addTimerToSotControl": False,
                 "addTracerToSotControl": False,
                 "addTracerToVisualServoing": False,
                 "simulateTorqueFeedback": False,
+                "withDerivative": False,
+                "visualMeasurementLatency": 0.,
+                "compressHierarchy": False,
+                "reduceSearchSpace": False,
+                "lockedJoints": [],
+                "taskErrorThreshold": None,
+                "controlNormErrorThreshold": None,
+                "detectGraspFailure": False,
+                "errorDuration": 0.01,
+                "doneSignal": "controlNorm",
+                "convergenceThreshold": 1e-3,
+                "convergenceHysteresis": 2.,
+                "convergenceWindow": 0.02,
+                "addTracerToConvergence": False,
+                "calibrationFile": None,
+                "recordCalibration": False,
                 }
+        self._projector = None
+        ## Tasks merged by the solvers, when parameter compressHierarchy is True.
+        self._mergedTasks = dict()
+        ## Sustained error conditions, indexed by the name of the condition.
+        self._sustainedErrors = dict()
+        ## Convergence signal of each task, indexed by the name of the task.
+        self._taskConvergences = dict()
+        ## And and Or entities created by the factory, indexed by the
+        ## expression they compute. \sa events.logical_and_entity
+        self._expressions = dict()
+        self._defaultDoneSignal = None
+        ## Calibrated attributes, loaded from parameter calibrationFile.
+        self._calibration = None
+        ## (type of transition, task) of the calibrated tasks.
+        self._calibratedTasks = []
+
+    ## Set the calibrated attributes of a task.
+    # \param type a type of transition. See module calibration.
+    def _calibrate (self, type, task):
+        for name, value in self._calibrationValues(type).iteritems():
+            setattr (task, name, value)
+        self._calibratedTasks.append ((type, task))
+
+    ## Calibrated attributes of a type of transition.
+    def _calibrationValues (self, type):
+        if self._calibration is None:
+            filename = self.parameters["calibrationFile"]
+            if filename is None:
+                self._calibration = dict()
+            else:
+                from .calibration import load
+                self._calibration = load (filename)
+        return self._calibration.get(type, {})
+
+    ## Trace the errors of the calibrated tasks and the norm of the control,
+    ## and write the index of the traces, read by
+    ## calibration.Calibration.recordIndex.
+    def _recordCalibration (self, directory = "/tmp", prefix = "calibration-"):
+        import json, os
+        from dynamic_graph.tracer_real_time import TracerRealTime
+        from .calibration import calibratedAttributes
+        from .tools import filename_escape
+        tracer = TracerRealTime ("calibration_tracer")
+        tracer.setBufferSize (10 * 1048576)
+        tracer.open (directory, prefix, ".txt")
+        self.sotrobot.device.after.addSignal ("calibration_tracer.triger")
+        self.tracers[tracer.name] = tracer
+
+        traces, names = [], set()
+        for type, task in self._calibratedTasks:
+            gainName, indices, thrName = calibratedAttributes (type)
+            attributes = { n: getattr(task, n) for n in (gainName, thrName)
+                    if n is not None and hasattr(task, n) }
+            for t in task.tasks:
+                if t.name in names: continue
+                names.add (t.name)
+                label = filename_escape (t.name)
+                tracer.add (t.name + ".error", label)
+                traces.append ({ "type": type, "file": prefix + label + ".txt",
+                    "attributes": attributes })
+        # The residual norm of the control calibrates the threshold of the
+        # done events.
+        norm = self.supervisor.done_events.norm
+        tracer.add (norm.name + ".sout", "supervisor_control_norm")
+        traces.append ({ "type": "supervisor",
+            "file": prefix + "supervisor_control_norm.txt",
+            "attributes": { "controlNormThreshold":
+                self.supervisor.done_events.norm_comparision.sin2.value } })
+        with open(os.path.join(directory, prefix + "index.json"), 'w') as f:
+            json.dump ({ "period": self.parameters["period"], "traces": traces }, f,
+                    indent=2)
+
+    ## Latency of the visual measurements, in number of ticks.
+    def _measurementDelay (self):
+        latency = self.parameters["visualMeasurementLatency"]
+        if latency <= 0: return 0
+        return int(round(latency / self.parameters["period"]))
+
+    ## Joints that no generated task can move.
+    # These are the joints of parameter lockedJoints and of the disabled
+    # grippers.
+    def _lockedJoints (self):
+        joints = set(self.parameters["lockedJoints"])
+        for gripper in self.gripperFrames.values():
+            if gripper.controllable and not gripper.enabled:
+                joints.update (gripper.joints)
+        return joints
+
+    ## Projector onto the velocity of the joints which are not locked.
+    # It is computed once and shared by all the solvers.
+    def _searchSpaceProjector (self):
+        if self._projector is None:
+            from .tools import computeProjector
+            self._projector = computeProjector (self.sotrobot, self._lockedJoints())
+        return self._projector
+
+    ## Signal which is True when \c signal has been True during
+    ## parameter errorDuration.
+    # It is created once per name.
+    def _sustainedError (self, name, signal):
+        if not self._sustainedErrors.has_key(name):
+            from .events import sustained_condition
+            duration = int(round(self.parameters["errorDuration"] / self.parameters["period"]))
+            self._sustainedErrors[name] = sustained_condition (name,
+                    signal, max(duration, 1))
+        return self._sustainedErrors[name]
+
+    ## Bind the input signal \c signal, a threshold, to the parameter \c name
+    ## of the parameter store.
+    def _bindThreshold (self, name, value, signal):
+        from .parameters import store
+        def setThreshold (thr): signal.value = thr
+        store.bind (name, value, setThreshold)
+
+    ## Add the error conditions set by the parameters to the error signal
+    ## of a solver.
+    # Must be called once all the tasks are pushed.
+    def _setupErrorSignal (self, sot):
+        from .events import logical_or_entity, norm_superior_to
+        errors = [ sot.errorSignal, ]
+        thr = self.parameters["taskErrorThreshold"]
+        if thr is not None:
+            lpTasks = set(t.name for t in self.lpTasks.tasks)
+            for t in sot.tasks:
+                if t.name in lpTasks: continue
+                name = t.name + "_error_sustained"
+                if not self._sustainedErrors.has_key(name):
+                    n, c = norm_superior_to (t.name + "_errorcmp", t.error, thr)
+                    self._bindThreshold ("task_error_threshold", thr, c.sin1)
+                    self._sustainedError (name, c.sout)
+                errors.append (self._sustainedErrors[name])
+        thr = self.parameters["controlNormErrorThreshold"]
+        if thr is not None:
+            n, c = norm_superior_to (sot.name + "_controlnormcmp", sot.control, thr)
+            self._bindThreshold ("control_norm_error_threshold", thr, c.sin1)
+            errors.append (self._sustainedError (sot.name + "_controlnorm", c.sout))
+        sot.errorSignal = logical_or_entity ("error_" + sot.name, errors,
+                self._expressions)
+
+    ## Signal which is True when the error of \c task has converged.
+    # It is created once per task.
+    def _taskConvergedSignal (self, task):
+        if not self._taskConvergences.has_key(task.name):
+            from dynamic_graph import plug
+            from dynamic_graph.sot.core.operator import Norm_of_vector
+            from agimus_sot.sot import ConvergenceDetector
+            from .parameters import store
+            norm = Norm_of_vector (task.name + "_error_norm")
+            plug (task.error, norm.sin)
+            detector = ConvergenceDetector (task.name + "_convergence")
+            hysteresis = self.parameters["convergenceHysteresis"]
+            store.bind ("convergence_threshold", self.parameters["convergenceThreshold"],
+                    lambda thr: detector.setThresholds (thr, hysteresis * thr))
+            detector.setWindow (int(round(self.parameters["convergenceWindow"]
+                / self.parameters["period"])))
+            plug (norm.sout, detector.error)
+            # The window starts when the done events are armed, i.e. when
+            # the solver starts its motion.
+            self.supervisor.done_events.addArmTimeSignal (detector.start)
+            if self.parameters["addTracerToConvergence"]:
+                self.ConvergenceTracer.add (detector.name + ".converged", task.name + ".converged")
+                self.ConvergenceTracer.add (detector.name + ".since", task.name + ".since")
+            self._taskConvergences[task.name] = detector.converged
+        return self._taskConvergences[task.name]
+
+    ## Signal which is True when the tasks of \c sot are accomplished.
+    # Depends on parameter doneSignal.
+    # Must be called once all the tasks are pushed.
+    def _convergedSignal (self, sot):
+        if self.parameters["doneSignal"] == "convergence":
+            lpTasks = set(t.name for t in self.lpTasks.tasks)
+            tasks = [ t for t in sot.tasks if t.name not in lpTasks ]
+            if len(tasks) > 0:
+                from .events import logical_and_entity
+                return logical_and_entity ("converged_" + sot.name,
+                        [ self._taskConvergedSignal(t) for t in tasks ],
+                        self._expressions)
+        return self.supervisor.done_events.controlNormSignal
 
     def _newSoT (self, name):
         # Create a solver
@@ -453,15 +746,25 @@ class Factory(GraphFactoryAbstract):
                 self.sotrobot.dynamic.getDimension(),
                 damping = 0.001,
                 timer = self.parameters["addTimerToSotControl"],
+                compressHierarchy = self.parameters["compressHierarchy"],
+                mergedTasks = self._mergedTasks,
                 )
         # Make default event signals
         # sot. doneSignal = self.supervisor.done_events.controlNormSignal
-        from .events import logical_and_entity
-        sot. doneSignal = logical_and_entity ("ade_"+sot.name,
+        # The And entity is shared by all the solvers.
+        # It is replaced in generate, depending on parameter doneSignal.
+        if self._defaultDoneSignal is None:
+            from .events import logical_and_entity
+            self._defaultDoneSignal = logical_and_entity ("ade_default",
                 [ self.supervisor.done_events.controlNormSignal,
-                  self.supervisor.done_events.timeEllapsedSignal])
+                  self.supervisor.done_events.timeEllapsedSignal],
+                self._expressions)
+        sot. doneSignal = self._defaultDoneSignal
         sot.errorSignal = False
 
+        if self.parameters["reduceSearchSpace"]:
+            sot.setProjector (self._searchSpaceProjector())
+
         if self.parameters["addTimerToSotControl"]:
             id = len(self.SoTtracer.signals()) - 1
             self.SoTtracer.add (sot.timer.name + ".timer", "solver_"+str(id) + ".timer")
@@ -496,8 +799,22 @@ class Factory(GraphFactoryAbstract):
         if self.parameters["addTracerToVisualServoing"]:
             self.ViStracer = self.supervisor.ViStracer = addTracer (
                     "visual_servoing_tracer", "visual-servoing-trace")
+        if self.parameters["addTracerToConvergence"]:
+            self.ConvergenceTracer = self.supervisor.ConvergenceTracer = addTracer (
+                    "convergence_tracer", "convergence-trace")
+            # The output of the gate is what the done event checks. Tracing
+            # the switch would compute the condition while it is disarmed.
+            self.ConvergenceTracer.add (self.supervisor.done_events.gate.name + ".sout", "done")
         super(Factory, self).generate ()
 
+        thr = self._calibrationValues("supervisor").get("controlNormThreshold")
+        if thr is not None:
+            from .parameters import store
+            store.set ({ "supervisor_control_norm_threshold": thr })
+            store.apply ()
+        if self.parameters["recordCalibration"]:
+            self._recordCalibration ()
+
         self.supervisor.sots = {}
         self.supervisor.grasps = { (gh, w): t for gh, ts in self.tasks._grasp.items() for w, t in ts.items() }
         self.supervisor.placements = { (ogh, w): t for ogh, ts in self.tasks._placements.items() for w, t in ts.items() }
@@ -508,7 +825,15 @@ class Factory(GraphFactoryAbstract):
         self.supervisor.tracers = self.tracers
         self.supervisor.controllers = self.controllers
 
-        from dynamic_graph import plug
+        from .events import logical_and_entity
+        for sot in self.sots.values() + self.preActions.values() \
+                + [ s for d in self.postActions.values() for s in d.values() ]:
+            if sot.doneSignal is self._defaultDoneSignal:
+                sot.doneSignal = logical_and_entity ("ade_" + sot.name,
+                        [ self._convergedSignal (sot),
+                          self.supervisor.done_events.timeEllapsedSignal],
+                        self._expressions)
+            self._setupErrorSignal (sot)
         self.supervisor.sots_indexes = dict()
         for tn,sot in self.sots.iteritems():
             # Pre action
@@ -543,10 +868,6 @@ class Factory(GraphFactoryAbstract):
     def makeLoopTransition (self, state):
         n = self._loopTransitionName(state.grasps)
         sot = self._newSoT ('sot_'+n)
-        from .events import logical_and_entity
-        sot. doneSignal = logical_and_entity("ade_sot_"+n,
-                [   self.supervisor.done_events.timeEllapsedSignal,
-                    self.supervisor.done_events.controlNormSignal])
 
         self.hpTasks.pushTo(sot)
         state.manifold.pushTo(sot)
@@ -590,10 +911,6 @@ class Factory(GraphFactoryAbstract):
 
             for n in ns:
                 s = self._newSoT('sot_'+n)
-                from .events import logical_and_entity
-                s. doneSignal = logical_and_entity("ade_sot_"+n,
-                        [   self.supervisor.done_events.timeEllapsedSignal,
-                            self.supervisor.done_events.controlNormSignal ])
 
                 self.hpTasks.pushTo(s)
 
@@ -635,9 +952,15 @@ class Factory(GraphFactoryAbstract):
         sot. doneSignal = logical_and_entity ("ade_sot_"+sot.name,
                 [ self.tasks.event (self.grippers[ig], self.handles[st.grasps[ig]],
                     'done_close',
-                    self.supervisor.done_events.controlNormSignal),
-                    self.supervisor.done_events.timeEllapsedSignal])
-        #TODO add error_events "gripper_closed_failed"
+                    self._convergedSignal (sot)),
+                    self.supervisor.done_events.timeEllapsedSignal],
+                self._expressions)
+        if self.parameters["detectGraspFailure"]:
+            error = self.tasks.event (self.grippers[ig], self.handles[st.grasps[ig]],
+                    'error_close', False)
+            if not isinstance(error, bool):
+                sot.errorSignal = self._sustainedError (self.grippers[ig] + "_"
+                        + self.handles[st.grasps[ig]] + "_error_close_sustained", error)
         if not self.postActions.has_key(key):
             self.postActions[ key ] = dict()
         self.postActions[ key ] [ st.name ] = sot
@@ -678,8 +1001,9 @@ class Factory(GraphFactoryAbstract):
         sot. doneSignal = logical_and_entity ("ade_sot_"+sot.name,
                 [ self.tasks.event (self.grippers[ig], None,
                     'done_open',
-                    self.supervisor.done_events.controlNormSignal),
-                    self.supervisor.done_events.timeEllapsedSignal])
+                    self._convergedSignal (sot)),
+                    self.supervisor.done_events.timeEllapsedSignal],
+                self._expressions)
         #TODO add error_events "gripper_open_failed"
         self.preActions[ key ] = sot
 
@@ -0,0 +1,170 @@
+# Copyright 2019 CNRS - Airbus SAS
+# Author: Joseph Mirabel
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+## Named parameters of the entities, which can be changed at runtime.
+#
+# Builders bind a parameter to a function writing its value into their
+# entities. Values are staged with ParameterStore.set and written by
+# ParameterStore.apply, right after the robot device starts a new iteration.
+# They are written from the Python thread while the control loop runs, so
+# an iteration may use only part of the new values.
+#
+# \code{.py}
+# from agimus_sot.parameters import store
+# store.bind ("pregrasp_gain", (0.9, 0.1, 0.3, 1.),
+#     lambda v: gain.computeParameters(*v))
+# store.set ({ "pregrasp_gain": (1.2, 0.1, 0.3, 1.) })
+# store.apply (robot.device)
+# \endcode
+
+import numbers, threading
+
+## Shape of a number, or of nested sequences of numbers.
+# \return () for a number, (n,) + shape of the elements for a sequence of
+#         n elements of the same shape, or None otherwise.
+def _shape (value):
+    if isinstance (value, (bool, basestring)): return None
+    if isinstance (value, numbers.Real): return ()
+    try:
+        shapes = [ _shape(v) for v in value ]
+    except TypeError:
+        return None
+    if len(shapes) == 0: return (0,)
+    if None in shapes or any (s != shapes[0] for s in shapes): return None
+    return (len(shapes),) + shapes[0]
+
+def _convert (value):
+    if isinstance (value, numbers.Real): return float(value)
+    return tuple (_convert(v) for v in value)
+
+class ParameterStore(object):
+    def __init__ (self):
+        ## Current value of each parameter.
+        self._values = dict()
+        ## Shape of each parameter, see _shape.
+        self._shapes = dict()
+        ## Functions writing the value of each parameter into the entities.
+        self._setters = dict()
+        ## Staged values, written by apply.
+        self._pending = dict()
+        self._lock = threading.Lock()
+
+    ## Bind a parameter to a function.
+    # \param name name of the parameter. Several functions can be bound to
+    #        the same parameter.
+    # \param value the default value, a number or nested sequences of
+    #        numbers. If the parameter already exists, its current value is
+    #        used instead.
+    # \param setter a function writing a value into the entities.
+    # \return the value written by setter.
+    def bind (self, name, value, setter):
+        with self._lock:
+            if not self._values.has_key (name):
+                shape = _shape (value)
+                if shape is None:
+                    raise ValueError ("Parameter {} must be a number or a "
+                            "sequence of numbers: {}".format (name, value))
+                self._values[name] = value
+                self._shapes[name] = shape
+            value = self._values[name]
+            self._setters.setdefault (name, []).append (setter)
+        setter (value)
+        return value
+
+    def names (self):
+        return sorted (self._values.keys())
+
+    ## \param names list of parameter names. If None, all the parameters.
+    # \return a dictionnary of the values.
+    def get (self, names = None):
+        if names is None: names = self._values.keys()
+        return { n: self._check(n) for n in names }
+
+    ## Stage new values. They are written by apply.
+    # \param values a dictionnary of the new values.
+    # \throw ValueError if a parameter does not exist or if a value does not
+    #        have the shape of the default value of its parameter. Nothing
+    #        is staged in this case.
+    def set (self, values):
+        staged = dict()
+        for n, v in values.iteritems():
+            self._check (n)
+            if _shape (v) != self._shapes[n]:
+                raise ValueError ("Parameter {} expects a value of shape {}: {}"
+                        .format (n, self._shapes[n], v))
+            staged[n] = _convert (v)
+        with self._lock:
+            self._pending.update (staged)
+
+    ## Write the staged values.
+    # \param device if not None, wait for the beginning of a new iteration
+    #        of this device, so that the values are written early in a
+    #        period.
+    # \param timeout maximal time to wait, in seconds.
+    # \return the names of the written parameters.
+    # \throw RuntimeError if the device does not start a new iteration
+    #        within \c timeout. Nothing is written and the values remain
+    #        staged.
+    #
+    # If a setter raises an exception, the previous values are written back,
+    # the values remain staged and the exception is propagated.
+    def apply (self, device = None, timeout = 1.):
+        if device is not None:
+            from time import sleep, time
+            t = device.control.time
+            end = time() + timeout
+            while device.control.time == t:
+                if time() >= end:
+                    raise RuntimeError ("The device did not start a new iteration "
+                            "within {} s. No parameter was written.".format (timeout))
+                sleep (device.getTimeStep() / 10.)
+        with self._lock:
+            pending, self._pending = self._pending, dict()
+            previous, written = dict(), []
+            try:
+                for n, v in pending.iteritems():
+                    previous[n] = self._values[n]
+                    for setter in self._setters[n]:
+                        written.append ((setter, previous[n]))
+                        setter (v)
+                    self._values[n] = v
+            except:
+                for setter, v in reversed (written):
+                    setter (v)
+                self._values.update (previous)
+                pending.update (self._pending)
+                self._pending = pending
+                raise
+        return pending.keys()
+
+    def _check (self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            raise ValueError ("Unknown parameter " + name)
+
+## The store used by the tasks and the controllers.
+store = ParameterStore()
@@ -62,6 +62,8 @@ class RosInterface(object):
         rospy.Service('publish_state', Empty, self.publishState)
         rospy.Service('set_base_pose', SetPose, self.setBasePose)
         rospy.Service('get_joint_names', GetJointNames, self.getJointNames)
+        rospy.Service('get_parameters', RunCommand, self.getParameters)
+        rospy.Service('set_parameters', RunCommand, self.setParameters)
         wait_for_service ("/run_command")
         self._runCommand = rospy.ServiceProxy ('/run_command', RunCommand)
         self.supervisor = supervisor
@@ -265,3 +267,34 @@ class RosInterface(object):
             if len(answer.standarderror) != 0:
                 return False, answer.standarderror
         return True, ""
+
+    ## Service \c get_parameters.
+    # The input is a JSON list of parameter names, or an empty string for all
+    # of them. The result is a JSON dictionnary of the values.
+    def getParameters (self, req):
+        return self._parameterCommand ("getParameters", req.input or "null")
+
+    ## Service \c set_parameters.
+    # The input is a JSON dictionnary of the new values. The result is a JSON
+    # list of the parameters which were updated.
+    def setParameters (self, req):
+        return self._parameterCommand ("setParameters", req.input)
+
+    def _parameterCommand (self, method, input):
+        import json
+        from dynamic_graph_bridge_msgs.srv import RunCommandResponse
+        rsp = RunCommandResponse()
+        if self.supervisor is not None:
+            try:
+                res = getattr(self.supervisor, method) (json.loads(input))
+                rsp.result = json.dumps (res)
+            except Exception as e:
+                rospy.logerr(str(e))
+                rsp.standarderror = str(e)
+        else:
+            answer = self.runCommand ("__import__('json').dumps(supervisor.{}(__import__('json').loads({})))"
+                    .format(method, repr(input)))
+            rsp.standarderror = answer.standarderror
+            if len(answer.standarderror) == 0:
+                exec ("rsp.result = " + answer.result)
+        return rsp
@@ -24,8 +24,71 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+def _mergedGain (name, tasks, gainParameters):
+    """
+    Create the gain of a merged task, of the same type as the gain of
+    tasks[0]. Its parameters are bound, in the parameter store, to the
+    parameters gainParameter of the merged tasks, when they have one, so
+    that changing the gain of one of them changes the gain of the level.
+    When their values differ, the last value written is used.
+    """
+    from dynamic_graph.sot.core.gain_adaptive import GainAdaptive
+    from .parameters import store
+    if isinstance (getattr(tasks[0], "gain", None), GainAdaptive):
+        from dynamic_graph.sot.core.meta_tasks import setGain
+        gain = GainAdaptive (name)
+        setter = lambda v: setGain(gain, v)
+    else:
+        from agimus_sot.sot import SafeGainAdaptive
+        gain = SafeGainAdaptive (name)
+        setter = lambda v: gain.computeParameters(*v)
+    parameters = [ t.gainParameter for t in tasks
+            if getattr(t, "gainParameter", None) is not None ]
+    if len(parameters) == 0:
+        setter (gainParameters)
+    for p in parameters:
+        store.bind (p, gainParameters, setter)
+    return gain
+
+def _mergeTasks (tasks, mergedTasks):
+    """
+    Create (or get) a task containing the features of all tasks.
+    The gain of the new task is built from tasks[0].priorityGroup.
+    - mergedTasks: a dictionnary of the tasks merged so far, indexed by the
+                   names of the tasks they contain.
+    """
+    key = tuple(t.name for t in tasks)
+    if key in mergedTasks:
+        return mergedTasks[key]
+    from dynamic_graph import plug
+    from dynamic_graph.sot.core.task import Task as SotTask
+    merged = SotTask ("merged_" + "_".join(key))
+    for t in tasks:
+        merged.add (t.feature.name)
+    group, gainParameters = tasks[0].priorityGroup
+    if gainParameters is None:
+        merged.controlGain.value = 1.
+    else:
+        gain = _mergedGain (merged.name + "_gain", tasks, gainParameters)
+        plug(gain.gain, merged.controlGain)
+        plug(merged.error, gain.error)
+    mergedTasks[key] = merged
+    return merged
+
 class Solver(object):
-    def __init__ (self, name, dimension, damping = None, timer = False):
+    ## Constructor
+    # \param compressHierarchy when True, consecutive tasks of the same
+    #        priority group are merged into a single priority level.
+    #        See Solver.push.
+    #        Tasks of a merged level are solved in the least-squares sense
+    #        instead of one after the other. This is equivalent only for
+    #        tasks which act on disjoint DoF, such as the gripper postures.
+    #        Tasks which may conflict, such as the grasps of an object by
+    #        two grippers, must not share a priority group.
+    # \param mergedTasks a dictionnary of merged tasks, which can be shared
+    #        by several solvers. If None, the merged tasks are not shared.
+    def __init__ (self, name, dimension, damping = None, timer = False,
+            compressHierarchy = False, mergedTasks = None):
         from dynamic_graph.entity import VerbosityLevel
         from dynamic_graph.sot.core import SOT
         sot = SOT(name)
@@ -36,6 +99,10 @@ class Solver(object):
 
         self.sot = sot
         self.tasks = []
+        self.compressHierarchy = compressHierarchy
+        self._mergedTasks = dict() if mergedTasks is None else mergedTasks
+        # The tasks of the priority group being pushed.
+        self._group = []
         if timer:
             from .tools import insertTimerOnOutput
             self.timer = insertTimerOnOutput (sot.control, "vector")
@@ -44,14 +111,48 @@ class Solver(object):
 
     def push (self, task):
         """
-        task: an object of type agimus_sot.task.Task
+        task: an object of type dynamic_graph.sot.core.Task
+
+        If the hierarchy is compressed and task has an attribute
+        priorityGroup, which is not None, consecutive tasks of the same
+        priority group are pushed as a single task containing their
+        features. The level is built once, when the group ends, i.e. when
+        a task of another group is pushed or when endGroup is called.
+        The priority group is a tuple (name, gainParameters)
+        where gainParameters are passed to SafeGainAdaptive.computeParameters
+        (or to setGain if the task gain is a GainAdaptive) or, if None, the
+        gain is 1.
+        Tasks of a priority group must have an attribute feature. They may
+        have an attribute gain, the gain entity, and an attribute
+        gainParameter, the name of their gain in the parameter store.
+        """
+        group = getattr(task, "priorityGroup", None)
+        if self.compressHierarchy and group is not None:
+            if len(self._group) > 0 and self._group[0].priorityGroup != group:
+                self.endGroup()
+            self._group.append(task)
+            return
+        self.endGroup()
+        self.sot.push(task.name)
+        self.tasks.append(task)
+
+    def endGroup (self):
+        """
+        Push the tasks of the current priority group, if any.
+        Task.pushTo calls it after pushing its tasks.
         """
+        if len(self._group) == 0: return
+        if len(self._group) == 1:
+            task = self._group[0]
+        else:
+            task = _mergeTasks (self._group, self._mergedTasks)
+        self._group = []
         self.sot.push(task.name)
         self.tasks.append(task)
 
     def setProjector (self, projector):
         """
-        projector: a signal of type matrix type
+        projector: a signal of type matrix type or a constant matrix
 
         A projector is a NxK matrix, where N is the number of DoF of the
         robot and K the dimension of the solver search space. This matrix
@@ -59,7 +160,11 @@ class Solver(object):
         When not set, the search space is the robot velocity space.
         """
         from dynamic_graph import plug
-        plug(projector, self.sot.proj0)
+        from dynamic_graph.signal_base import SignalBase
+        if isinstance(projector, SignalBase):
+            plug(projector, self.sot.proj0)
+        else:
+            self.sot.proj0.value = projector
 
     ## \name Events
     # \{
@@ -84,11 +189,13 @@ class Solver(object):
 
     @property
     def control (self):
+        self.endGroup()
         if self.timer is None: return self.sot.control
         else                 : return self.timer.sout
 
     @property
     def controlname (self):
+        self.endGroup()
         if self.timer is None: return self.sot.name + ".control"
         else                 : return self.timer.name + ".sout"
 
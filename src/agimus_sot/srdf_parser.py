@@ -101,19 +101,64 @@ def _read_link (xml):
         raise ValueError ("Gripper needs exactly one tag link")
     return str(linksTag[0].attrib['name'])
 
-def _read_points (xml):
+## Shapes of a contact stored as two arrays.
+#
+# The indices of the points of shape \c i are
+# \c indices[offsets[i]:offsets[i+1]].
+# It behaves like the list of lists returned by default by the parser.
+class ContactShapes(object):
+    __slots__ = ("offsets", "indices")
+
+    def __init__ (self, offsets, indices):
+        self.offsets = offsets
+        self.indices = indices
+
+    def __len__ (self):
+        return len(self.offsets) - 1
+
+    def __getitem__ (self, i):
+        if i < 0: i += len(self)
+        if i < 0 or i >= len(self): raise IndexError ("shape index out of range")
+        return self.indices[self.offsets[i]:self.offsets[i+1]]
+
+    def __iter__ (self):
+        for i in range(len(self)):
+            yield self.indices[self.offsets[i]:self.offsets[i+1]]
+
+    def __eq__ (self, other):
+        if isinstance (other, ContactShapes):
+            return list(self.offsets) == list(other.offsets) \
+                    and list(self.indices) == list(other.indices)
+        return [ list(s) for s in self ] == [ list(s) for s in other ]
+
+    def __ne__ (self, other):
+        return not self == other
+
+    def __getstate__ (self):
+        return (self.offsets, self.indices)
+
+    def __setstate__ (self, state):
+        self.offsets, self.indices = state
+
+def _read_points (xml, asArray = False):
     pointsTag = xml.findall('point')
     if len(pointsTag) != 1:
         raise ValueError ("Contact needs exactly one tag point")
     vals = pointsTag[0].text.split()
     if len(vals) % 3 != 0:
         raise ValueError ("point tag must contain 3*N floating point numbers. Current size is " + str(len(vals)) + ".")
-    return [ tuple([ float(v) for v in vals[i:i+3]]) for i in range(0,len(vals),3) ]
+    if asArray:
+        import numpy as np
+        return np.array (vals, dtype=np.float64).reshape (-1, 3)
+    vals = [ float(v) for v in vals ]
+    return list (zip (vals[0::3], vals[1::3], vals[2::3]))
 
-def _read_shapes (xml):
+def _read_shapes (xml, asArray = False):
     shapesTag = xml.findall('shape')
     if len(shapesTag) != 1:
         raise ValueError ("Contact needs exactly one tag point")
+    if asArray:
+        return _read_shapes_as_array (shapesTag[0].text.split())
     indices = [ int(v) for v in shapesTag[0].text.split() ]
     shapes = list()
     i = 0
@@ -123,6 +168,24 @@ def _read_shapes (xml):
         i += N+1
     return shapes
 
+def _read_shapes_as_array (vals):
+    import numpy as np
+    values = np.array (vals, dtype=np.int64)
+    # Only the shape sizes are visited one by one.
+    heads = []
+    i = 0
+    while i < len(values):
+        heads.append (i)
+        i += int(values[i]) + 1
+    if i != len(values):
+        raise ValueError ("shape tag is not consistent with the number of indices it contains.")
+    heads = np.array (heads, dtype=np.int64)
+    offsets = np.zeros (len(heads) + 1, dtype=np.int64)
+    np.cumsum (values[heads], out=offsets[1:])
+    isIndex = np.ones (len(values), dtype=bool)
+    isIndex[heads] = False
+    return ContactShapes (offsets, values[isIndex])
+
 # Torque constants should not appear in gripper tag.
 # There should be one value for each actuated joint.
 def _read_torque_constant (xml):
@@ -134,65 +197,149 @@ def _read_torque_constant (xml):
     else:
         return None
 
-def _parse_tree (root, prefix = None):
-    grippers = {}
-    for xml in root.iter('gripper'):
-        n = _read_name (xml)
-        g = { "robot":     prefix,
-              "name":      n,
-              "clearance": _read_clearance (xml),
-              "link":      _read_link (xml),
-              "position":  _read_position (xml),
-              "joints":    _read_joints (xml),
-              }
-        tc = _read_torque_constant (xml)
-        if tc is not None: g["torque_constant"] = tc
-        grippers[ prefix + "/" + n if prefix is not None else n] = g
-
-    handles = {}
-    for xml in root.iter('handle'):
-        n = _read_name (xml)
-        h = { "robot":     prefix,
-              "name":      n,
-              "clearance": _read_clearance (xml),
-              "link":      _read_link (xml),
-              "position":  _read_position (xml),
-              "mask":      _read_mask (xml),
-              }
-        handles[ prefix + "/" + n if prefix is not None else n] = h
-
-    contacts = {}
-    for xml in root.iter('contact'):
-        n = _read_name (xml)
-        c = { "robot":  prefix,
-              "name":   n,
-              "link":   _read_link (xml),
-              "points": _read_points (xml),
-              "shapes": _read_shapes (xml),
-              }
-        contacts[ prefix + "/" + n if prefix is not None else n] = c
-
-    return { "grippers": grippers, "handles": handles, "contacts": contacts}
-
-def parse_srdf_string (srdf, prefix = None):
+def _read_gripper (xml, prefix, asArray = False):
+    g = { "robot":     prefix,
+          "name":      _read_name (xml),
+          "clearance": _read_clearance (xml),
+          "link":      _read_link (xml),
+          "position":  _read_position (xml),
+          "joints":    _read_joints (xml),
+          }
+    tc = _read_torque_constant (xml)
+    if tc is not None: g["torque_constant"] = tc
+    return g
+
+def _read_handle (xml, prefix, asArray = False):
+    return { "robot":     prefix,
+             "name":      _read_name (xml),
+             "clearance": _read_clearance (xml),
+             "link":      _read_link (xml),
+             "position":  _read_position (xml),
+             "mask":      _read_mask (xml),
+             }
+
+def _read_contact (xml, prefix, asArray = False):
+    return { "robot":  prefix,
+             "name":   _read_name (xml),
+             "link":   _read_link (xml),
+             "points": _read_points (xml, asArray),
+             "shapes": _read_shapes (xml, asArray),
+             }
+
+_readers = {
+        "gripper": ("grippers", _read_gripper),
+        "handle" : ("handles" , _read_handle ),
+        "contact": ("contacts", _read_contact),
+        }
+
+def _add_element (content, xml, prefix, asArray = False):
+    """
+    Read xml if it is a gripper, a handle or a contact and add it to content.
+    Return True if the element was read.
+    """
+    try:
+        field, reader = _readers[xml.tag]
+    except KeyError:
+        return False
+    e = reader (xml, prefix, asArray)
+    content[field][ prefix + "/" + e["name"] if prefix is not None else e["name"] ] = e
+    return True
+
+def _parse_stream (source, prefix = None, asArray = False):
+    """
+    Parse a SRDF file incrementally.
+    Each gripper, handle and contact is read as soon as its closing tag is
+    reached and freed afterwards so that the whole document is never
+    kept in memory.
+    - source: a filename or a file object.
+    - asArray: see parse_srdf
+    """
+    content = { "grippers": {}, "handles": {}, "contacts": {} }
+    context = ET.iterparse (source, events = ("start", "end"))
+    _, root = next (context)
+    for event, xml in context:
+        if event == "end" and _add_element (content, xml, prefix, asArray):
+            # Drop the elements read so far.
+            root.clear()
+    return content
+
+def parse_srdf_string (srdf, prefix = None, asArray = False):
     """
     parameters:
     - srdf: a SRDF string.
     - prefix: if provided, the name of the elements will be prepended with
              prefix + "/"
+    - asArray: see parse_srdf
     """
-    root = ET.fromstring (srdf)
-    return _parse_tree (root, prefix = prefix)
+    from io import BytesIO
+    if not isinstance (srdf, bytes):
+        srdf = srdf.encode ('utf-8')
+    return _parse_stream (BytesIO (srdf), prefix = prefix, asArray = asArray)
+
+def _cache_filename (cacheDir, srdf, packageName, prefix, asArray):
+    import hashlib, os
+    key = repr ((srdf, packageName, prefix, asArray))
+    return os.path.join (cacheDir, hashlib.sha1(key.encode('utf-8')).hexdigest() + ".pkl")
 
-def parse_srdf (srdf, packageName = None, prefix = None):
+def _read_cache (cacheFn, prefix):
+    """
+    Return the cached content stored in cacheFn, or None if the cache
+    entry does not exist or is outdated.
+    The resolved path is stored in the cache entry so that a cache hit
+    requires neither RosPack nor the XML parser.
+    """
+    import os, pickle
+    try:
+        with open (cacheFn, 'rb') as f:
+            path, mtime, size, cachedPrefix, content = pickle.load (f)
+        st = os.stat (path)
+    except (IOError, OSError, EOFError, ValueError, pickle.UnpicklingError):
+        return None
+    if st.st_mtime != mtime or st.st_size != size or cachedPrefix != prefix:
+        return None
+    return content
+
+def _write_cache (cacheFn, path, prefix, content):
+    import os, pickle, tempfile
+    st = os.stat (path)
+    cacheDir = os.path.dirname (cacheFn)
+    try:
+        if not os.path.isdir (cacheDir):
+            os.makedirs (cacheDir)
+        # Write to a temporary file first so that concurrent readers never
+        # see a partially written entry.
+        fd, tmpFn = tempfile.mkstemp (dir = cacheDir)
+        with os.fdopen (fd, 'wb') as f:
+            pickle.dump ((path, st.st_mtime, st.st_size, prefix, content),
+                    f, pickle.HIGHEST_PROTOCOL)
+        os.rename (tmpFn, cacheFn)
+    except (IOError, OSError):
+        # The cache is only an optimization.
+        pass
+
+def parse_srdf (srdf, packageName = None, prefix = None, cacheDir = None,
+        asArray = False):
     """
     parameters:
     - srdf: path to a SRDF file.
     - packageName: if provided, the filename is considered relative to this ROS package
     - prefix: if provided, the name of the elements will be prepended with
              prefix + "/"
+    - cacheDir: if provided, the parsed content is stored in this directory.
+             The entry is reused as long as the resolved file has the same
+             modification time and size.
+    - asArray: if True, the points of a contact are a (N,3) numpy.ndarray
+             and its shapes a ContactShapes object.
     """
     import os
+    if packageName is None:
+        srdf = os.path.abspath (srdf)
+    if cacheDir is not None:
+        cacheFn = _cache_filename (cacheDir, srdf, packageName, prefix, asArray)
+        content = _read_cache (cacheFn, prefix)
+        if content is not None:
+            return content
+
     if packageName is not None:
         from rospkg import RosPack
         rospack = RosPack()
@@ -201,8 +348,114 @@ def parse_srdf (srdf, packageName = None, prefix = None):
     else:
         srdfFn = srdf
 
-    tree = ET.parse (srdfFn)
-    return _parse_tree (tree.getroot(), prefix=prefix)
+    content = _parse_stream (srdfFn, prefix=prefix, asArray=asArray)
+    if cacheDir is not None:
+        _write_cache (cacheFn, srdfFn, prefix, content)
+    return content
+
+def _parse_srdf_entry (args):
+    # Module level function so that it can be sent to the pool workers.
+    (srdf, packageName, prefix), cacheDir, asArray = args
+    return parse_srdf (srdf, packageName = packageName, prefix = prefix,
+            cacheDir = cacheDir, asArray = asArray)
+
+def parse_srdf_many (entries, processes = None, cacheDir = None,
+        asArray = False):
+    """
+    Parse several SRDF files and merge them into a single content.
+    parameters:
+    - entries: a list of (srdf, packageName, prefix) tuples, with the same
+             meaning as the arguments of parse_srdf. packageName and prefix
+             may be omitted.
+    - processes: number of worker processes. If None, the number of CPUs
+             is used. Files are parsed in the current process when
+             processes is 1 or when there is a single entry.
+    - cacheDir, asArray: see parse_srdf
+
+    Raises ValueError if two files define an element with the same name.
+    """
+    args = []
+    for entry in entries:
+        if isinstance (entry, str):
+            entry = (entry,)
+        entry = tuple(entry) + (None,) * (3 - len(entry))
+        args.append ((entry, cacheDir, asArray))
+
+    if len(args) <= 1 or processes == 1:
+        contents = [ _parse_srdf_entry (a) for a in args ]
+    else:
+        from multiprocessing import Pool
+        pool = Pool (processes)
+        try:
+            contents = pool.map (_parse_srdf_entry, args)
+        finally:
+            pool.terminate()
+
+    merged = { "grippers": {}, "handles": {}, "contacts": {} }
+    for a, content in zip (args, contents):
+        for field, elements in content.items():
+            for name in elements:
+                if name in merged[field]:
+                    raise ValueError ("{} {} of {} is already defined."
+                            .format(field[:-1], name, a[0][0]))
+            merged[field].update (elements)
+    return merged
+
+def _link_transform (model, oldLink, newLink):
+    """
+    Return the pose of oldLink in newLink, as a rotation matrix and a
+    translation, or None if both links are the same frame.
+    The outputs are numpy.ndarray, whatever pinocchio returns.
+    """
+    import numpy as np
+    oid = model.getFrameId(oldLink)
+    nid = model.getFrameId(newLink)
+    if oid >= model.nframes or nid >= model.nframes:
+        raise ValueError("Could not find one of the frames")
+    if oid == nid: return None
+    of = model.frames[oid]
+    nf = model.frames[nid]
+    if of.parent != nf.parent:
+        raise RuntimeError("The frames are not attached to the same joint")
+    nlMol = nf.placement.inverse() * of.placement
+    return np.asarray (nlMol.rotation), np.asarray (nlMol.translation).ravel()
+
+def _rotation_to_quaternion (R):
+    """ Quaternion (x, y, z, w) of rotation matrix R """
+    import numpy as np
+    from pinocchio import Quaternion
+    return np.asarray (Quaternion(R).coeffs()).ravel()
+
+def _quaternion_products (q, qs):
+    """ Products q * qs[i] of quaternion q with the rows of qs, all in (x,y,z,w) order """
+    import numpy as np
+    x1, y1, z1, w1 = q
+    x2, y2, z2, w2 = qs.T
+    return np.column_stack ((
+        w1*x2 + x1*w2 + y1*z2 - z1*y2,
+        w1*y2 - x1*z2 + y1*w2 + z1*x2,
+        w1*z2 + x1*y2 - y1*x2 + z1*w2,
+        w1*w2 - x1*x2 - y1*y2 - z1*z2,
+        ))
+
+def _move_positions (R, t, srdfs):
+    """ Express the "position" of each element of srdfs in the new link. """
+    import numpy as np
+    poses = np.array ([ srdf["position"] for srdf in srdfs ], dtype=np.float64).reshape(-1, 7)
+    translations = poses[:,0:3].dot (R.T) + t
+    quaternions = _quaternion_products (_rotation_to_quaternion (R), poses[:,3:7])
+    for srdf, p, q in zip (srdfs, translations, quaternions):
+        srdf["position"] = tuple (p.tolist() + q.tolist())
+
+def _move_points (R, t, contact):
+    """ Express the "points" of a contact in the new link. """
+    import numpy as np
+    points = contact["points"]
+    moved = np.asarray(points, dtype=np.float64).reshape(-1, 3).dot (R.T) + t
+    if isinstance (points, np.ndarray):
+        contact["points"] = moved
+    else:
+        contact["points"] = [ tuple(p) for p in moved.tolist() ]
 
 def attach_to_link(model, link, gripper=None, handle=None, contact=None):
     """
@@ -211,37 +464,37 @@ def attach_to_link(model, link, gripper=None, handle=None, contact=None):
     - link: the link onto which to attach.
     - gripper, handle, contact: exactly one of them should be provided
     """
-    import pinocchio
     if int(gripper is None) + int(handle is None) + int(contact is None) != 2:
         raise ValueError("Exactly one of {gripper, handle, contact} should be provided")
     srdf = ( contact if handle is None else handle ) if gripper is None else gripper
-    oid = model.getFrameId(srdf['link'])
-    nid = model.getFrameId(link)
-    if oid >= model.nframes or nid >= model.nframes:
-        raise ValueError("Could not find one of the frames")
-    if oid == nid: return
-    of = model.frames[oid]
-    nf = model.frames[nid]
-    if of.parent != nf.parent:
-        raise RuntimeError("The frames are not attached to the same joint")
-    srdf['link'] = nf.name
+    Rt = _link_transform (model, srdf['link'], link)
+    if Rt is None: return
+    srdf['link'] = link
     if contact is not None:
-        # Change srdf['points'] from old link to new link
-        raise NotImplementedError("Need to change srdf['points'] from old link to new link")
+        _move_points (Rt[0], Rt[1], contact)
     else:
-        olMf = pinocchio.XYZQUATToSE3(srdf["position"])
-        jMnl = nf.placement
-        jMol = of.placement
-        nlMf = jMnl.inverse() * jMol * olMf
-        srdf["position"] = pinocchio.SE3ToXYZQUAT(nlMf)
+        _move_positions (Rt[0], Rt[1], [ srdf, ])
 
 def attach_all_to_link(model, link, srdf_content, grippers=True, handles=True, contacts=True):
-    if grippers:
-        for gripper in srdf_content["grippers"].values():
-            attach_to_link(model, link, gripper=gripper)
-    if handles:
-        for handle in srdf_content["handles"].values():
-            attach_to_link(model, link, handle=handle)
-    if contacts:
-        for contact in srdf_content["contacts"].values():
-            attach_to_link(model, link, contact=contact)
+    """
+    Attach all the grippers, handles and contacts to a different link.
+    The transformation between the current link and the new one is computed
+    once per current link and applied to all the elements attached to it.
+    - model: a pinocchio.Model that represents the kinematic chain.
+    - link: the link onto which to attach.
+    - srdf_content: as returned by parse_srdf.
+    """
+    byLink = {}
+    for field, enabled in (("grippers", grippers), ("handles", handles), ("contacts", contacts)):
+        if not enabled: continue
+        for srdf in srdf_content[field].values():
+            byLink.setdefault (srdf['link'], ([], []))[field == "contacts"].append (srdf)
+    for oldLink, (frames, contactList) in byLink.items():
+        Rt = _link_transform (model, oldLink, link)
+        if Rt is None: continue
+        if len(frames) > 0:
+            _move_positions (Rt[0], Rt[1], frames)
+        for contact in contactList:
+            _move_points (Rt[0], Rt[1], contact)
+        for srdf in frames + contactList:
+            srdf['link'] = link
@@ -47,6 +47,18 @@ class Supervisor(object):
     4. GP <-> Gp
     5. Gp <-> G
     """
+    ## What to do when a queue of the RosQueuedSubscribe entity runs dry
+    ## while it is read (see readQueue):
+    # - "hold": the last received values are kept and the underrun is reported,
+    # - "abort": the error event is also triggered.
+    queueUnderrunPolicy = "hold"
+    ## Number of iterations before the expected end of the queues during
+    ## which an empty queue is not an underrun. The queues are empty after
+    ## their last value is read, and the expected duration is rounded.
+    queueUnderrunMargin = 2
+    ## Norm of the control below which the robot is considered still.
+    controlNormThreshold = 1e-2
+
     ##
     # \param lpTasks list of low priority tasks. If None, a Posture task will be used.
     # \param hpTasks list of high priority tasks (like balance)
@@ -62,9 +74,13 @@ class Supervisor(object):
         from agimus_sot.events import Events
         self. done_events = Events ("done" , sotrobot)
         self.error_events = Events ("error", sotrobot)
-        self. done_events.setupNormOfControl (sotrobot.device.control, 1e-2)
+        self. done_events.setupNormOfControl (sotrobot.device.control, self.controlNormThreshold)
+        from .parameters import store
+        store.bind ("supervisor_control_norm_threshold", self.controlNormThreshold,
+                self.done_events.setControlNormThreshold)
         self. done_events.setupTime () # For signal self. done_events.timeEllapsedSignal
         self.error_events.setupTime () # For signal self.error_events.timeEllapsedSignal
+        self._setupQueueUnderrun ()
 
     def makeInitialSot (self):
         # Create the initial sot (keep)
@@ -79,6 +95,10 @@ class Supervisor(object):
         sot. doneSignal = self.done_events.controlNormSignal
         sot.errorSignal = False
         self.addSolver ("", sot)
+        # sot_keep controls the robot until the first call to plugSot.
+        self._selectSolver (sot)
+        self. done_events.arm ()
+        self.error_events.arm ()
 
     ## Set the robot base pose in the world.
     # \param basePose a list: [x,y,z,r,p,y] or [x,y,z,qx,qy,qz,qw]
@@ -165,6 +185,10 @@ class Supervisor(object):
             topic_handler = _handlers[topic_info.get("handler","default")]
             topic_handler (name,topic_info,self.rosSubscribe,self.rosTf)
 
+        self.queue_underrun.setSubscriber (self.rosSubscribe.name)
+        exec ("queues = " + self.rosSubscribe.list())
+        for queue in queues: self.queue_underrun.addQueue (queue)
+
     def printQueueSize (self):
         exec ("tmp = " + self.rosSubscribe.list())
         for l in tmp: print (l, self.rosSubscribe.queueSize(l))
@@ -192,7 +216,7 @@ class Supervisor(object):
         return True
 
     def clearQueues(self):
-        self.rosSubscribe.readQueue (-1)
+        self.stopReadingQueue ()
         exec ("tmp = " + self.rosSubscribe.list())
         for s in tmp:
             print ('{} queue size: {}'.format(s, self.rosSubscribe.queueSize(s)))
@@ -244,11 +268,66 @@ class Supervisor(object):
         self.rosSubscribe.readQueue (t)
         self. done_events.setFutureTime (t + durationStep)
         self.error_events.setFutureTime (t + durationStep)
+        self. done_events.arm (t)
+        self.error_events.arm (t)
+        self._armQueueUnderrun (t, t + durationStep)
         return True, t
 
     def stopReadingQueue(self):
+        self._disarmQueueUnderrun ()
         self.rosSubscribe.readQueue (-1)
 
+    ## Create the entities detecting a queue underrun in the control loop.
+    #
+    # Entity QueueUnderrun checks the queues at each iteration of the
+    # device, while they are read. The time and the topic of an underrun
+    # are published on /agimus/sot/queue_underrun and
+    # /agimus/sot/queue_underrun/queue. The error event is triggered if
+    # the policy is "abort".
+    def _setupQueueUnderrun (self):
+        from dynamic_graph.sot.core.operator import And
+        from dynamic_graph.sot.core.event import Event
+        from dynamic_graph.ros import RosPublish
+        from agimus_sot.sot import QueueUnderrun
+        self.queue_underrun = QueueUnderrun ("queue_underrun")
+        self.queue_underrun.setMargin (self.queueUnderrunMargin)
+
+        self.queue_underrun_abort = And ("queue_underrun_abort")
+        self.queue_underrun_abort.setSignalNumber (2)
+        plug (self.queue_underrun.underrun, self.queue_underrun_abort.sin0)
+        self.queue_underrun_abort.sin1.value = False
+        plug (self.queue_underrun_abort.sout, self.error_events.globalCondition)
+
+        self.queue_underrun_publish = RosPublish ("queue_underrun_ros_publish")
+        self.queue_underrun_publish.add ('int', 'time', '/agimus/sot/queue_underrun')
+        self.queue_underrun_publish.add ('string', 'queue', '/agimus/sot/queue_underrun/queue')
+        plug (self.queue_underrun.time , self.queue_underrun_publish.signal('time'))
+        plug (self.queue_underrun.queue, self.queue_underrun_publish.signal('queue'))
+        self.queue_underrun_event = Event ("queue_underrun_event")
+        self.queue_underrun_event.setOnlyUp (True)
+        plug (self.queue_underrun.underrun, self.queue_underrun_event.condition)
+        self.queue_underrun_event.addSignal ("queue_underrun_ros_publish.trigger")
+        self.sotrobot.device.after.addSignal ("queue_underrun_event.check")
+
+    ## Check that no queue runs dry between SoT times \p start and \p end.
+    #
+    # The queues are disarmed first, so that the control loop never checks
+    # them with the new start and the previous end.
+    def _armQueueUnderrun (self, start, end):
+        self._disarmQueueUnderrun ()
+        self.queue_underrun_abort.sin1.value = (self.queueUnderrunPolicy == "abort")
+        self.queue_underrun.start.value = start
+        self.queue_underrun.end.value = end
+
+    def _disarmQueueUnderrun (self):
+        self.queue_underrun.end.value = -1
+
+    ## (time, topic) of the last queue underrun, or None.
+    @property
+    def queueUnderrun (self):
+        if not self.queue_underrun.underrun.value: return None
+        return self.queue_underrun.time.value, self.queue_underrun.queue.value
+
     # \return success, time boolean, SoT time at which reading starts (invalid if success is False)
     def plugSot(self, transitionName, check = False):
         if check and not self.isSotConsistentWithCurrent (transitionName):
@@ -259,10 +338,12 @@ class Supervisor(object):
         solver = self.sots[transitionName]
 
         # No done events should be triggered before call
-        # to readQueue. We expect it to happen with 1e6 milli-seconds
-        # from now...
+        # to readQueue, which arms them.
         devicetime = self.sotrobot.device.control.time
+        self._disarmQueueUnderrun ()
+        self. done_events.disarm ()
         self. done_events.setFutureTime (devicetime + 100000)
+        self.error_events.arm ()
 
         self._selectSolver (solver)
         print("{0}: Current solver {1}\n{2}"
@@ -279,6 +360,8 @@ class Supervisor(object):
 
             t = self.sotrobot.device.control.time + 2
             self. done_events.setFutureTime (t)
+            self. done_events.arm ()
+            self.error_events.arm ()
 
             self._selectSolver (solver)
             print("{0}: Running pre action {1}\n{2}"
@@ -297,6 +380,8 @@ class Supervisor(object):
 
                 devicetime = self.sotrobot.device.control.time
                 self. done_events.setFutureTime (devicetime + 2)
+                self. done_events.arm ()
+                self.error_events.arm ()
 
                 self._selectSolver (solver)
 
@@ -308,7 +393,26 @@ class Supervisor(object):
         return False, -1
 
     def getJointList (self, prefix = ""):
-        return [ prefix + n for n in self.sotrobot.dynamic.model.names[1:] ]
+        from .tools import modelIndex
+        return [ prefix + n for n in modelIndex(self.sotrobot.dynamic.model).jointNames ]
+
+    ## Get the runtime parameters of the tasks and controllers.
+    # \param names list of parameter names. If None, all the parameters.
+    # \return a dictionnary of the values.
+    # \sa agimus_sot.parameters.ParameterStore
+    def getParameters (self, names = None):
+        from .parameters import store
+        return store.get (names)
+
+    ## Set runtime parameters of the tasks and controllers.
+    # The values are written right after the device starts a new iteration.
+    # \param values a dictionnary of the new values.
+    # \return the list of parameters which were updated.
+    # \sa agimus_sot.parameters.ParameterStore.apply
+    def setParameters (self, values):
+        from .parameters import store
+        store.set (values)
+        return store.apply (self.sotrobot.device)
 
     def publishState (self, subsampling = 40):
         if hasattr (self, "ros_publish_state"):
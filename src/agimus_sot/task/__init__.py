@@ -36,4 +36,4 @@ from .op_frame import OpFrame
 from .posture import Posture
 from .pre_grasp import PreGrasp
 from .pre_grasp_post_action import PreGraspPostAction
-from .task import Task
+from .task import Task, TaskStack
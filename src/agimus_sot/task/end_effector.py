@@ -26,14 +26,17 @@
 
 import numpy as np
 from dynamic_graph import plug
-from dynamic_graph.sot.core.feature_posture import FeaturePosture
+from dynamic_graph.sot.core.feature_generic import FeatureGeneric
 from dynamic_graph.sot.core.meta_tasks import setGain
-from dynamic_graph.sot.core.operator import Mix_of_vector
+from dynamic_graph.sot.core.operator import Selec_of_vector, Substract_of_vector, \
+    CompareDouble
 
 from agimus_sot.control.gripper import AdmittanceControl, \
     PositionAndAdmittanceControl
 from agimus_sot.events import logical_and_entity, norm_inferior_to, \
     norm_superior_to
+from agimus_sot.tools import modelIndex
+from agimus_sot.parameters import store
 
 from .task import Task
 from .posture import Posture
@@ -48,44 +51,48 @@ from .posture import Posture
 #     I tried to use it. However, the SEGV might have a different cause.
 class EndEffector (Task):
     name_prefix = "ee"
+    ## Parameters of the SafeGainAdaptive of the position control.
+    positionGain = (4.9, .3, 0.02, 0.2)
+    ## Error norm below which the gripper reached its position.
+    thr_task_error = 0.0001
 
     def __init__ (self, sotrobot, gripper, name_suffix):
         super(EndEffector, self).__init__()
         self.gripper = gripper
         self.jointNames = gripper.joints
         self.robot = sotrobot
-        pinmodel = sotrobot.dynamic.model
 
         self.name = self._name(gripper.name, name_suffix)
 
         from . import SotTask
         self.tp = SotTask ('task' + self.name)
         self.tp.dyn = sotrobot.dynamic
-        self.tp.feature = FeaturePosture ('feature_' + self.name)
-
-        plug(sotrobot.dynamic.position, self.tp.feature.state)
-
-        # Select the dofs
-        self.tp.feature.posture.value = sotrobot.dynamic.position.value
-        # Define the reference and the selected DoF
-        self.jointRanks = []
-        for name in self.jointNames:
-            idJ = pinmodel.getJointId(name)
-            assert idJ < pinmodel.njoints
-            joint = pinmodel.joints[idJ]
-            idx_v = joint.idx_v
-            nv = joint.nv
-            self.jointRanks.append( (idx_v, nv) )
+        self.tp.feature = FeatureGeneric ('feature_' + self.name)
+
+        # Define the selected DoF
+        index = modelIndex (sotrobot.dynamic.model)
+        self.jointRanks = index.velocityRanges (self.jointNames)
+
+        # The feature only works on the gripper DoF:
+        #   error = q[gripper DoF] - reference
+        #   jacobian = selection matrix
+        self.state = Selec_of_vector ('state_' + self.name)
+        plug(sotrobot.dynamic.position, self.state.sin)
+        self.error = Substract_of_vector ('error_' + self.name)
+        plug(self.state.sout, self.error.sin1)
+        plug(self.error.sout, self.tp.feature.errorIN)
+
         for idx_v, nv in self.jointRanks:
-            for i in range(idx_v, idx_v + nv):
-                self.tp.feature.selectDof (i, True)
+            self.state.addSelec (idx_v, idx_v + nv)
+        self.tp.feature.jacobianIN.value = index.selectionMatrix (self.jointNames)
+        # Default reference: the current position.
+        self.error.sin2.value = [ sotrobot.dynamic.position.value[idx_v + k]
+                for idx_v, nv in self.jointRanks for k in range(nv) ]
 
         self.tp.add(self.tp.feature.name)
         if len(self.jointNames) > 0:
             self.tasks = [ self.tp ]
 
-        self.thr_task_error = 0.0001
-
     ### \param type equals "open" or "close"
     ### \param period interval between two integration of SoT
     def makeAdmittanceControl (self, affordance, type, period,
@@ -130,16 +137,10 @@ class EndEffector (Task):
                     (self.gripper.torque_constant,), filterCurrents)
             # self.ac.readTorquesFromRobot(self.robot, self.jointNames)
 
-        mix_of_vector = Mix_of_vector (self.name + "_control_to_robot_control")
-        mix_of_vector.default.value = tuple ([0,] * len(self.tp.feature.posture.value))
-        mix_of_vector.setSignalNumber(2)
-        for idx_v,nv in self.jointRanks:
-            mix_of_vector.addSelec(1, idx_v, nv)
-
         # Plug the admittance controller to the posture task
         self.tp.controlGain.value = 1.
-        plug(self.ac.outputPosition, mix_of_vector.signal("sin1"))
-        plug(mix_of_vector.sout, self.tp.feature.posture)
+        self.tp.priorityGroup = ("gripper", None)
+        plug(self.ac.outputPosition, self.referenceIn)
         # TODO plug posture dot ?
         # I do not think it is necessary.
         # TODO should we send to the posture task
@@ -153,28 +154,42 @@ class EndEffector (Task):
                 self.ac.currentTorqueIn, 0.95 * np.linalg.norm(desired_torque))
         pnorm, pcomp = norm_inferior_to (self.name + "_positioncmp",
                 self.tp.error, self.thr_task_error)
+        # The position is reached but the torque is not: nothing was grasped.
+        tlow = CompareDouble (self.name + "_torquelow")
+        plug (tnorm.sout, tlow.sin1)
+        tlow.sin2.value = 0.95 * np.linalg.norm(desired_torque)
+        def setThreshold (thr): pcomp.sin2.value = thr
+        store.bind (self.name + "_thr_task_error", self.thr_task_error, setThreshold)
         self.events = {
                 "done_close": logical_and_entity (self.name + '_done_close_and', [tcomp.sout, pcomp.sout]),
+                "error_close": logical_and_entity (self.name + '_error_close_and', [tlow.sout, pcomp.sout]),
                 }
 
+    ## Reference of the gripper DoF, of size the number of gripper DoF.
+    @property
+    def referenceIn (self):
+        return self.error.sin2
+
     def makePositionControl (self, position):
-        q = list(self.tp.feature.state.value)
         # Define the reference
-        ip = 0
-        for iq, nv in self.jointRanks:
-            q[iq:iq+nv] = position[ip:ip+nv]
-            ip += nv
-        assert ip == len(position)
-        self.tp.feature.posture.value = q
+        assert sum(nv for _, nv in self.jointRanks) == len(position)
+        self.referenceIn.value = position
 
         from agimus_sot.sot import SafeGainAdaptive
         self.gain = SafeGainAdaptive(self.name + "_gain")
-        self.gain.computeParameters(4.9, .3, 0.02, 0.2)
+        gain = self.gain
+        store.bind (self.name + "_gain", self.positionGain,
+                lambda v: gain.computeParameters(*v))
         plug(self.gain.gain, self.tp.controlGain)
         plug(self.tp.error, self.gain.error)
+        self.tp.priorityGroup = ("gripper", self.positionGain)
+        self.tp.gain = self.gain
+        self.tp.gainParameter = self.name + "_gain"
 
         n, c = norm_inferior_to (self.name + "_positioncmp",
                 self.tp.error, self.thr_task_error)
+        def setThreshold (thr): c.sin2.value = thr
+        store.bind (self.name + "_thr_task_error", self.thr_task_error, setThreshold)
         self.events = {
                 "done_close": c.sout,
                 "done_open": c.sout,
@@ -24,18 +24,22 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import numpy as np
 from dynamic_graph import plug
 from . import FeaturePose, GainAdaptive, SotTask
 from dynamic_graph.sot.core.meta_tasks import setGain
 
 from .task import Task
-from agimus_sot.tools import se3ToTuple, _createOpPoint
+from agimus_sot.parameters import store
+from agimus_sot.tools import _createOpPoint
 
 ## A grasp task
 # It creates a grasp constraint only in the case where
 # an object is grasped by two grippers.
 class Grasp (Task):
     name_prefix = "grasp"
+    ## Parameters of the GainAdaptive of the relative task.
+    gainParameters = (4.9, 0.9, 0.01, 0.9)
 
     def __init__ (self, gripper, handle, otherGraspOnObject = None):
         super(Grasp, self).__init__()
@@ -52,11 +56,8 @@ class Grasp (Task):
             self.otherGripper = otherGraspOnObject[0]
             self.otherHandle = otherGraspOnObject[1]
 
-    ## \todo implement tracking of velocity
-    # \c self.task.task.setWithDerivative(True)
-    # which needs the following signals:
-    # - velocity of object attached to gripper.sotjoint, into self.task.feature.dotposition
-    # - velocity of object attached to otherGripper.sotjoint, into self.task.feature.dotpositionRef
+    ## \param withDerivative when True, the desired relative velocity
+    #        of the two grippers is zero since the object is assumed rigid.
     def makeTasks(self, sotrobot, withDerivative = False):
         if self.relative:
             basename = self._name(self.gripper.name,
@@ -68,7 +69,7 @@ class Grasp (Task):
             def set(oMj, jMf, jJj, g, h):
                 # Create the operational points
                 _createOpPoint (sotrobot, g.link)
-                jMf.value = se3ToTuple(g.lMf * h.lMf.inverse())
+                jMf.value = g.relativePose(h).homogeneous
                 plug(sotrobot.dynamic.signal(    g.link), oMj)
                 plug(sotrobot.dynamic.signal('J'+g.link), jJj)
 
@@ -87,9 +88,11 @@ class Grasp (Task):
             plug (self.task.error, self.gain.error)
             plug (self.gain.gain , self.task.controlGain)
 
-            setGain(self.gain,(4.9,0.9,0.01,0.9))
+            gain = self.gain
+            store.bind (basename + "_gain", self.gainParameters,
+                    lambda v: setGain(gain, v))
             if withDerivative:
-                print("Grasp constraint with derivative is not implemented yet.")
-            self.task.setWithDerivative (False)
+                self.feature.faNufafbDes.value = np.zeros(6)
+            self.task.setWithDerivative (withDerivative)
 
             self.tasks = [ self.task ]
@@ -25,7 +25,7 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 from .task import Task
-from agimus_sot.tools import transQuatToSE3
+from agimus_sot.tools import transQuatToSE3, modelIndex
 
 ## Represents a gripper or a handle
 class OpFrame(object):
@@ -34,8 +34,13 @@ class OpFrame(object):
     - enabled: whether tasks for this frame should be generated.
     - controllable: whether the position of the frame can be controlled by this robot.
     - lMf, jMf: pose of frame wrt to link or joint (when relevant)
+    - lMfInverse, lMfHomogeneous: precomputed forms of lMf.
     - hasVisualTag: whether visual feedback is available for this frame. That triggers visual servoing task generation.
     """
+    __slots__ = ("robotName", "name", "key", "link", "enabled", "controllable",
+            "joints", "torque_constant", "joint", "hasVisualTag",
+            "lMf", "lMfInverse", "lMfHomogeneous", "jMf", "_relativePoses")
+
     def __init__ (self, srdf, modelName, model = None, enabled = None):
         """
         Arguments are:
@@ -50,6 +55,9 @@ class OpFrame(object):
         self.key = self.robotName + "/" + self.name
         self.link = srdf["link"]
         self.lMf = transQuatToSE3 (srdf["position"])
+        self.lMfInverse = self.lMf.inverse()
+        self.lMfHomogeneous = self.lMf.homogeneous
+        self._relativePoses = dict()
         self.enabled = enabled
         self.controllable = self.robotName == modelName
         if "joints" in srdf:
@@ -64,23 +72,37 @@ class OpFrame(object):
                 self.torque_constant = srdf["torque_constant"]
         else:
             ## Only for handles
-            # kept for backward compat
-            self.pose = self.lMf
             if self.enabled is None:
                 self.enabled = False
         # TODO See note in README.md
         self.hasVisualTag = False
 
     def _setupParentJoint (self, link, pose, model):
-        frameid = model.getFrameId (link)
-        if frameid < 0 or frameid >= len(model.frames):
-            raise ValueError("Link " + self.link + " not found")
-        frame = model.frames[frameid]
+        _, self.joint, placement = modelIndex(model).frame (link)
+
+        self.jMf = placement * pose
+
+    ## kept for backward compat
+    @property
+    def pose (self):
+        if hasattr (self, "jMf"): return self.jMf
+        return self.lMf
 
-        # kept for backward compat
-        self.pose = frame.placement * pose
-        self.jMf = self.pose
-        self.joint = model.names[frame.parent]
+    ## Pose of \c frame in the link of this frame, when \c other and this
+    # frame are at the same pose.
+    #
+    # \return self.lMf * other.lMf^{-1} * frame.lMf if frame is not None,
+    #         self.lMf * other.lMf^{-1} otherwise.
+    #
+    # Results are memoized.
+    def relativePose (self, other, frame = None):
+        key = (other.key, None if frame is None else frame.key)
+        if key not in self._relativePoses:
+            M = self.lMf * other.lMfInverse
+            if frame is not None:
+                M = M * frame.lMf
+            self._relativePoses[key] = M
+        return self._relativePoses[key]
 
     @property
     def fullLink  (self): return self.robotName + "/" + self.link
@@ -24,14 +24,14 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-import numpy as np
 from dynamic_graph import plug
 from . import SotTask, FeaturePose
 
-from agimus_sot.sot import SafeGainAdaptive
+from agimus_sot.sot import SafeGainAdaptive, PreGraspReference, MeasuredPose
 from .task import Task
+from agimus_sot.parameters import store
 from agimus_sot.tools import _createOpPoint, assertEntityDoesNotExist, \
-    matrixHomoInverse, matrixHomoProduct, se3ToTuple, entityIfMatrixHomo
+    matrixHomoInverse, matrixHomoProduct, entityIfMatrixHomo
 
 ## \brief A pregrasp (and preplace) task.
 # It creates a task to pose of the gripper with respect to the handle.
@@ -52,6 +52,14 @@ from agimus_sot.tools import _createOpPoint, assertEntityDoesNotExist, \
 class PreGrasp (Task):
     name_prefix = "pregrasp"
     meas_suffix = "_measured"
+    ## Latency of the visual measurements, in number of control ticks.
+    # When positive, the measured poses are propagated to the current time
+    # using the history of the camera pose and the robot kinematics.
+    measurementDelay = 0
+    ## Parameters of the SafeGainAdaptive of the task.
+    # See doc of SafeGainAdaptive to see how to plot the gain associated
+    # to those values.
+    gainParameters = (0.9, 0.1, 0.3, 1.)
 
     ## Constructor
     # \param gripper object of type OpFrame
@@ -98,26 +106,34 @@ class PreGrasp (Task):
                 # add a warning ?
                 print("Both grippers are disabled so nothing can be done")
 
+    ## Create an entity computing the measured pose of linkName in the world frame.
+    #  The measured pose is read from TF, in the camera frame.
+    #  \return the MeasuredPose entity. Its input \c fallback must be plugged.
+    def _measuredPose (self, sotrobot, linkName):
+        _createOpPoint (sotrobot, sotrobot.camera_frame)
+        linkNameMeas = linkName + self.meas_suffix
+        # The entity may already exist if another task measures the same link.
+        measured = MeasuredPose (linkNameMeas + "_wrt_world")
+        plug (sotrobot.dynamic.signal(sotrobot.camera_frame), measured.wMc)
+        if self.measurementDelay > 0:
+            measured.delay.value = self.measurementDelay
+            measured.setHistorySize (self.measurementDelay + 1)
+        self.addTfListenerTopic(linkNameMeas,
+                frame0 = sotrobot.camera_frame,
+                frame1 = linkNameMeas,
+                signalGetters = [ (measured.cMf, measured.available), ],
+                )
+        return measured
+
     ## Plug the position of linkName to \c outSignal.
     #  The pose of linkName must be computable by the SoT robot entity.
     def _plugRobotLink (self, sotrobot, linkName, poseSignal, Jsignal, withMeasurement):
         if withMeasurement:
-            _createOpPoint (sotrobot, sotrobot.camera_frame)
-            linkNameMeas = linkName + self.meas_suffix
-            oMl = matrixHomoProduct(linkNameMeas + "_wrt_world",
-                    sotrobot.dynamic.signal(sotrobot.camera_frame), None,
-                    check=False)
-            if_ = entityIfMatrixHomo (linkNameMeas + "_wrt_world_safe",
-                    condition=None,
-                    value_then=oMl.sout,
-                    value_else=sotrobot.dynamic.signal(linkName),
-                    check=False)
-            self.addTfListenerTopic(linkNameMeas,
-                    frame0 = sotrobot.camera_frame,
-                    frame1 = linkNameMeas,
-                    signalGetters = [ (oMl.sin1, if_.condition), ],
-                    )
-            plug(if_.out, poseSignal)
+            measured = self._measuredPose (sotrobot, linkName)
+            plug(sotrobot.dynamic.signal(linkName), measured.fallback)
+            # Propagate the measurement using the kinematics.
+            plug(sotrobot.dynamic.signal(linkName), measured.wMk)
+            plug(measured.sout, poseSignal)
         else:
             plug(sotrobot.dynamic.signal(linkName), poseSignal)
             print("Plug robot link: no measument for " + linkName)
@@ -132,47 +148,35 @@ class PreGrasp (Task):
     #        rest of SoT).
     def _plugObjectLink (self, sotrobot, linkName, outSignal, withMeasurement):
         if withMeasurement:
-            linkNameMeas = linkName + self.meas_suffix
-
-            # Create default value
-            _createOpPoint (sotrobot, sotrobot.camera_frame)
-            oMl = matrixHomoProduct(linkNameMeas + "_wrt_world",
-                    sotrobot.dynamic.signal(sotrobot.camera_frame),
-                    None,
-                    check=False,)
-            name = linkNameMeas + "wrt_world"
-            if_ = entityIfMatrixHomo (name, condition=None,
-                    value_then=oMl.sout,
-                    value_else=None,
-                    check=False)
-            self.addTfListenerTopic (linkNameMeas,
-                    frame0 = sotrobot.camera_frame,
-                    frame1 = linkNameMeas,
-                    signalGetters = [(oMl.sin1, if_.condition),],
-                    )
-            self.addHppJointTopic (linkName, signalGetters = [ if_.else_, ],)
-            plug(if_.out, outSignal)
+            measured = self._measuredPose (sotrobot, linkName)
+            self.addHppJointTopic (linkName, signalGetters = [ measured.fallback, ],)
+            plug(measured.sout, outSignal)
         else:
             print("Plug object link: no measument for " + linkName)
             self.extendSignalGetters(linkName, outSignal)
 
-    ## Compute desired pose between gripper and handle.
+    ## Compute desired pose between frame \c gripper (side A) and frame
+    #  \c handle (side B).
     #  It is decomposed as \f$ jgMg^-1 * oMjg^-1 * oMlh * lhMh \f$.
     #  It creates the entity faMfbDes.
     #  Topic \c handle.fullLink must exists.
-    def _referenceSignal (self, name, gripper, handle):
-        # oMjg^-1 -> HPP joint
-        self.oMjaDes_inv = matrixHomoInverse (name + "_oMjaDes_inv")
-        self.addHppJointTopic (gripper.fullLink, signalGetters = [ self.oMjaDes_inv.sin, ],)
-        # Plug it to FeaturePose
-        self.faMfbDes = matrixHomoProduct (name + "_faMfbDes",
-            gripper.lMf.inverse(), # jgMg^-1
-            self.oMjaDes_inv.sout, # oMjg^-1 -> HPP joint
-            None,                  # oMlh -> HPP joint
-            handle.lMf,            # lhMh
-            )
+    #  If \c withDerivative, the desired velocity is computed from the HPP
+    #  joint velocities and plugged into the feature.
+    def _referenceSignal (self, name, gripper, handle, withDerivative):
+        self.faMfbDes = PreGraspReference (name + "_faMfbDes")
+        self.faMfbDes.jaMfa.value = gripper.lMfHomogeneous # jgMg
+        self.faMfbDes.jbMfb.value = handle .lMfHomogeneous # lhMh
+        # oMjg -> HPP joint
+        self.addHppJointTopic (gripper.fullLink, signalGetters = [ self.faMfbDes.oMja, ],)
         # oMlh -> HPP joint
-        self.extendSignalGetters(handle.fullLink, self.faMfbDes.sin2)
+        self.extendSignalGetters(handle.fullLink, self.faMfbDes.oMjb)
+        plug(self.faMfbDes.sout, self.feature.faMfbDes)
+        if withDerivative:
+            self.addHppJointTopic ("vel_" + gripper.fullLink, gripper.fullLink,
+                    velocity = True, signalGetters = [ self.faMfbDes.vja, ],)
+            self.addHppJointTopic ("vel_" + handle.fullLink, handle.fullLink,
+                    velocity = True, signalGetters = [ self.faMfbDes.vjb, ],)
+            plug(self.faMfbDes.faNufafbDes, self.feature.faNufafbDes)
 
     def _createTaskAndGain (self, name):
         # Create a task
@@ -181,13 +185,12 @@ class PreGrasp (Task):
 
         # Set the task gain
         self.gain = SafeGainAdaptive(name + "_gain")
-        # See doc of SafeGainAdaptive to see how to plot the gain associated
-        # to those values.
-        self.gain.computeParameters(0.9,0.1,0.3,1.)
+        gain = self.gain
+        store.bind (name + "_gain", self.gainParameters,
+                lambda v: gain.computeParameters(*v))
         plug(self.gain.gain, self.task.controlGain)
         plug(self.task.error, self.gain.error)
 
-    ## \todo implement tracking of velocity
     def _makeAbsolute(self, sotrobot, withMeasurementOfObjectPos, withMeasurementOfGripperPos, withDerivative):
         name = self._name(self.gripper.name, self.handle.fullName)
 
@@ -197,32 +200,32 @@ class PreGrasp (Task):
         # Create the operational points
         _createOpPoint (sotrobot, self.gripper.link)
 
-        self._plugRobotLink (sotrobot, self.gripper.link,
-                self.feature.oMja, self.feature.jaJja,
-                withMeasurementOfGripperPos)
-        self.feature.jaMfa.value = se3ToTuple(self.gripper.lMf)
-
+        # The object does not move with the robot. It is side A so that
+        # jaJja can be left unplugged and its Jacobian is not computed.
+        # Joint A is the handle link, frame A is the handle frame.
         self.addHppJointTopic (self.handle.fullLink)
         self._plugObjectLink (sotrobot, self.handle.fullLink,
-                self.feature.oMjb, withMeasurementOfObjectPos)
-        self.feature.jbMfb.value = se3ToTuple(self.handle.lMf)
-        self.feature.jbJjb.value = np.zeros((6, sotrobot.dynamic.getDimension()))
+                self.feature.oMja, withMeasurementOfObjectPos)
+        self.feature.jaMfa.value = self.handle.lMfHomogeneous
 
-        # Compute desired pose between gripper and handle.
+        # Joint B is the gripper link, frame B is the gripper frame.
+        self._plugRobotLink (sotrobot, self.gripper.link,
+                self.feature.oMjb, self.feature.jbJjb,
+                withMeasurementOfGripperPos)
+        self.feature.jbMfb.value = self.gripper.lMfHomogeneous
+
+        # Compute desired pose of the gripper with respect to the handle.
         # Creates the entity faMfbDes
-        self._referenceSignal (name, self.gripper, self.handle)
-        plug(self.faMfbDes.sout, self.feature.faMfbDes)
+        self.addHppJointTopic (self.gripper.fullLink)
+        self._referenceSignal (name, self.handle, self.gripper, withDerivative)
 
         # Create a task and gain
         self._createTaskAndGain (name)
 
-        if withDerivative:
-            print("Relative pose constraint with derivative is not implemented yet.")
-        self.task.setWithDerivative (False)
+        self.task.setWithDerivative (withDerivative)
 
         self.tasks = [ self.task, ]
 
-    ## \todo implement tracking of velocity
     def _makeRelativeTask (self, sotrobot,
             withMeasurementOfObjectPos, withMeasurementOfGripperPos,
             withMeasurementOfOtherGripperPos,
@@ -240,28 +243,26 @@ class PreGrasp (Task):
         _createOpPoint (sotrobot, self.otherGripper.link)
 
         # Joint A is the gripper link
+        # jaJja is left unplugged: its Jacobian is considered zero.
         self._plugRobotLink (sotrobot, self.     gripper.link,
-                self.feature.oMja, self.feature.jaJja,
+                self.feature.oMja, None,
                 withMeasurementOfGripperPos)
         # Frame A is the gripper frame
-        self.feature.jaJja.value = np.zeros((6, sotrobot.dynamic.getDimension()))
-        self.feature.jaMfa.value = se3ToTuple(self.gripper.lMf)
+        self.feature.jaMfa.value = self.gripper.lMfHomogeneous
 
         # Joint B is the other gripper link
+        # jbJjb is left unplugged: its Jacobian is considered zero.
         self._plugRobotLink (sotrobot, self.otherGripper.link,
-                self.feature.oMjb, self.feature.jbJjb,
+                self.feature.oMjb, None,
                 withMeasurementOfOtherGripperPos)
-        self.feature.jbJjb.value = np.zeros((6, sotrobot.dynamic.getDimension()))
 
         # Frame B is the handle frame
         # jbMfb = ogMh = ogMo(t) * oMh
         method = 3
         if method == 0: # Works
             # jbMfb        = ogMoh * ohMo * oMh
-            self.feature.jbMfb.value = se3ToTuple (
-                    self.otherGripper.lMf
-                    * self.otherHandle.lMf.inverse()
-                    * self.handle.lMf)
+            self.feature.jbMfb.value = self.otherGripper.relativePose (self.otherHandle,
+                    self.handle).homogeneous
             self.addHppJointTopic (self.handle.fullLink)
         elif method == 1: # Does not work
             # Above, it is assumed that ogMoh = Id, which must be corrected.
@@ -294,7 +295,7 @@ class PreGrasp (Task):
             # ogMo
             self._defaultValue, signals = \
                     self.makeTfListenerDefaultValue(name+"_defaultValue",
-                            self.otherGripper.lMf * self.otherHandle.lMf.inverse(),
+                            self.otherGripper.relativePose(self.otherHandle),
                             outputs = self.jbMfb.sin0)
             self.addTfListenerTopic (
                     self.otherHandle.fullLink + self.meas_suffix + "_wrt_" + self.otherGripper.link + self.meas_suffix,
@@ -305,30 +306,25 @@ class PreGrasp (Task):
 
             self.addHppJointTopic (self.handle.fullLink)
         elif method == 3:
-            self.feature.jbMfb.value = se3ToTuple (self.otherGripper.lMf
-                    * self.otherHandle.lMf.inverse() * self.handle.lMf)
+            self.feature.jbMfb.value = self.otherGripper.relativePose (self.otherHandle,
+                    self.handle).homogeneous
             self.addHppJointTopic (self.handle.fullLink)
 
         # Compute desired pose between gripper and handle.
         # Creates the entity faMfbDes
-        self._referenceSignal (name, self.gripper, self.handle)
-        plug(self.faMfbDes.sout, self.feature.faMfbDes)
+        self._referenceSignal (name, self.gripper, self.handle, withDerivative)
 
         # Create a task and gain
         self._createTaskAndGain (name)
 
-        if withDerivative:
-            print("Relative pose constraint with derivative is not implemented yet.")
-        self.task.setWithDerivative (False)
+        self.task.setWithDerivative (withDerivative)
 
         self.tasks = [ self.task ]
-        # TODO Add velocity
 
     ## Placement case.
     ## An example:
     ## - the pair (gripper, handle) is the environment and an object,
     ## - the pair (otherGripper, otherHandle) is the robot end effector and the same object.
-    ## \todo implement tracking of velocity
     def _makeAbsoluteBasedOnOther (self, sotrobot,
             withMeasurementOfObjectPos, withMeasurementOfGripperPos,
             withMeasurementOfOtherGripperPos, withDerivative):
@@ -348,8 +344,8 @@ class PreGrasp (Task):
         self._plugObjectLink (sotrobot, self.gripper.fullLink,
                 self.feature.oMja, withMeasurementOfGripperPos)
         # Frame A is the gripper frame
-        self.feature.jaMfa.value = se3ToTuple(self.gripper.lMf)
-        self.feature.jaJja.value = np.zeros((6, sotrobot.dynamic.getDimension()))
+        # jaJja is left unplugged: joint A is fixed.
+        self.feature.jaMfa.value = self.gripper.lMfHomogeneous
 
         # Joint B is the other gripper link
         self._plugRobotLink (sotrobot, self.otherGripper.link,
@@ -387,7 +383,7 @@ class PreGrasp (Task):
                 # We use TF to get the position of the otherHandle wrt to the otherGripper
                 self._defaultValue, signals = \
                         self.makeTfListenerDefaultValue(name+"_defaultValue",
-                                self.otherGripper.lMf * self.otherHandle.lMf.inverse(),
+                                self.otherGripper.relativePose(self.otherHandle),
                                 outputs = self.jbMfb.sin0)
                 self.addTfListenerTopic (
                         self.otherHandle.fullLink + self.meas_suffix + "_wrt_" + self.otherGripper.link + self.meas_suffix,
@@ -396,16 +392,22 @@ class PreGrasp (Task):
                         signalGetters = [ signals, ],
                         )
             else:
-                ogMo = matrixHomoProduct(name + "_jbMfb_meas",
-                        matrixHomoInverse (self.otherGripper.link + "_inv", sotrobot.dynamic.signal(self.otherGripper.link)).sout,
+                # ogMc does not depend on the handle so it is shared by all
+                # tasks: the entities are reused if they exist.
+                ogMc = matrixHomoProduct(self.otherGripper.link + "_M_" + sotrobot.camera_frame,
+                        matrixHomoInverse (self.otherGripper.link + "_inv",
+                            sotrobot.dynamic.signal(self.otherGripper.link), check=False).sout,
                         sotrobot.dynamic.signal(sotrobot.camera_frame),
+                        check=False)
+                ogMo = matrixHomoProduct(name + "_jbMfb_meas",
+                        ogMc.sout,
                         None, # Tf
                         self.handle.lMf,
                         check=True,)
                 if_ = entityIfMatrixHomo (name + "_jbMfb_cond",
                         condition=None,
                         value_then=ogMo.sout,
-                        value_else=self.otherGripper.lMf * self.otherHandle.lMf.inverse() * self.handle.lMf,
+                        value_else=self.otherGripper.relativePose(self.otherHandle, self.handle),
                         check=True)
                 plug(if_.out, self.feature.jbMfb)
                 # We use TF to get the position of the otherHandle wrt to the camera
@@ -418,22 +420,19 @@ class PreGrasp (Task):
                         self.otherHandle.fullLink + self.meas_suffix,
                         frame0 = sotrobot.camera_frame,
                         frame1 = self.handle.fullLink + self.meas_suffix,
-                        signalGetters = [ (ogMo.sin2, if_.condition), ],
+                        signalGetters = [ (ogMo.sin1, if_.condition), ],
                         )
 
             self.addHppJointTopic (self.handle.fullLink)
 
         # Compute desired pose between gripper and handle.
         # Creates the entity faMfbDes
-        self._referenceSignal (name, self.gripper, self.handle)
-        plug(self.faMfbDes.sout, self.feature.faMfbDes)
+        self._referenceSignal (name, self.gripper, self.handle, withDerivative)
 
         # Create a task and gain
         self._createTaskAndGain (name)
 
-        if withDerivative:
-            print("Relative pose constraint with derivative is not implemented yet.")
-        self.task.setWithDerivative (False)
+        self.task.setWithDerivative (withDerivative)
 
         self.tasks = [ self.task ]
 
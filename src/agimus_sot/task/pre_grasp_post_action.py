@@ -24,15 +24,13 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-import numpy as np
 from dynamic_graph import plug
 from dynamic_graph.sot.core.feature_pose import FeaturePose
 from . import SotTask
 
 from .task import Task
 from dynamic_graph.entity import Entity
-from agimus_sot.tools import _createOpPoint, assertEntityDoesNotExist, \
-    matrixHomoInverse, matrixHomoProduct, se3ToTuple
+from agimus_sot.tools import _createOpPoint
 
 ## \brief A post-action for pregrasp and preplace task.
 #
@@ -84,9 +82,8 @@ class PreGraspPostAction (Task):
             _createOpPoint (sotrobot, gripper.link)
             plug(sotrobot.dynamic.signal(gripper.link), self.feature.oMjb)
             plug(sotrobot.dynamic.signal("J"+gripper.link), self.feature.jbJjb)
-            self.feature.jbMfb.value = se3ToTuple(gripper.lMf)
-
-            self.feature.jaJja.value = np.zeros((6, sotrobot.dynamic.getDimension()))
+            self.feature.jbMfb.value = gripper.lMfHomogeneous
+            # jaJja is left unplugged: joint A is fixed.
 
         self._createTaskAndGain(name)
         self.tasks = [ self.task, ]
@@ -104,11 +101,11 @@ class PreGraspPostAction (Task):
 
             plug(sotrobot.dynamic.signal(self.gripper.link), self.feature.oMja)
             plug(sotrobot.dynamic.signal("J"+self.gripper.link), self.feature.jaJja)
-            self.feature.jaMfa.value = se3ToTuple(self.gripper.lMf)
+            self.feature.jaMfa.value = self.gripper.lMfHomogeneous
 
             plug(sotrobot.dynamic.signal(self.otherGripper.link), self.feature.oMjb)
             plug(sotrobot.dynamic.signal("J"+self.otherGripper.link), self.feature.jbJjb)
-            self.feature.jbMfb.value = se3ToTuple(self.otherGripper.lMf)
+            self.feature.jbMfb.value = self.otherGripper.lMfHomogeneous
 
         self._createTaskAndGain(name)
         self.tasks = [ self.task, ]
@@ -24,6 +24,23 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+def _assertTopicsCanBeMerged (k, a, v):
+    assert a["type"] == v["type"]
+    if a.has_key('topic'): assert a["topic"] == v["topic"]
+    else: assert a["handler"] == v["handler"]
+    if a.has_key('defaultValue') and v.has_key("defaultValue"):
+        from dynamic_graph.signal_base import SignalBase
+        if isinstance(a["defaultValue"], SignalBase):
+            assert a["defaultValue"].name == v["defaultValue"].name, \
+                    "topics " + k + " cannot be merged because the default values are " \
+                    + "different: \n" + str(a["defaultValue"]) \
+                    + "\nand\n" + str(v["defaultValue"])
+        else:
+            assert a["defaultValue"] == v["defaultValue"], \
+                    "topics " + k + " cannot be merged because the default values are " \
+                    + "different: \n" + str(a["defaultValue"]) \
+                    + "\nand\n" + str(v["defaultValue"])
+
 ## Wrapper of a task in SoT and its interface with ROS
 #
 # This class represents a task as defined in the Stack of Tasks
@@ -81,23 +98,8 @@ class Task(object):
         self.constraints += other.constraints
         for k,v in other.topics.items():
             if self.topics.has_key(k):
-                a = self.topics[k]
-                assert a["type"] == v["type"]
-                if a.has_key('topic'): assert a["topic"] == v["topic"]
-                else: assert a["handler"] == v["handler"]
+                _assertTopicsCanBeMerged (k, self.topics[k], v)
                 self.extendSignalGetters(k, v["signalGetters"])
-                if a.has_key('defaultValue') and v.has_key("defaultValue"):
-                    from dynamic_graph.signal_base import SignalBase
-                    if isinstance(a["defaultValue"], SignalBase):
-                        assert a["defaultValue"].name == v["defaultValue"].name, \
-                                "topics " + k + " cannot be merged because the default values are " \
-                                + "different: \n" + str(a["defaultValue"]) \
-                                + "\nand\n" + str(v["defaultValue"])
-                    else:
-                        assert a["defaultValue"] == v["defaultValue"], \
-                                "topics " + k + " cannot be merged because the default values are " \
-                                + "different: \n" + str(a["defaultValue"]) \
-                                + "\nand\n" + str(v["defaultValue"])
                 # print k, "has", len(a["signalGetters"]), "signals"
             else:
                 self.topics[k] = v
@@ -117,6 +119,7 @@ class Task(object):
         """
         for t in self.tasks:
             solver.push(t)
+        solver.endGroup()
         if self.projector is not None:
             solver.setProjector(self.projector)
 
@@ -209,3 +212,65 @@ class Task(object):
 
     def _name (self, *args):
         return self.sep.join ((self.name_prefix,) + args)
+
+## Immutable stack of Task
+#
+# A TaskStack is a node in a tree whose root is the empty stack. Adding a
+# Task to a node returns the child node corresponding to this Task, which
+# is created only once. Thus, stacking the same sequence of Task objects on
+# the same root gives the same TaskStack object and two stacks can be
+# compared by identity. The topic descriptions are copied so that
+# modifying the stacked Task objects does not modify the stack.
+#
+# \code{.py}
+# root = TaskStack()
+# a = root + t1 + t2
+# b = root + t1 + t2
+# assert a is b
+# \endcode
+#
+# \warning The stacked Task objects must not be modified afterwards.
+class TaskStack(Task):
+    def __init__ (self, parent = None, other = None):
+        self._children = {}
+        if parent is None:
+            self.tasks = ()
+            self.constraints = ()
+            self.topics = {}
+            self.projector = None
+            return
+
+        self.tasks = parent.tasks + tuple(other.tasks)
+        self.constraints = parent.constraints + tuple(other.constraints)
+        if parent.projector is None:
+            self.projector = other.projector
+        elif other.projector is not None:
+            raise ValueError('Cannot merge Task when both have a projector')
+        else:
+            self.projector = parent.projector
+
+        self.topics = dict( (k, dict(v)) for k, v in parent.topics.items() )
+        for k,v in other.topics.items():
+            a = self.topics.get(k)
+            if a is None:
+                self.topics[k] = dict(v)
+            else:
+                _assertTopicsCanBeMerged (k, a, v)
+                a["signalGetters"] = a["signalGetters"].union (v["signalGetters"])
+
+    def __add__ (self, other):
+        # Task objects are hashed by identity.
+        try:
+            return self._children[other]
+        except KeyError:
+            node = TaskStack (self, other)
+            self._children[other] = node
+            return node
+
+    def __iadd__ (self, other):
+        return self + other
+
+    def _immutable (self, *args, **kwargs):
+        raise TypeError ("TaskStack is immutable")
+
+    extendSignalGetters = addHppJointTopic = addTfListenerTopic = _immutable
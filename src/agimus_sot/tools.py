@@ -24,6 +24,7 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import numpy as np
 from dynamic_graph import plug
 
 def getTimerType (type):
@@ -82,23 +83,94 @@ def parseHppName (hppjointname):
 
 def transQuatToSE3 (p):
     from pinocchio import SE3, Quaternion
-    from numpy import matrix
     if len(p) != 7:
         raise ValueError("Cannot convert {} to SE3".format(p))
-    return SE3 (Quaternion (p[6],p[3],p[4],p[5]).matrix(), matrix(p[0:3]).transpose())
+    return SE3 (Quaternion (p[6],p[3],p[4],p[5]).matrix(), np.array(p[0:3], dtype=float))
 
 def se3ToTuple (M):
     import warnings
     warnings.warn("use M.homogeneous", DeprecationWarning)
     return M.homogeneous
 
+## Index of the joints and frames of a pinocchio model.
+#
+# Lookups are done once per model. Use modelIndex to get the index
+# shared by all the users of a model.
+class ModelIndex(object):
+    def __init__ (self, model):
+        self.nq = model.nq
+        self.nv = model.nv
+        ## Names of the joints, except the universe.
+        self.jointNames = list(model.names[1:])
+        ## joint name -> (idx_q, idx_v, nq, nv)
+        self.joints = dict()
+        for j in model.joints[1:]:
+            self.joints[model.names[j.id]] = (j.idx_q, j.idx_v, j.nq, j.nv)
+        ## frame name -> (frame id, parent joint name, placement in parent joint)
+        # As model.getFrameId, the first frame of a given name is kept.
+        self.frames = dict()
+        for i, f in enumerate(model.frames):
+            if f.name not in self.frames:
+                self.frames[f.name] = (i, model.names[f.parent], f.placement)
+
+    def joint (self, name):
+        try:
+            return self.joints[name]
+        except KeyError:
+            raise ValueError("Joint " + name + " not found")
+
+    def frame (self, name):
+        try:
+            return self.frames[name]
+        except KeyError:
+            raise ValueError("Link " + name + " not found")
+
+    ## List of (idx_v, nv) of the joints.
+    def velocityRanges (self, jointNames):
+        return [ self.joint(n)[1:4:2] for n in jointNames ]
+
+    ## Boolean array of size nv, True for the DoF of the joints.
+    # Joints which are not in the model are ignored.
+    def velocityMask (self, jointNames):
+        mask = np.zeros(self.nv, dtype=bool)
+        for idx_v, nv in self.velocityRanges(
+                [ n for n in jointNames if n in self.joints ]):
+            mask[idx_v:idx_v+nv] = True
+        return mask
+
+    ## Matrix selecting the DoF of the joints, in the order of jointNames.
+    # \return a KxN matrix, where K is the number of DoF of the joints and
+    #         N the number of DoF of the robot.
+    def selectionMatrix (self, jointNames):
+        cols = [ i for idx_v, nv in self.velocityRanges(jointNames)
+                for i in range(idx_v, idx_v+nv) ]
+        return np.identity(self.nv)[cols, :]
+
+## ModelIndex of each model.
+# - key: id of the model,
+# - value: (model, ModelIndex). The model is kept so that its id is not reused.
+_modelIndices = dict()
+
+## Get the ModelIndex of a pinocchio model.
+def modelIndex (model):
+    entry = _modelIndices.get(id(model))
+    if entry is None:
+        entry = (model, ModelIndex(model))
+        _modelIndices[id(model)] = entry
+    return entry[1]
+
 def computeControlSelection (robot, joint_to_be_removed):
-    pinmodel = robot.dynamic.model
-    selection = ["1",] * pinmodel.nv
-    for j in filter(lambda x: pinmodel.names[x.id] in joint_to_be_removed, pinmodel.joints[1:]):
-        selection[j.idx_v:j.idx_v+j.nv] = ["0",] * j.nv
-    selection.reverse()
-    return "".join(selection)
+    mask = modelIndex(robot.dynamic.model).velocityMask(joint_to_be_removed)
+    return "".join("0" if m else "1" for m in mask[::-1])
+
+## Projector onto the velocity space of the joints which are not removed.
+# \param joint_to_be_removed names of the joints, as in computeControlSelection.
+# \return a NxK matrix, where N is the number of DoF of the robot and K the
+#         number of DoF of the joints that are kept.
+def computeProjector (robot, joint_to_be_removed):
+    index = modelIndex(robot.dynamic.model)
+    keep = ~index.velocityMask(joint_to_be_removed)
+    return np.identity(index.nv)[:, keep]
 
 def _createOpPoint (robot, name):
     if not robot.dynamic.hasSignal(name):
@@ -107,7 +179,7 @@ def _createOpPoint (robot, name):
 def plugMatrixHomo(sigout, sigin):
     from dynamic_graph.signal_base import SignalBase
     from pinocchio import SE3
-    if isinstance(sigout, tuple):
+    if isinstance(sigout, (tuple, np.ndarray)):
         sigin.value = np.array(sigout)
     elif isinstance(sigout, SE3):
         sigin.value = sigout.homogeneous
@@ -0,0 +1,134 @@
+// Copyright 2018 CNRS - Airbus SAS
+// Author: Joseph Mirabel
+//
+// Redistribution and use in source and binary forms, with or without
+// modification, are permitted provided that the following conditions are
+// met:
+
+// 1. Redistributions of source code must retain the above copyright
+// notice, this list of conditions and the following disclaimer.
+
+// 2. Redistributions in binary form must reproduce the above copyright
+// notice, this list of conditions and the following disclaimer in the
+// documentation and/or other materials provided with the distribution.
+
+// THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+// "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+// LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+// A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+// HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+// SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+// LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+// DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+// THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+// (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+// OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#include <dynamic-graph/entity.h>
+#include <dynamic-graph/signal.h>
+#include <dynamic-graph/signal-ptr.h>
+#include <dynamic-graph/factory.h>
+#include <dynamic-graph/command-bind.h>
+
+#include <agimus/sot/config.hh>
+
+#include "convergence-detector.hh"
+
+namespace dynamicgraph {
+  namespace agimus {
+      /// ConvergenceDetector
+      class AGIMUS_SOT_DLLAPI ConvergenceDetector : public dynamicgraph::Entity
+      {
+        DYNAMIC_GRAPH_ENTITY_DECL();
+
+        public:
+        ConvergenceDetector (const std::string& name) :
+          Entity (name),
+          last (-1),
+          errorSIN (NULL, "ConvergenceDetector("+name+")::input(double)::error"),
+          startSIN (NULL, "ConvergenceDetector("+name+")::input(int)::start"),
+          convergedSOUT ("ConvergenceDetector("+name+")::output(bool)::converged"),
+          sinceSOUT ("ConvergenceDetector("+name+")::output(int)::since")
+        {
+          convergedSOUT.setFunction (boost::bind (&ConvergenceDetector::convergedF, this, _1, _2));
+          sinceSOUT    .setFunction (boost::bind (&ConvergenceDetector::sinceF    , this, _1, _2));
+          signalRegistration (errorSIN << startSIN << convergedSOUT << sinceSOUT);
+          startSIN.setConstant (0);
+
+          using command::makeCommandVoid1;
+          using command::makeCommandVoid2;
+          std::string docstring =
+            "\n"
+            "    Set the thresholds\n"
+            "      - input: converged becomes true when the error is below it,\n"
+            "      - output: converged becomes false when the error is above it.\n";
+          addCommand ("setThresholds", makeCommandVoid2
+              (*this, &ConvergenceDetector::setThresholds, docstring));
+          docstring =
+            "\n"
+            "    Set the number of iterations during which the error must be\n"
+            "    below the input threshold\n";
+          addCommand ("setWindow", makeCommandVoid1
+              (*this, &ConvergenceDetector::setWindow, docstring));
+        }
+
+        ~ConvergenceDetector () {}
+
+        /// Header documentation of the python class
+        virtual std::string getDocString () const
+        {
+          return
+            "Detect the convergence of an error, with hysteresis.\n"
+            "The meaning of the signals is:\n"
+            "- converged: true when error has been below the input threshold\n"
+            "  during the last window iterations, until error goes above the\n"
+            "  output threshold.\n"
+            "- since: time at which error went below the input threshold for\n"
+            "  the current convergence, -1 if it is not below it.\n"
+            "Iterations before time start are not counted in the window, so\n"
+            "that the convergence is measured from the activation of the task,\n"
+            "whether or not the error was computed before.\n"
+            "Iterations at which the error is not computed are ignored.\n"
+            ;
+        }
+
+        void setThresholds (const double& in, const double& out)
+        {
+          convergence.setThresholds (in, out);
+        }
+
+        void setWindow (const int& w) { convergence.setWindow (w); }
+
+        private:
+        void update (const int& t)
+        {
+          if (t == last) return;
+          last = t;
+          convergence.compute (errorSIN (t), startSIN (t), t);
+        }
+
+        bool& convergedF (bool& res, const int& t)
+        {
+          update (t);
+          res = convergence.converged();
+          return res;
+        }
+
+        int& sinceF (int& res, const int& t)
+        {
+          update (t);
+          res = convergence.since();
+          return res;
+        }
+
+        condition::Convergence convergence;
+        int last;
+        SignalPtr <double, int> errorSIN;
+        SignalPtr <int, int> startSIN;
+        Signal <bool, int> convergedSOUT;
+        Signal <int, int> sinceSOUT;
+      };
+
+      DYNAMICGRAPH_FACTORY_ENTITY_PLUGIN (ConvergenceDetector, "ConvergenceDetector");
+  } // namespace agimus
+} // namespace dynamicgraph
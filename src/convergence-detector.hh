@@ -0,0 +1,92 @@
+// Copyright 2018 CNRS - Airbus SAS
+// Author: Joseph Mirabel
+//
+// Redistribution and use in source and binary forms, with or without
+// modification, are permitted provided that the following conditions are
+// met:
+
+// 1. Redistributions of source code must retain the above copyright
+// notice, this list of conditions and the following disclaimer.
+
+// 2. Redistributions in binary form must reproduce the above copyright
+// notice, this list of conditions and the following disclaimer in the
+// documentation and/or other materials provided with the distribution.
+
+// THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+// "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+// LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+// A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+// HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+// SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+// LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+// DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+// THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+// (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+// OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#ifndef AGIMUS_SOT_CONVERGENCE_DETECTOR_HH
+# define AGIMUS_SOT_CONVERGENCE_DETECTOR_HH
+
+#include <algorithm>
+
+namespace dynamicgraph {
+  namespace agimus {
+    namespace condition {
+      /// Convergence of an error, with hysteresis.
+      ///
+      /// See entity ConvergenceDetector.
+      class Convergence
+      {
+        public:
+        Convergence () :
+          thrIn_ (1e-3), thrOut_ (2e-3), window_ (0), below_ (-1),
+          converged_ (false)
+        {}
+
+        /// \param in converged becomes true when the error is below it,
+        /// \param out converged becomes false when the error is above it.
+        ///        It is at least \c in.
+        void setThresholds (const double& in, const double& out)
+        {
+          thrIn_ = in;
+          thrOut_ = std::max (in, out);
+        }
+
+        /// Number of iterations during which the error must be below the
+        /// input threshold.
+        void setWindow (const int& w) { window_ = w; }
+
+        /// Update with the error e at time t.
+        /// \param start iterations before start are not counted in the
+        ///        window.
+        /// \return whether the error has converged.
+        bool compute (const double& e, const int& start, const int& t)
+        {
+          if (converged_ ? (e > thrOut_) : (e >= thrIn_)) {
+            converged_ = false;
+            below_ = -1;
+            return converged_;
+          }
+          if (below_ < 0) below_ = t;
+          // The error was below the threshold at iterations from, ..., t.
+          const int from = std::max (below_, start);
+          converged_ = (t >= from) && (t - from + 1 >= window_);
+          return converged_;
+        }
+
+        const bool& converged () const { return converged_; }
+
+        /// Time at which the error went below the input threshold, -1 if
+        /// it is not below it.
+        const int& since () const { return below_; }
+
+        private:
+        double thrIn_, thrOut_;
+        int window_, below_;
+        bool converged_;
+      };
+    } // namespace condition
+  } // namespace agimus
+} // namespace dynamicgraph
+
+#endif // AGIMUS_SOT_CONVERGENCE_DETECTOR_HH
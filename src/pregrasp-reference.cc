@@ -0,0 +1,241 @@
+// Copyright 2018 CNRS - Airbus SAS
+// Author: Joseph Mirabel
+//
+// Redistribution and use in source and binary forms, with or without
+// modification, are permitted provided that the following conditions are
+// met:
+
+// 1. Redistributions of source code must retain the above copyright
+// notice, this list of conditions and the following disclaimer.
+
+// 2. Redistributions in binary form must reproduce the above copyright
+// notice, this list of conditions and the following disclaimer in the
+// documentation and/or other materials provided with the distribution.
+
+// THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+// "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+// LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+// A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+// HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+// SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+// LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+// DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+// THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+// (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+// OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#include <dynamic-graph/entity.h>
+#include <dynamic-graph/signal.h>
+#include <dynamic-graph/signal-ptr.h>
+#include <dynamic-graph/factory.h>
+#include <dynamic-graph/command-bind.h>
+#include <dynamic-graph/linear-algebra.h>
+
+#include <sot/core/matrix-geometry.hh>
+
+#include <agimus/sot/config.hh>
+
+#include "pregrasp-reference.hh"
+
+namespace dynamicgraph {
+  namespace agimus {
+      using sot::MatrixHomogeneous;
+
+      /// Desired pose of a gripper frame with respect to a handle frame.
+      ///
+      /// Computes \f$ jaMfa^{-1} * oMja^{-1} * oMjb * jbMfb \f$ in one step.
+      /// This replaces an inverse entity and a product entity of four
+      /// operands.
+      ///
+      /// The desired velocity of fb with respect to fa, expressed in fb,
+      /// is computed from the velocities of ja and jb, expressed in their
+      /// own frame. They default to zero.
+      ///
+      /// The last value of faMfbDes is kept until one of the input poses is
+      /// updated.
+      class AGIMUS_SOT_DLLAPI PreGraspReference : public dynamicgraph::Entity
+      {
+        DYNAMIC_GRAPH_ENTITY_DECL();
+
+        PreGraspReference (const std::string& name) :
+          Entity (name),
+          oMjaSIN (NULL, "PreGraspReference("+name+")::input(matrixHomo)::oMja"),
+          jaMfaSIN(NULL, "PreGraspReference("+name+")::input(matrixHomo)::jaMfa"),
+          oMjbSIN (NULL, "PreGraspReference("+name+")::input(matrixHomo)::oMjb"),
+          jbMfbSIN(NULL, "PreGraspReference("+name+")::input(matrixHomo)::jbMfb"),
+          vjaSIN  (NULL, "PreGraspReference("+name+")::input(vector)::vja"),
+          vjbSIN  (NULL, "PreGraspReference("+name+")::input(vector)::vjb"),
+          faMfbDesSOUT ("PreGraspReference("+name+")::output(matrixHomo)::sout"),
+          faNufafbDesSOUT ("PreGraspReference("+name+")::output(vector)::faNufafbDes")
+        {
+          faMfbDesSOUT.setFunction
+            (boost::bind (&PreGraspReference::computeReference, this, _1, _2));
+          faNufafbDesSOUT.setFunction
+            (boost::bind (&PreGraspReference::computeVelocity, this, _1, _2));
+          vjaSIN.setConstant (Vector::Zero(6));
+          vjbSIN.setConstant (Vector::Zero(6));
+          signalRegistration (oMjaSIN << jaMfaSIN << oMjbSIN << jbMfbSIN
+              << vjaSIN << vjbSIN << faMfbDesSOUT << faNufafbDesSOUT);
+        }
+
+        ~PreGraspReference () {}
+
+        /// Header documentation of the python class
+        virtual std::string getDocString () const
+        {
+          return
+            "Compute the desired relative pose faMfbDes of frame fb in frame fa.\n"
+            "  sout = jaMfa^-1 * oMja^-1 * oMjb * jbMfb\n"
+            "where oMja and oMjb are the desired poses of joints ja and jb\n"
+            "and jaMfa and jbMfb are constant.\n"
+            "  faNufafbDes = fbXjb * vjb - fbXja * vja\n"
+            "where vja and vjb are the desired velocities of joints ja and jb,\n"
+            "expressed in their own frame. They default to zero.\n";
+        }
+
+        private:
+        MatrixHomogeneous& computeReference (MatrixHomogeneous& res, const int& time)
+        {
+          const MatrixHomogeneous& oMja  = oMjaSIN .access (time);
+          const MatrixHomogeneous& jaMfa = jaMfaSIN.access (time);
+          const MatrixHomogeneous& oMjb  = oMjbSIN .access (time);
+          const MatrixHomogeneous& jbMfb = jbMfbSIN.access (time);
+
+          const int times[4] = { oMjaSIN.getTime(), jaMfaSIN.getTime(),
+            oMjbSIN.getTime(), jbMfbSIN.getTime() };
+          if (last_.changed (times))
+            faMfb_ = pregrasp::relativePose (oMja, jaMfa, oMjb, jbMfb);
+          res = faMfb_;
+          return res;
+        }
+
+        Vector& computeVelocity (Vector& res, const int& time)
+        {
+          const MatrixHomogeneous& faMfb = faMfbDesSOUT.access (time);
+          const MatrixHomogeneous& jaMfa = jaMfaSIN.access (time);
+          const MatrixHomogeneous& jbMfb = jbMfbSIN.access (time);
+
+          pregrasp::relativeVelocity (jaMfa, faMfb, jbMfb,
+              vjaSIN.access (time), vjbSIN.access (time), res);
+          return res;
+        }
+
+        SignalPtr <MatrixHomogeneous, int> oMjaSIN, jaMfaSIN, oMjbSIN, jbMfbSIN;
+        SignalPtr <Vector, int> vjaSIN, vjbSIN;
+        Signal <MatrixHomogeneous, int> faMfbDesSOUT;
+        Signal <Vector, int> faNufafbDesSOUT;
+
+        pregrasp::LastOperands<4> last_;
+        MatrixHomogeneous faMfb_;
+
+        public:
+        EIGEN_MAKE_ALIGNED_OPERATOR_NEW
+      };
+
+      /// Pose of a measured frame in the world frame, with a fallback value.
+      ///
+      /// Computes \f$ wMc * cMf \f$ when the measurement is available and
+      /// returns the fallback value otherwise. Only the inputs that are
+      /// needed are recomputed.
+      ///
+      /// The measurement cMf is \c delay ticks old. When a history is kept
+      /// (see command setHistorySize), the camera pose at the time of the
+      /// measurement is used instead of the current one. If the measured
+      /// frame is on the robot, input \c wMk can be plugged to the pose of
+      /// its link computed by the kinematics. The measurement is then
+      /// propagated to the current time using the motion of this link.
+      ///
+      /// The last value is kept until one of the operands is updated, i.e.
+      /// until a new measurement arrives or the camera moves.
+      class AGIMUS_SOT_DLLAPI MeasuredPose : public dynamicgraph::Entity
+      {
+        DYNAMIC_GRAPH_ENTITY_DECL();
+
+        MeasuredPose (const std::string& name) :
+          Entity (name),
+          wMcSIN      (NULL, "MeasuredPose("+name+")::input(matrixHomo)::wMc"),
+          cMfSIN      (NULL, "MeasuredPose("+name+")::input(matrixHomo)::cMf"),
+          availableSIN(NULL, "MeasuredPose("+name+")::input(bool)::available"),
+          fallbackSIN (NULL, "MeasuredPose("+name+")::input(matrixHomo)::fallback"),
+          wMkSIN      (NULL, "MeasuredPose("+name+")::input(matrixHomo)::wMk"),
+          delaySIN    (NULL, "MeasuredPose("+name+")::input(int)::delay"),
+          wMfSOUT ("MeasuredPose("+name+")::output(matrixHomo)::sout")
+        {
+          wMfSOUT.setFunction
+            (boost::bind (&MeasuredPose::computePose, this, _1, _2));
+          delaySIN.setConstant (0);
+          signalRegistration (wMcSIN << cMfSIN << availableSIN << fallbackSIN
+              << wMkSIN << delaySIN << wMfSOUT);
+
+          std::string docstring =
+            "\n"
+            "    Set the number of ticks of the history of the camera pose\n"
+            "    (and of input wMk, if plugged).\n"
+            "    It must be greater than the delay.\n";
+          addCommand ("setHistorySize", command::makeCommandVoid1
+              (*this, &MeasuredPose::setHistorySize, docstring));
+        }
+
+        ~MeasuredPose () {}
+
+        /// Header documentation of the python class
+        virtual std::string getDocString () const
+        {
+          return
+            "Compute the pose of a measured frame f in the world frame.\n"
+            "  sout = wMc * cMf if available else fallback\n"
+            "where c is the camera frame.\n"
+            "If a history is kept, wMc is taken delay ticks in the past and,\n"
+            "if wMk is plugged,\n"
+            "  sout = wMk(t) * wMk(t-delay)^-1 * wMc(t-delay) * cMf\n";
+        }
+
+        void setHistorySize (const int& size)
+        {
+          pose_.setHistorySize (size);
+        }
+
+        private:
+        MatrixHomogeneous& computePose (MatrixHomogeneous& res, const int& time)
+        {
+          using pregrasp::Operand;
+          const bool kinematic = wMkSIN.isPlugged();
+          if (pose_.historySize() > 0) {
+            Operand wMc (wMcSIN.access (time), wMcSIN.getTime());
+            if (kinematic) {
+              Operand wMk (wMkSIN.access (time), wMkSIN.getTime());
+              pose_.record (time, wMc, &wMk);
+            } else
+              pose_.record (time, wMc, NULL);
+          }
+
+          if (!availableSIN.access (time)) {
+            res = fallbackSIN.access (time);
+            return res;
+          }
+          Operand wMc (wMcSIN.access (time), wMcSIN.getTime());
+          Operand cMf (cMfSIN.access (time), cMfSIN.getTime());
+          if (kinematic) {
+            Operand wMk (wMkSIN.access (time), wMkSIN.getTime());
+            res = pose_.compute (time, delaySIN.access (time), wMc, cMf, &wMk);
+          } else
+            res = pose_.compute (time, delaySIN.access (time), wMc, cMf, NULL);
+          return res;
+        }
+
+        SignalPtr <MatrixHomogeneous, int> wMcSIN, cMfSIN;
+        SignalPtr <bool, int> availableSIN;
+        SignalPtr <MatrixHomogeneous, int> fallbackSIN, wMkSIN;
+        SignalPtr <int, int> delaySIN;
+        Signal <MatrixHomogeneous, int> wMfSOUT;
+
+        pregrasp::MeasuredPose pose_;
+
+        public:
+        EIGEN_MAKE_ALIGNED_OPERATOR_NEW
+      };
+
+      DYNAMICGRAPH_FACTORY_ENTITY_PLUGIN (PreGraspReference, "PreGraspReference");
+      DYNAMICGRAPH_FACTORY_ENTITY_PLUGIN (MeasuredPose, "MeasuredPose");
+  } // namespace agimus
+} // namespace dynamicgraph
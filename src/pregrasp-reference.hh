@@ -0,0 +1,201 @@
+// Copyright 2018 CNRS - Airbus SAS
+// Author: Joseph Mirabel
+//
+// Redistribution and use in source and binary forms, with or without
+// modification, are permitted provided that the following conditions are
+// met:
+
+// 1. Redistributions of source code must retain the above copyright
+// notice, this list of conditions and the following disclaimer.
+
+// 2. Redistributions in binary form must reproduce the above copyright
+// notice, this list of conditions and the following disclaimer in the
+// documentation and/or other materials provided with the distribution.
+
+// THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+// "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+// LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+// A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+// HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+// SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+// LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+// DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+// THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+// (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+// OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#ifndef AGIMUS_SOT_PREGRASP_REFERENCE_HH
+# define AGIMUS_SOT_PREGRASP_REFERENCE_HH
+
+#include <vector>
+#include <algorithm>
+
+#include <Eigen/Geometry>
+#include <Eigen/StdVector>
+
+namespace dynamicgraph {
+  namespace agimus {
+    /// Computations of entities PreGraspReference and MeasuredPose.
+    ///
+    /// They only depend on Eigen so that they are unit tested without
+    /// a dynamic-graph.
+    namespace pregrasp {
+      /// Same type as sot::MatrixHomogeneous
+      typedef Eigen::Transform<double, 3, Eigen::Affine> Transform;
+      typedef Eigen::VectorXd Vector;
+
+      /// Action of an homogeneous matrix on a velocity (linear first).
+      inline void act (const Transform& M, const Vector& v, Vector& res)
+      {
+        res.resize (6);
+        res.tail<3>() = M.linear() * v.tail<3>();
+        res.head<3>() = M.linear() * v.head<3>()
+          + M.translation().cross (res.tail<3>());
+      }
+
+      /// Compute \f$ jaMfa^{-1} * oMja^{-1} * oMjb * jbMfb \f$.
+      inline Transform relativePose (const Transform& oMja,
+          const Transform& jaMfa, const Transform& oMjb,
+          const Transform& jbMfb)
+      {
+        return (oMja * jaMfa).inverse (Eigen::Isometry) * oMjb * jbMfb;
+      }
+
+      /// Compute the velocity of fb with respect to fa, expressed in fb,
+      /// from the velocities vja and vjb of ja and jb, expressed in their
+      /// own frame.
+      inline void relativeVelocity (const Transform& jaMfa,
+          const Transform& faMfb, const Transform& jbMfb,
+          const Vector& vja, const Vector& vjb, Vector& res)
+      {
+        Vector vb;
+        act ((jaMfa * faMfb).inverse (Eigen::Isometry), vja, res);
+        act (jbMfb.inverse (Eigen::Isometry), vjb, vb);
+        res = vb - res;
+      }
+
+      /// Times of the operands of the last computation of a signal.
+      ///
+      /// Used to hold the last value of a signal as long as none of its
+      /// operands is updated, which is the case of the visual measurements
+      /// between two camera frames. The time of an operand is the time of
+      /// the last update of the signal it is read from: it only changes
+      /// when a new value is set or computed. The values themselves are
+      /// not compared.
+      template <int N>
+      class LastOperands
+      {
+        public:
+        LastOperands () : valid_ (false) {}
+
+        /// Return true if one of the times differs from the last ones.
+        /// The times are then stored.
+        bool changed (const int times[N])
+        {
+          bool changed = !valid_;
+          for (int i = 0; i < N; ++i) {
+            if (times[i] != times_[i]) {
+              changed = true;
+              times_[i] = times[i];
+            }
+          }
+          valid_ = true;
+          return changed;
+        }
+
+        private:
+        bool valid_;
+        int times_[N];
+      };
+
+      /// A pose and the time of the last update of its signal.
+      struct Operand {
+        const Transform& value;
+        const int time;
+        Operand (const Transform& v, const int& t) : value (v), time (t) {}
+      };
+
+      /// Pose of a measured frame in the world frame.
+      ///
+      /// See entity MeasuredPose.
+      class MeasuredPose
+      {
+        public:
+        struct Sample {
+          int time, wMcTime, wMkTime;
+          Transform wMc, wMk;
+          Sample () : time (-1) {}
+          EIGEN_MAKE_ALIGNED_OPERATOR_NEW
+        };
+        typedef std::vector<Sample, Eigen::aligned_allocator<Sample> > History_t;
+
+        void setHistorySize (const int& size)
+        {
+          history_.assign (std::max (size, 0), Sample());
+        }
+
+        std::size_t historySize () const { return history_.size(); }
+
+        /// Store the camera pose, and the pose of the link if not NULL.
+        void record (const int& time, const Operand& wMc, const Operand* wMk)
+        {
+          if (history_.empty()) return;
+          Sample& s = history_[time % history_.size()];
+          s.time = time;
+          s.wMc = wMc.value;
+          s.wMcTime = wMc.time;
+          if (wMk != NULL) {
+            s.wMk = wMk->value;
+            s.wMkTime = wMk->time;
+          }
+        }
+
+        /// Return the sample recorded at time t or NULL if it was not
+        /// recorded or was overwritten.
+        const Sample* sample (const int& t) const
+        {
+          if (history_.empty() || t < 0) return NULL;
+          const Sample& s = history_[t % history_.size()];
+          return (s.time == t ? &s : NULL);
+        }
+
+        /// Compute the pose of f at time from a measurement cMf which is
+        /// delay ticks old.
+        /// \param wMk the current pose of the link of f, or NULL if f is not
+        ///        on the robot.
+        const Transform& compute (const int& time, const int& delay,
+            const Operand& wMc, const Operand& cMf, const Operand* wMk)
+        {
+          const Sample* past = sample (time - delay);
+          if (past != NULL && wMk != NULL) {
+            const int times[4] = { past->wMcTime, cMf.time, past->wMkTime, wMk->time };
+            if (lastPropagated_.changed (times))
+              propagated_ = wMk->value * past->wMk.inverse (Eigen::Isometry)
+                * past->wMc * cMf.value;
+            return propagated_;
+          }
+          if (past != NULL) {
+            const int times[2] = { past->wMcTime, cMf.time };
+            if (lastDelayed_.changed (times))
+              delayed_ = past->wMc * cMf.value;
+            return delayed_;
+          }
+          const int times[2] = { wMc.time, cMf.time };
+          if (lastDirect_.changed (times))
+            direct_ = wMc.value * cMf.value;
+          return direct_;
+        }
+
+        EIGEN_MAKE_ALIGNED_OPERATOR_NEW
+
+        private:
+        History_t history_;
+        LastOperands<2> lastDirect_, lastDelayed_;
+        LastOperands<4> lastPropagated_;
+        Transform direct_, delayed_, propagated_;
+      };
+    } // namespace pregrasp
+  } // namespace agimus
+} // namespace dynamicgraph
+
+#endif // AGIMUS_SOT_PREGRASP_REFERENCE_HH
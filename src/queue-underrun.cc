@@ -0,0 +1,176 @@
+// Copyright 2018 CNRS - Airbus SAS
+// Author: Joseph Mirabel
+//
+// Redistribution and use in source and binary forms, with or without
+// modification, are permitted provided that the following conditions are
+// met:
+
+// 1. Redistributions of source code must retain the above copyright
+// notice, this list of conditions and the following disclaimer.
+
+// 2. Redistributions in binary form must reproduce the above copyright
+// notice, this list of conditions and the following disclaimer in the
+// documentation and/or other materials provided with the distribution.
+
+// THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+// "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+// LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+// A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+// HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+// SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+// LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+// DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+// THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+// (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+// OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#include <vector>
+
+#include <dynamic-graph/entity.h>
+#include <dynamic-graph/signal.h>
+#include <dynamic-graph/signal-ptr.h>
+#include <dynamic-graph/factory.h>
+#include <dynamic-graph/pool.h>
+#include <dynamic-graph/command.h>
+#include <dynamic-graph/command-bind.h>
+
+#include <agimus/sot/config.hh>
+
+#include "queue-underrun.hh"
+
+namespace dynamicgraph {
+  namespace agimus {
+      /// QueueUnderrun
+      class AGIMUS_SOT_DLLAPI QueueUnderrun : public dynamicgraph::Entity
+      {
+        DYNAMIC_GRAPH_ENTITY_DECL();
+
+        public:
+        QueueUnderrun (const std::string& name) :
+          Entity (name),
+          queueSize (NULL),
+          last (-1),
+          startSIN (NULL, "QueueUnderrun("+name+")::input(int)::start"),
+          endSIN (NULL, "QueueUnderrun("+name+")::input(int)::end"),
+          underrunSOUT ("QueueUnderrun("+name+")::output(bool)::underrun"),
+          timeSOUT ("QueueUnderrun("+name+")::output(int)::time"),
+          queueSOUT ("QueueUnderrun("+name+")::output(string)::queue")
+        {
+          underrunSOUT.setFunction (boost::bind (&QueueUnderrun::underrunF, this, _1, _2));
+          timeSOUT    .setFunction (boost::bind (&QueueUnderrun::timeF    , this, _1, _2));
+          queueSOUT   .setFunction (boost::bind (&QueueUnderrun::queueF   , this, _1, _2));
+          signalRegistration (startSIN << endSIN << underrunSOUT << timeSOUT << queueSOUT);
+          startSIN.setConstant (-1);
+          endSIN.setConstant (-1);
+
+          using command::makeCommandVoid1;
+          std::string docstring =
+            "\n"
+            "    Set the RosQueuedSubscribe entity whose queues are checked\n";
+          addCommand ("setSubscriber", makeCommandVoid1
+              (*this, &QueueUnderrun::setSubscriber, docstring));
+          docstring =
+            "\n"
+            "    Add a queue of the subscriber to the checked queues\n";
+          addCommand ("addQueue", makeCommandVoid1
+              (*this, &QueueUnderrun::addQueue, docstring));
+          docstring =
+            "\n"
+            "    Set the number of iterations before end during which an empty\n"
+            "    queue is not an underrun\n";
+          addCommand ("setMargin", makeCommandVoid1
+              (*this, &QueueUnderrun::setMargin, docstring));
+        }
+
+        ~QueueUnderrun () {}
+
+        /// Header documentation of the python class
+        virtual std::string getDocString () const
+        {
+          return
+            "Detect a queue of a RosQueuedSubscribe entity which runs dry\n"
+            "while it is read.\n"
+            "The queues are expected to contain one value per iteration from\n"
+            "time start to time end. They are not checked outside this\n"
+            "interval, so that nothing is done until start and end are set.\n"
+            "The meaning of the signals is:\n"
+            "- underrun: true when a queue was empty since start and end were\n"
+            "  set.\n"
+            "- time: time of the underrun, -1 if there is none.\n"
+            "- queue: name of the queue which ran dry.\n"
+            "The size of the queues is read with command queueSize of the\n"
+            "subscriber, which must not be called from another thread while\n"
+            "the queues are checked.\n"
+            ;
+        }
+
+        void setSubscriber (const std::string& name)
+        {
+          queueSize = PoolStorage::getInstance()->getEntity (name)
+            .getNewStyleCommand ("queueSize");
+        }
+
+        void addQueue (const std::string& name) { queues.push_back (name); }
+
+        void setMargin (const int& m) { underrun.setMargin (m); }
+
+        private:
+        struct QueueSize {
+          QueueUnderrun* self;
+          std::size_t operator() (const std::size_t& i) const
+          {
+            self->queueSize->setParameterValues (std::vector<command::Value>
+                (1, command::Value (self->queues[i])));
+            const command::Value size (self->queueSize->execute ());
+            if (size.type() == command::Value::INT)
+              return (std::size_t) size.intValue ();
+            return size.unsignedValue ();
+          }
+        };
+
+        void update (const int& t)
+        {
+          if (t == last) return;
+          last = t;
+          const int& start = startSIN (t);
+          const int& end = endSIN (t);
+          if (queueSize == NULL) return;
+          QueueSize size = { this };
+          underrun.compute (t, start, end, queues.size(), size);
+        }
+
+        bool& underrunF (bool& res, const int& t)
+        {
+          update (t);
+          res = (underrun.queue() >= 0);
+          return res;
+        }
+
+        int& timeF (int& res, const int& t)
+        {
+          update (t);
+          res = underrun.time();
+          return res;
+        }
+
+        std::string& queueF (std::string& res, const int& t)
+        {
+          update (t);
+          if (underrun.queue() >= 0) res = queues[underrun.queue()];
+          else res.clear();
+          return res;
+        }
+
+        condition::QueueUnderrun underrun;
+        command::Command* queueSize;
+        std::vector<std::string> queues;
+        int last;
+        SignalPtr <int, int> startSIN, endSIN;
+        Signal <bool, int> underrunSOUT;
+        Signal <int, int> timeSOUT;
+        Signal <std::string, int> queueSOUT;
+      };
+
+      DYNAMICGRAPH_FACTORY_ENTITY_PLUGIN (QueueUnderrun, "QueueUnderrun");
+  } // namespace agimus
+} // namespace dynamicgraph
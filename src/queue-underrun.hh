@@ -0,0 +1,92 @@
+// Copyright 2018 CNRS - Airbus SAS
+// Author: Joseph Mirabel
+//
+// Redistribution and use in source and binary forms, with or without
+// modification, are permitted provided that the following conditions are
+// met:
+
+// 1. Redistributions of source code must retain the above copyright
+// notice, this list of conditions and the following disclaimer.
+
+// 2. Redistributions in binary form must reproduce the above copyright
+// notice, this list of conditions and the following disclaimer in the
+// documentation and/or other materials provided with the distribution.
+
+// THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+// "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+// LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+// A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+// HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+// SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+// LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+// DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+// THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+// (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+// OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#ifndef AGIMUS_SOT_QUEUE_UNDERRUN_HH
+# define AGIMUS_SOT_QUEUE_UNDERRUN_HH
+
+#include <cstddef>
+
+namespace dynamicgraph {
+  namespace agimus {
+    namespace condition {
+      /// Detection of a queue which runs dry while it is read.
+      ///
+      /// See entity QueueUnderrun.
+      class QueueUnderrun
+      {
+        public:
+        QueueUnderrun () :
+          margin_ (0), start_ (-1), end_ (-1), time_ (-1), queue_ (-1)
+        {}
+
+        /// Number of iterations before end during which an empty queue is
+        /// not an underrun.
+        void setMargin (const int& m) { margin_ = m; }
+
+        /// Check the size of the queues at time t.
+        /// \param start, end the queues are expected to contain one value
+        ///        per iteration from start to end. The queues are not
+        ///        checked outside this interval.
+        /// \param nQueues number of queues.
+        /// \param size functor such that size(i) is the size of queue i.
+        ///        It is only called while the queues are checked.
+        /// \return true if a queue ran dry since start and end were set.
+        template <typename QueueSize>
+        bool compute (const int& t, const int& start, const int& end,
+            const std::size_t& nQueues, QueueSize size)
+        {
+          if (start != start_ || end != end_) {
+            start_ = start;
+            end_ = end;
+            time_ = -1;
+            queue_ = -1;
+          }
+          if (queue_ >= 0) return true;
+          if (t < start || t + margin_ >= end) return false;
+          for (std::size_t i = 0; i < nQueues; ++i) {
+            if (size (i) == 0) {
+              time_ = t;
+              queue_ = (int)i;
+              return true;
+            }
+          }
+          return false;
+        }
+
+        /// Time of the underrun, -1 if there is none.
+        const int& time () const { return time_; }
+
+        /// Index of the queue which ran dry, -1 if there is none.
+        const int& queue () const { return queue_; }
+
+        private:
+        int margin_, start_, end_, time_, queue_;
+      };
+    } // namespace condition
+  } // namespace agimus
+} // namespace dynamicgraph
+
+#endif // AGIMUS_SOT_QUEUE_UNDERRUN_HH
@@ -0,0 +1,91 @@
+// Copyright 2018 CNRS - Airbus SAS
+// Author: Joseph Mirabel
+//
+// Redistribution and use in source and binary forms, with or without
+// modification, are permitted provided that the following conditions are
+// met:
+
+// 1. Redistributions of source code must retain the above copyright
+// notice, this list of conditions and the following disclaimer.
+
+// 2. Redistributions in binary form must reproduce the above copyright
+// notice, this list of conditions and the following disclaimer in the
+// documentation and/or other materials provided with the distribution.
+
+// THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+// "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+// LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+// A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+// HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+// SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+// LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+// DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+// THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+// (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+// OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#include <dynamic-graph/entity.h>
+#include <dynamic-graph/signal.h>
+#include <dynamic-graph/signal-ptr.h>
+#include <dynamic-graph/factory.h>
+#include <dynamic-graph/command-bind.h>
+
+#include <agimus/sot/config.hh>
+
+#include "sustained-condition.hh"
+
+namespace dynamicgraph {
+  namespace agimus {
+      /// SustainedCondition
+      class AGIMUS_SOT_DLLAPI SustainedCondition : public dynamicgraph::Entity
+      {
+        DYNAMIC_GRAPH_ENTITY_DECL();
+
+        public:
+        SustainedCondition (const std::string& name) :
+          Entity (name),
+          conditionSIN (NULL, "SustainedCondition("+name+")::input(bool)::condition"),
+          soutSOUT ("SustainedCondition("+name+")::output(bool)::sout")
+        {
+          soutSOUT.setFunction (boost::bind (&SustainedCondition::sout, this, _1, _2));
+          signalRegistration (conditionSIN << soutSOUT);
+
+          using command::makeCommandVoid1;
+          std::string docstring =
+            "\n"
+            "    Set the number of iterations during which the condition must hold\n";
+          addCommand ("setDuration", makeCommandVoid1
+              (*this, &SustainedCondition::setDuration, docstring));
+        }
+
+        ~SustainedCondition () {}
+
+        /// Header documentation of the python class
+        virtual std::string getDocString () const
+        {
+          return
+            "Filter out short activations of a condition.\n"
+            "Signal sout is true when signal condition has been true during\n"
+            "the last duration consecutive iterations.\n"
+            "The count restarts when the signal is not computed at each\n"
+            "iteration.\n"
+            ;
+        }
+
+        void setDuration (const int& d) { sustained.setDuration (d); }
+
+        private:
+        bool& sout (bool& res, const int& t)
+        {
+          res = sustained.compute (conditionSIN (t), t);
+          return res;
+        }
+
+        condition::Sustained sustained;
+        SignalPtr <bool, int> conditionSIN;
+        Signal <bool, int> soutSOUT;
+      };
+
+      DYNAMICGRAPH_FACTORY_ENTITY_PLUGIN (SustainedCondition, "SustainedCondition");
+  } // namespace agimus
+} // namespace dynamicgraph
@@ -0,0 +1,69 @@
+// Copyright 2018 CNRS - Airbus SAS
+// Author: Joseph Mirabel
+//
+// Redistribution and use in source and binary forms, with or without
+// modification, are permitted provided that the following conditions are
+// met:
+
+// 1. Redistributions of source code must retain the above copyright
+// notice, this list of conditions and the following disclaimer.
+
+// 2. Redistributions in binary form must reproduce the above copyright
+// notice, this list of conditions and the following disclaimer in the
+// documentation and/or other materials provided with the distribution.
+
+// THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+// "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+// LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+// A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+// HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+// SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+// LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+// DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+// THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+// (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+// OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#ifndef AGIMUS_SOT_SUSTAINED_CONDITION_HH
+# define AGIMUS_SOT_SUSTAINED_CONDITION_HH
+
+namespace dynamicgraph {
+  namespace agimus {
+    /// Computations of the entities checking conditions.
+    ///
+    /// They do not depend on dynamic-graph so that they are unit tested
+    /// without a dynamic-graph.
+    namespace condition {
+      /// Whether a condition held during the last duration consecutive
+      /// iterations.
+      ///
+      /// See entity SustainedCondition.
+      class Sustained
+      {
+        public:
+        Sustained () : duration_ (0), since_ (-1), last_ (-1) {}
+
+        void setDuration (const int& d) { duration_ = d; }
+
+        /// Value at time t of the condition c.
+        /// The count restarts if the previous call was not at time t-1.
+        bool compute (const bool& c, const int& t)
+        {
+          if (!c)
+            since_ = -1;
+          else if (since_ < 0 || t != last_ + 1)
+            since_ = t;
+          last_ = t;
+          // The condition held at iterations since, ..., t.
+          // A duration of 0 or 1 means that the result is c.
+          return c && (t - since_ + 1 >= duration_);
+        }
+
+        private:
+        int duration_, since_, last_;
+      };
+    } // namespace condition
+  } // namespace agimus
+} // namespace dynamicgraph
+
+#endif // AGIMUS_SOT_SUSTAINED_CONDITION_HH
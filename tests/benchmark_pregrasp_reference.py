@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# Compare the per-tick cost of the pregrasp reference computed with
+# Multiply_of_matrixHomo / Inverse_of_matrixHomo / SwitchMatrixHomogeneous
+# entities and with the PreGraspReference and MeasuredPose entities.
+#
+# Usage:
+#   python benchmark_pregrasp_reference.py [-n 10000]
+
+from __future__ import print_function
+import argparse, timeit
+import numpy as np
+from dynamic_graph import plug
+from agimus_sot.sot import PreGraspReference, MeasuredPose
+from agimus_sot.tools import matrixHomoInverse, matrixHomoProduct, \
+        entityIfMatrixHomo
+
+parser = argparse.ArgumentParser()
+parser.add_argument ("-n", "--number", type=int, default=10000)
+args = parser.parse_args()
+
+def pose (x):
+    M = np.identity(4)
+    M[:3,3] = x
+    return tuple(map(tuple, M))
+
+oMja, jaMfa, oMjb, jbMfb = pose((1,0,0)), pose((0,0,.1)), pose((1,.2,0)), pose((0,0,-.1))
+wMc, cMf = pose((0,0,1)), pose((.5,.5,.5))
+
+# Former graph
+measOld = matrixHomoProduct ("old_measured", wMc, cMf)
+ifOld = entityIfMatrixHomo ("old_measured_safe", condition=None,
+        value_then=measOld.sout, value_else=oMjb)
+ifOld.condition.value = True
+invOld = matrixHomoInverse ("old_oMja_inv", oMja)
+refOld = matrixHomoProduct ("old_faMfbDes",
+        tuple(map(tuple, np.linalg.inv(jaMfa))), invOld.sout, ifOld.out, jbMfb)
+
+# Fused graph
+measNew = MeasuredPose ("new_measured")
+measNew.wMc.value = wMc
+measNew.cMf.value = cMf
+measNew.available.value = True
+measNew.fallback.value = oMjb
+refNew = PreGraspReference ("new_faMfbDes")
+refNew.oMja.value = oMja
+refNew.jaMfa.value = jaMfa
+plug (measNew.sout, refNew.oMjb)
+refNew.jbMfb.value = jbMfb
+
+def run (signal):
+    for t in range(1, args.number+1):
+        signal.recompute (t)
+
+refOld.sout.recompute (0)
+refNew.sout.recompute (0)
+assert np.allclose (np.array(refOld.sout.value), np.array(refNew.sout.value))
+old = timeit.timeit (lambda: run(refOld.sout), number=1) / args.number
+new = timeit.timeit (lambda: run(refNew.sout), number=1) / args.number
+
+print ("{} ticks".format(args.number))
+print ("former entities : {:.3f} us per tick".format(1e6 * old))
+print ("fused entities  : {:.3f} us per tick".format(1e6 * new))
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# Compare the per-tick solve time of a solver with one priority level per
+# gripper task and of a solver whose gripper tasks are merged into a single
+# level (Solver option compressHierarchy).
+#
+# Usage:
+#   python benchmark_solver_hierarchy.py [-n 1000] [--dof 40] [--grippers 4]
+
+from __future__ import print_function
+import argparse, timeit
+import numpy as np
+from dynamic_graph import plug
+from dynamic_graph.sot.core.feature_posture import FeaturePosture
+from dynamic_graph.sot.core.task import Task as SotTask
+from agimus_sot.solver import Solver
+
+parser = argparse.ArgumentParser()
+parser.add_argument ("-n", "--number", type=int, default=1000)
+parser.add_argument ("--dof", type=int, default=40)
+parser.add_argument ("--grippers", type=int, default=4)
+args = parser.parse_args()
+
+q = np.random.rand(args.dof)
+
+def gripperTask (i):
+    # Each gripper has two DoF at the end of the configuration.
+    feature = FeaturePosture ("feature_gripper_{}".format(i))
+    feature.state.value = q
+    feature.posture.value = np.zeros(args.dof)
+    for k in range(args.dof - 2*(i+1), args.dof - 2*i):
+        feature.selectDof (k, True)
+    task = SotTask ("task_gripper_{}".format(i))
+    task.add (feature.name)
+    task.controlGain.value = 1.
+    task.feature = feature
+    task.priorityGroup = ("gripper", None)
+    return task
+
+def postureTask ():
+    feature = FeaturePosture ("feature_posture")
+    feature.state.value = q
+    feature.posture.value = np.zeros(args.dof)
+    for k in range(args.dof):
+        feature.selectDof (k, True)
+    task = SotTask ("task_posture")
+    task.add (feature.name)
+    task.controlGain.value = 1.
+    return task
+
+tasks = [ gripperTask(i) for i in range(args.grippers) ] + [ postureTask(), ]
+
+def makeSolver (name, compressHierarchy):
+    solver = Solver (name, args.dof, damping = 0.001,
+            compressHierarchy = compressHierarchy)
+    for t in tasks: solver.push (t)
+    return solver
+
+def run (solver):
+    for t in range(1, args.number+1):
+        solver.control.recompute (t)
+
+flat       = makeSolver ("sot_flat"      , False)
+compressed = makeSolver ("sot_compressed", True )
+flat      .control.recompute (0)
+compressed.control.recompute (0)
+assert np.allclose (np.array(flat.control.value), np.array(compressed.control.value))
+
+tFlat       = timeit.timeit (lambda: run(flat      ), number=1) / args.number
+tCompressed = timeit.timeit (lambda: run(compressed), number=1) / args.number
+
+print ("{} DoF, {} gripper tasks and a posture task".format(args.dof, args.grippers))
+print ("levels: {} -> {}".format(len(flat.tasks), len(compressed.tasks)))
+print ("one level per task : {:.3f} us per tick".format(1e6 * tFlat))
+print ("compressed         : {:.3f} us per tick".format(1e6 * tCompressed))
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# Compare the time needed to load a scene with and without the SRDF cache,
+# and with parse_srdf_many.
+#
+# Usage:
+#   python benchmark_srdf_parser.py srdf/talos.srdf:talos_data:talos \
+#       srdf/cobblestone.srdf:gerard_bauzil:box ...
+#
+# Each argument is file[:package[:prefix]].
+
+from __future__ import print_function
+import argparse, shutil, tempfile, timeit
+from agimus_sot.srdf_parser import parse_srdf, parse_srdf_many
+
+parser = argparse.ArgumentParser()
+parser.add_argument ("entries", nargs="+", help="file[:package[:prefix]]")
+parser.add_argument ("-n", "--number", type=int, default=10)
+parser.add_argument ("--array", action="store_true",
+        help="read contact points and shapes as numpy arrays")
+args = parser.parse_args()
+
+entries = []
+for e in args.entries:
+    fields = e.split(':') + [ None, None ]
+    entries.append ((fields[0], fields[1] or None, fields[2] or None))
+
+cacheDir = tempfile.mkdtemp (prefix = "agimus_sot_srdf_cache")
+
+def load (cacheDir):
+    for srdf, package, prefix in entries:
+        parse_srdf (srdf, packageName = package, prefix = prefix,
+                cacheDir = cacheDir, asArray = args.array)
+
+try:
+    load (cacheDir) # fill the cache
+    noCache = timeit.timeit (lambda: load(None    ), number=args.number) / args.number
+    cached  = timeit.timeit (lambda: load(cacheDir), number=args.number) / args.number
+    parallel = timeit.timeit (lambda: parse_srdf_many (entries,
+        asArray = args.array), number=args.number) / args.number
+finally:
+    shutil.rmtree (cacheDir)
+
+print ("{} files".format(len(entries)))
+print ("without cache: {:.3f} ms".format(1e3 * noCache))
+print ("with cache   : {:.3f} ms".format(1e3 * cached))
+print ("in parallel : {:.3f} ms".format(1e3 * parallel))
@@ -0,0 +1,98 @@
+import os, shutil, tempfile
+import numpy as np
+from agimus_sot.calibration import Calibration, calibratedAttributes, \
+        doneLatencies, load
+
+## Write a trace in the format of TracerRealTime.
+def writeTrace (filename, times, values):
+    np.savetxt (filename, np.column_stack ((times, values)), fmt = "%d")
+
+tmpDir = tempfile.mkdtemp (prefix = "agimus_sot_test_calibration")
+try:
+    ## Latency between the convergence of the tasks and the done event.
+    # The done event is published at 1119 and 2230. At 2230, task b is not
+    # below the threshold: the event was triggered by another condition.
+    times = np.arange (1000, 2500)
+    done = np.zeros (len(times))
+    done[(times >= 1119) & (times < 1200)] = 1
+    done[times >= 2230] = 1
+    sinceA = np.where (times >= 1080, 1080, -1)
+    sinceB = np.where ((times >= 1100) & (times < 2000), 1100, -1)
+    files = [ os.path.join (tmpDir, n) for n in ("done", "a.since", "b.since") ]
+    for f, v in zip (files, (done, sinceA, sinceB)):
+        writeTrace (f, times, v)
+
+    assert doneLatencies (files[0], files[1:]) == [ (1119, 19), ]
+    assert doneLatencies (files[0], files[1:2]) == [ (1119, 39), (2230, 1150) ]
+    assert doneLatencies (files[0], []) == []
+
+    # Done from the first trace time.
+    writeTrace (files[0], times, np.ones (len(times)))
+    writeTrace (files[1], times, np.full (len(times), 980))
+    assert doneLatencies (files[0], files[1:2]) == [ (1000, 20), ]
+
+    ## Proposed values on synthetic traces.
+    period = 0.01
+    t = period * np.arange (3000)
+    residual = 1e-5
+    # Exponential convergence at the given rate, in 1/s.
+    def exponential (rate):
+        return np.exp (- rate * t) + residual
+    # The error increases again after having decreased.
+    def overshoot (rate):
+        return np.exp (- rate * t) * (1 + 0.8 * np.sin (20 * rate * t)) + residual
+
+    pregrasp = { "gainParameters": (0.9, 0.1, 0.3, 1.) }
+    def propose (type, errors, attributes):
+        calib = Calibration ()
+        calib.record (type, errors, period, attributes)
+        return calib.propose ()[type]
+
+    rate = Calibration._rate (exponential (0.9), residual, period)
+    assert abs (rate - 0.9) < 0.1, rate
+    assert Calibration._rate (np.full (10, residual), residual, period) is None
+    assert not Calibration._overshoots (exponential (0.9), residual)
+    assert Calibration._overshoots (overshoot (0.9), residual)
+
+    # The errors decrease as fast as the gain at zero error commands.
+    assert np.allclose (propose ("pregrasp", exponential (0.9), pregrasp)
+            ["gainParameters"], (0.9 * 1.25, 0.1 * 1.25, 0.3, 1.))
+    # Slower than the gain at zero error, even though faster than the
+    # second gain parameter, which is not a rate.
+    assert np.allclose (propose ("pregrasp", exponential (0.45), pregrasp)
+            ["gainParameters"], pregrasp["gainParameters"])
+    assert np.allclose (propose ("pregrasp", overshoot (0.9), pregrasp)
+            ["gainParameters"], (0.9 * 0.8, 0.1 * 0.8, 0.3, 1.))
+    # Gain 3 of grasp is also calibrated.
+    grasp = { "gainParameters": (4.9, 0.9, 0.01, 0.9) }
+    assert np.allclose (propose ("grasp", overshoot (4.9), grasp)
+            ["gainParameters"], (4.9 * 0.8, 0.9 * 0.8, 0.01, 0.9 * 0.8))
+
+    # Thresholds
+    close = propose ("gripper_close", exponential (4.9), { "positionGain": (4.9, .3, .02, .2) })
+    assert abs (close["thr_task_error"] - 2 * residual) < 1e-9
+    calib = Calibration ()
+    calib.record ("supervisor", exponential (1.), period, {})
+    calib.record ("supervisor", 10 * exponential (1.), period, {})
+    values = calib.propose ()
+    assert list(values["supervisor"].keys()) == [ "controlNormThreshold" ]
+    assert abs (values["supervisor"]["controlNormThreshold"] - 20 * residual) < 1e-9
+
+    # Save and load
+    calib.record ("pregrasp", exponential (0.9), period, pregrasp)
+    values = calib.propose ()
+    filename = os.path.join (tmpDir, "calibration.json")
+    calib.save (filename, values)
+    loaded = load (filename)
+    assert isinstance (loaded["pregrasp"]["gainParameters"], tuple)
+    assert np.allclose (loaded["pregrasp"]["gainParameters"], values["pregrasp"]["gainParameters"])
+
+    # Unknown types
+    try:
+        calib.record ("unknown", exponential (1.), period, {})
+        assert False, "unknown type of transition"
+    except ValueError:
+        pass
+    assert calibratedAttributes ("grasp") == ("gainParameters", (0, 1, 3), None)
+finally:
+    shutil.rmtree (tmpDir)
@@ -0,0 +1,46 @@
+from dynamic_graph.entity import Entity
+from dynamic_graph.sot.core.operator import CompareDouble
+from agimus_sot.events import logical_and_entity, logical_or_entity
+
+def condition (name):
+    c = CompareDouble (name)
+    c.sin1.value = 0.
+    c.sin2.value = 1.
+    return c
+
+ca = condition ("test_events_a")
+cb = condition ("test_events_b")
+a, b = ca.sout, cb.sout
+
+## Building the same expression twice creates only one entity.
+expressions = dict()
+n = len(Entity.entities)
+ab = logical_and_entity ("test_events_ab", [ a, b ], expressions)
+assert len(Entity.entities) == n + 1
+assert logical_and_entity ("test_events_ba", [ b, a, a ], expressions) is ab
+assert logical_and_entity ("test_events_ab_true", [ True, a, b ], expressions) is ab
+assert len(Entity.entities) == n + 1
+
+## The operator is part of the expression.
+aob = logical_or_entity ("test_events_aob", [ a, b ], expressions)
+assert aob is not ab
+assert len(Entity.entities) == n + 2
+
+## Constants are folded and no entity is created.
+assert logical_and_entity ("test_events_false", [ a, False, b ], expressions) is False
+assert logical_or_entity ("test_events_true", [ a, True ], expressions) is True
+assert logical_and_entity ("test_events_a", [ a, True ], expressions) is a
+assert logical_and_entity ("test_events_empty", [], expressions) is True
+assert len(Entity.entities) == n + 2
+
+## Entities are only shared within the same dictionnary.
+assert logical_and_entity ("test_events_ab_other", [ a, b ], dict()) is not ab
+assert logical_and_entity ("test_events_ab_none", [ a, b ]) is not ab
+assert len(Entity.entities) == n + 4
+
+## The shared entity computes the expression.
+ab.recompute (1)
+assert ab.value
+cb.sin1.value = 2.
+ab.recompute (2)
+assert not ab.value
@@ -0,0 +1,84 @@
+from agimus_sot.parameters import ParameterStore
+
+## A device whose control loop runs or is stopped.
+class _Control (object):
+    def __init__ (self, running):
+        self.running, self._time = running, 0
+    @property
+    def time (self):
+        if self.running: self._time += 1
+        return self._time
+
+class _Device (object):
+    def __init__ (self, running):
+        self.control = _Control (running)
+    def getTimeStep (self):
+        return 0.001
+
+def expectError (error, f, *args):
+    try:
+        f (*args)
+    except error:
+        return
+    assert False, "{} should raise {}".format (f.__name__, error.__name__)
+
+store = ParameterStore ()
+
+## Several setters bound to the same parameter.
+gainA, gainB = [], []
+assert store.bind ("gain", (1., 2.), gainA.append) == (1., 2.)
+# The default value of the second binding is ignored.
+assert store.bind ("gain", (3., 4.), gainB.append) == (1., 2.)
+assert gainA == [ (1., 2.), ] and gainB == [ (1., 2.), ]
+thr = []
+store.bind ("thr", 1e-3, thr.append)
+assert store.names() == [ "gain", "thr" ]
+
+store.set ({ "gain": (5, 6) })
+assert store.get (["gain"]) == { "gain": (1., 2.) }
+assert sorted (store.apply ()) == [ "gain", ]
+assert gainA[-1] == (5., 6.) and gainB[-1] == (5., 6.)
+assert isinstance (gainA[-1][0], float)
+assert store.get () == { "gain": (5., 6.), "thr": 1e-3 }
+assert store.apply () == []
+
+## Validation
+expectError (ValueError, store.bind, "string", "value", thr.append)
+expectError (ValueError, store.bind, "ragged", ((1., 2.), (3.,)), thr.append)
+expectError (ValueError, store.bind, "boolean", True, thr.append)
+expectError (ValueError, store.get, [ "unknown", ])
+expectError (ValueError, store.set, { "unknown": 1. })
+# Nothing is staged when one of the values is invalid.
+expectError (ValueError, store.set, { "thr": 2e-3, "gain": (1., 2., 3.) })
+expectError (ValueError, store.set, { "thr": (2e-3,) })
+expectError (ValueError, store.set, { "gain": "ab" })
+assert store.apply () == []
+assert store.get () == { "gain": (5., 6.), "thr": 1e-3 }
+
+## Rollback when a setter fails.
+calls = []
+def failing (v):
+    calls.append (v)
+    if v == (0., 0.): raise RuntimeError ("invalid gain")
+store.bind ("gain", None, failing)
+store.set ({ "gain": (0., 0.), "thr": 5e-3 })
+expectError (RuntimeError, store.apply)
+assert store.get () == { "gain": (5., 6.), "thr": 1e-3 }
+assert gainA[-1] == (5., 6.) and gainB[-1] == (5., 6.) and thr[-1] == 1e-3
+assert calls[-1] == (5., 6.)
+# The values remain staged.
+store.set ({ "gain": (7., 8.) })
+assert sorted (store.apply ()) == [ "gain", "thr" ]
+assert store.get () == { "gain": (7., 8.), "thr": 5e-3 }
+assert gainA[-1] == (7., 8.) and calls[-1] == (7., 8.) and thr[-1] == 5e-3
+
+## Wait for a new iteration of the device.
+store.set ({ "thr": 1e-2 })
+assert store.apply (_Device (True)) == [ "thr", ]
+assert thr[-1] == 1e-2
+# The device is stopped: nothing is written and the values remain staged.
+store.set ({ "thr": 2e-2 })
+expectError (RuntimeError, store.apply, _Device (False), 0.01)
+assert thr[-1] == 1e-2 and store.get (["thr"]) == { "thr": 1e-2 }
+assert store.apply () == [ "thr", ]
+assert thr[-1] == 2e-2
@@ -43,3 +43,202 @@ srdf="""<?xml version="1.0" ?>
 """
 
 content = parse_srdf_string (srdf)
+
+## Cache of parse_srdf
+import os, shutil, tempfile
+from agimus_sot import srdf_parser
+from agimus_sot.srdf_parser import parse_srdf
+
+tmpDir = tempfile.mkdtemp (prefix = "agimus_sot_test_srdf")
+try:
+    srdfFn = os.path.join (tmpDir, "plank_of_wood.srdf")
+    cacheDir = os.path.join (tmpDir, "cache")
+    with open (srdfFn, 'w') as f: f.write (srdf)
+
+    assert parse_srdf (srdfFn, cacheDir = cacheDir) == content
+    assert len(os.listdir (cacheDir)) == 1
+
+    # A cache hit must not parse the file.
+    _parse_stream = srdf_parser._parse_stream
+    def _fail (*args, **kwargs): raise AssertionError ("cache miss")
+    srdf_parser._parse_stream = _fail
+    try:
+        assert parse_srdf (srdfFn, cacheDir = cacheDir) == content
+        # Another prefix is another entry.
+        try:
+            parse_srdf (srdfFn, prefix = "plank", cacheDir = cacheDir)
+            assert False, "the prefix should be part of the cache key"
+        except AssertionError as e:
+            assert str(e) == "cache miss"
+    finally:
+        srdf_parser._parse_stream = _parse_stream
+
+    # Modifying the file invalidates the entry. The size changes so that the
+    # test does not depend on the resolution of the modification time.
+    with open (srdfFn, 'w') as f:
+        f.write (srdf.replace ('name="handle2"', 'name="handle_moved"'))
+    modified = parse_srdf (srdfFn, cacheDir = cacheDir)
+    assert "handle_moved" in modified["handles"] and "handle2" not in modified["handles"]
+    assert parse_srdf (srdfFn, cacheDir = cacheDir) == modified
+finally:
+    shutil.rmtree (tmpDir)
+
+## Contacts read as arrays
+import numpy as np
+from agimus_sot.srdf_parser import ContactShapes
+
+arrays = parse_srdf_string (srdf, asArray = True)
+assert arrays["handles"] == content["handles"]
+for name, contact in content["contacts"].items():
+    contactArray = arrays["contacts"][name]
+    assert isinstance (contactArray["points"], np.ndarray)
+    assert contactArray["points"].shape == (len(contact["points"]), 3)
+    assert np.allclose (contactArray["points"], contact["points"])
+    shapes = contactArray["shapes"]
+    assert isinstance (shapes, ContactShapes)
+    assert len(shapes) == len(contact["shapes"])
+    assert shapes == contact["shapes"]
+    assert [ list(s) for s in shapes ] == contact["shapes"]
+    assert list(shapes[-1]) == contact["shapes"][-1]
+
+# Several shapes of different sizes
+shapes = srdf_parser._read_shapes_as_array ("3 0 1 2 4 3 2 1 0 1 5".split())
+assert list(shapes.offsets) == [ 0, 3, 7, 8 ]
+assert shapes == [ [0, 1, 2], [3, 2, 1, 0], [5] ]
+try:
+    srdf_parser._read_shapes_as_array ("3 0 1".split())
+    assert False, "inconsistent shape sizes should be detected"
+except ValueError:
+    pass
+
+## Several files at once
+from agimus_sot.srdf_parser import parse_srdf_many
+
+tmpDir = tempfile.mkdtemp (prefix = "agimus_sot_test_srdf")
+try:
+    plank1 = os.path.join (tmpDir, "plank1.srdf")
+    plank2 = os.path.join (tmpDir, "plank2.srdf")
+    for fn in (plank1, plank2):
+        with open (fn, 'w') as f: f.write (srdf)
+
+    merged = parse_srdf_many ([ (plank1, None, "plank1"), (plank2, None, "plank2") ])
+    assert sorted (merged["handles"].keys()) == [ "plank1/handle1", "plank1/handle2",
+            "plank2/handle1", "plank2/handle2" ]
+    assert len(merged["contacts"]) == 4
+    assert merged == parse_srdf_many ([ (plank1, None, "plank1"),
+        (plank2, None, "plank2") ], processes = 1)
+
+    # Same element names in both files.
+    for entries in ([ plank1, plank2 ], [ (plank1, None, "plank"), (plank2, None, "plank") ]):
+        try:
+            parse_srdf_many (entries, processes = 1)
+            assert False, "duplicated names should be detected"
+        except ValueError as e:
+            assert plank2 in str(e)
+finally:
+    shutil.rmtree (tmpDir)
+
+## Attach to another link
+# The model mimics a np.matrix-era pinocchio model: rotations, translations
+# and quaternion coefficients are np.matrix. pinocchio is only faked when
+# it is not installed.
+import sys
+from agimus_sot.srdf_parser import attach_to_link, attach_all_to_link
+
+def _quat_to_rot (q):
+    x, y, z, w = q
+    return np.array ([
+        [ 1-2*(y*y+z*z), 2*(x*y-z*w), 2*(x*z+y*w) ],
+        [ 2*(x*y+z*w), 1-2*(x*x+z*z), 2*(y*z-x*w) ],
+        [ 2*(x*z-y*w), 2*(y*z+x*w), 1-2*(x*x+y*y) ], ])
+
+def _homogeneous (R, t):
+    M = np.eye (4)
+    M[:3,:3] = R
+    M[:3,3] = np.asarray(t).ravel()
+    return M
+
+class _SE3 (object):
+    def __init__ (self, R, t):
+        self.rotation = np.matrix (R)
+        self.translation = np.matrix (np.asarray(t).reshape (3, 1))
+    def inverse (self):
+        R = np.asarray (self.rotation)
+        return _SE3 (R.T, - R.T.dot (np.asarray(self.translation)))
+    def __mul__ (self, other):
+        R = np.asarray (self.rotation)
+        return _SE3 (R.dot (np.asarray(other.rotation)),
+                R.dot (np.asarray(other.translation)) + np.asarray(self.translation))
+    def homogeneous (self):
+        return _homogeneous (np.asarray(self.rotation), self.translation)
+
+class _Frame (object):
+    def __init__ (self, name, parent, placement):
+        self.name, self.parent, self.placement = name, parent, placement
+
+class _Model (object):
+    def __init__ (self, frames):
+        self.frames = frames
+        self.nframes = len(frames)
+    def getFrameId (self, name):
+        for i, f in enumerate (self.frames):
+            if f.name == name: return i
+        return self.nframes
+
+class _Quaternion (object):
+    def __init__ (self, R):
+        R = np.asarray (R)
+        w = np.sqrt (max (0., 1. + R[0,0] + R[1,1] + R[2,2])) / 2
+        x = np.copysign (np.sqrt (max (0., 1. + R[0,0] - R[1,1] - R[2,2])) / 2, R[2,1] - R[1,2])
+        y = np.copysign (np.sqrt (max (0., 1. - R[0,0] + R[1,1] - R[2,2])) / 2, R[0,2] - R[2,0])
+        z = np.copysign (np.sqrt (max (0., 1. - R[0,0] - R[1,1] + R[2,2])) / 2, R[1,0] - R[0,1])
+        self._coeffs = np.matrix ([ x, y, z, w ]).T
+    def coeffs (self):
+        return self._coeffs
+
+try:
+    import pinocchio
+except ImportError:
+    import types
+    sys.modules["pinocchio"] = types.ModuleType ("pinocchio")
+    sys.modules["pinocchio"].Quaternion = _Quaternion
+
+c, s = np.cos (0.3), np.sin (0.3)
+model = _Model ([
+    _Frame ("universe", 0, _SE3 (np.eye(3), np.zeros(3))),
+    _Frame ("base_link", 1, _SE3 (np.eye(3), [ 0.1, 0., 0. ])),
+    _Frame ("tool", 1, _SE3 ([[ c, -s, 0 ], [ s, c, 0 ], [ 0, 0, 1 ]], [ 0., 0.2, -0.1 ])),
+    ])
+
+def _check_handle (before, after):
+    olMf = _homogeneous (_quat_to_rot (before["position"][3:]), before["position"][:3])
+    expected = model.frames[2].placement.inverse().homogeneous() \
+            .dot (model.frames[1].placement.homogeneous()).dot (olMf)
+    p = after["position"]
+    assert after["link"] == "tool"
+    assert all (isinstance (v, float) for v in p)
+    assert np.allclose (_homogeneous (_quat_to_rot (p[3:]), p[:3]), expected)
+
+for asArray in (False, True):
+    perElement = parse_srdf_string (srdf, asArray = asArray)
+    for field in ("grippers", "handles", "contacts"):
+        for e in perElement[field].values():
+            attach_to_link (model, "tool", **{ field[:-1]: e })
+    allAtOnce = parse_srdf_string (srdf, asArray = asArray)
+    attach_all_to_link (model, "tool", allAtOnce)
+
+    for name, handle in allAtOnce["handles"].items():
+        _check_handle (content["handles"][name], handle)
+        assert handle == perElement["handles"][name]
+    for name, contact in allAtOnce["contacts"].items():
+        assert contact["link"] == "tool"
+        assert isinstance (contact["points"], np.ndarray if asArray else list)
+        assert np.allclose (contact["points"], perElement["contacts"][name]["points"])
+        nlMol = (model.frames[2].placement.inverse() * model.frames[1].placement).homogeneous()
+        expected = np.array (content["contacts"][name]["points"]).dot (nlMol[:3,:3].T) + nlMol[:3,3]
+        assert np.allclose (contact["points"], expected)
+
+# Attaching to the same link does nothing.
+same = parse_srdf_string (srdf)
+attach_all_to_link (model, "base_link", same)
+assert same == content
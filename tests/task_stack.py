@@ -0,0 +1,45 @@
+from agimus_sot.task.task import Task, TaskStack
+
+def makeTask (name, topics):
+    t = Task (tasks = [ name + "_sot_task", ])
+    for topic, getters in topics:
+        t.addHppJointTopic (topic, signalGetters = frozenset(getters))
+    return t
+
+a = makeTask ("a", [ ("joint1", [ "a.sig1", ]), ("joint2", [ "a.sig2", ]) ])
+b = makeTask ("b", [ ("joint1", [ "b.sig1", ]), ("joint3", [ "b.sig3", ]) ])
+
+emptyManifold = TaskStack()
+ab = emptyManifold + a + b
+
+## The same sequence gives the same object
+assert emptyManifold + a + b is ab
+assert emptyManifold + a is not ab
+assert emptyManifold + b + a is not ab
+
+## Same tasks and topics as Task.__add__
+old = Task() + a + b
+assert list(ab.tasks) == old.tasks
+assert list(ab.constraints) == old.constraints
+assert ab.topics == old.topics
+assert ab.topics["joint1"]["signalGetters"] == frozenset([ "a.sig1", "b.sig1" ])
+
+## The topics of the stack are copies
+a.extendSignalGetters ("joint2", [ "a.other", ])
+a.topics["joint1"]["hppjoint"] = "modified"
+assert ab.topics["joint2"]["signalGetters"] == frozenset([ "a.sig2", ])
+assert ab.topics["joint1"]["hppjoint"] == "joint1"
+assert (emptyManifold + a).topics["joint2"]["signalGetters"] == frozenset([ "a.sig2", ])
+
+## A TaskStack is immutable
+for f, args in ((ab.extendSignalGetters, ("joint1", [])),
+        (ab.addHppJointTopic, ("joint4",))):
+    try:
+        f (*args)
+        assert False, "TaskStack should be immutable"
+    except TypeError:
+        pass
+c = ab
+c += a
+assert c is ab + a
+assert len(ab.tasks) == 2
@@ -0,0 +1,93 @@
+// Copyright 2018 CNRS - Airbus SAS
+// Author: Joseph Mirabel
+//
+// Redistribution and use in source and binary forms, with or without
+// modification, are permitted provided that the following conditions are
+// met:
+
+// 1. Redistributions of source code must retain the above copyright
+// notice, this list of conditions and the following disclaimer.
+
+// 2. Redistributions in binary form must reproduce the above copyright
+// notice, this list of conditions and the following disclaimer in the
+// documentation and/or other materials provided with the distribution.
+
+// THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+// "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+// LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+// A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+// HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+// SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+// LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+// DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+// THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+// (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+// OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+// Compare the cost of the operations of the pregrasp reference when they
+// are computed by the former chain of entities and by PreGraspReference.
+// Only the computations and the copies of the intermediate values are
+// measured, not the dynamic-graph signal overhead.
+//
+// Usage: benchmark-pregrasp-reference [number of ticks]
+
+#include <cstdlib>
+#include <iostream>
+#include <boost/date_time/posix_time/posix_time.hpp>
+
+#include "pregrasp-reference.hh"
+
+using namespace dynamicgraph::agimus::pregrasp;
+using boost::posix_time::ptime;
+using boost::posix_time::microsec_clock;
+
+Transform randomTransform ()
+{
+  Transform M;
+  M.linear() = Eigen::Quaterniond (Eigen::Vector4d::Random()).normalized()
+    .toRotationMatrix();
+  M.translation().setRandom();
+  M.makeAffine();
+  return M;
+}
+
+int main (int argc, char** argv)
+{
+  const int N = (argc > 1 ? std::atoi (argv[1]) : 1000000);
+  // The inputs change at each tick, so that nothing is held. There are
+  // few of them so that they stay in cache.
+  const int K = 64;
+  std::vector<Transform, Eigen::aligned_allocator<Transform> > oMja (K),
+    oMjb (K);
+  for (int i = 0; i < K; ++i) {
+    oMja[i] = randomTransform();
+    oMjb[i] = randomTransform();
+  }
+  const Transform jaMfa (randomTransform()), jbMfb (randomTransform()),
+    jaMfa_inv (jaMfa.inverse());
+  Transform sum (Transform::Identity());
+
+  // Each entity of the former chain stores its output in its signal.
+  Transform oMja_inv, faMfbDes;
+  ptime start = microsec_clock::universal_time();
+  for (int i = 0; i < N; ++i) {
+    oMja_inv = oMja[i%K].inverse();
+    faMfbDes = jaMfa_inv * oMja_inv * oMjb[i%K] * jbMfb;
+    sum.matrix() += faMfbDes.matrix();
+  }
+  const double chain = 1e3 * double ((microsec_clock::universal_time()
+        - start).total_microseconds()) / N;
+
+  start = microsec_clock::universal_time();
+  for (int i = 0; i < N; ++i) {
+    faMfbDes = relativePose (oMja[i%K], jaMfa, oMjb[i%K], jbMfb);
+    sum.matrix() += faMfbDes.matrix();
+  }
+  const double fused = 1e3 * double ((microsec_clock::universal_time()
+        - start).total_microseconds()) / N;
+
+  std::cout << N << " ticks (checksum " << sum.matrix().sum() << ")\n"
+    << "former entities : " << chain << " ns per tick\n"
+    << "PreGraspReference: " << fused << " ns per tick" << std::endl;
+  return 0;
+}
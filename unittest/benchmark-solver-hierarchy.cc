@@ -0,0 +1,124 @@
+// Copyright 2018 CNRS - Airbus SAS
+// Author: Joseph Mirabel
+//
+// Redistribution and use in source and binary forms, with or without
+// modification, are permitted provided that the following conditions are
+// met:
+
+// 1. Redistributions of source code must retain the above copyright
+// notice, this list of conditions and the following disclaimer.
+
+// 2. Redistributions in binary form must reproduce the above copyright
+// notice, this list of conditions and the following disclaimer in the
+// documentation and/or other materials provided with the distribution.
+
+// THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+// "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+// LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+// A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+// HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+// SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+// LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+// DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+// THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+// (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+// OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+// Model of the per-tick cost of the SOT solver with one priority level per
+// gripper task and with the gripper tasks merged into a single level
+// (Solver option compressHierarchy). sot-core is not needed: each level is
+// solved as in SOT::computeControlLaw, with a damped pseudo-inverse
+// computed by a SVD of the projected Jacobian and an update of the
+// projector. The figures are those of this model, not of sot-core.
+//
+// Usage: benchmark-solver-hierarchy [number of ticks] [dof] [grippers]
+
+#include <cstdlib>
+#include <iostream>
+#include <vector>
+#include <boost/date_time/posix_time/posix_time.hpp>
+
+#include <Eigen/SVD>
+
+using boost::posix_time::ptime;
+using boost::posix_time::microsec_clock;
+
+typedef Eigen::MatrixXd Matrix;
+typedef Eigen::VectorXd Vector;
+
+struct Level {
+  Matrix J;
+  Vector e;
+};
+
+Vector solve (const std::vector<Level>& levels, const int& n,
+    const double& damping)
+{
+  Vector u (Vector::Zero(n));
+  Matrix P (Matrix::Identity(n, n));
+  for (std::size_t k = 0; k < levels.size(); ++k) {
+    const Level& l = levels[k];
+    const Matrix JP (l.J * P);
+    Eigen::JacobiSVD<Matrix> svd (JP, Eigen::ComputeThinU | Eigen::ComputeThinV);
+    const Vector& S (svd.singularValues());
+    const Vector Sinv (S.cwiseQuotient
+        ((S.array().square() + damping * damping).matrix()));
+    const Matrix JPinv (svd.matrixV() * Sinv.asDiagonal()
+        * svd.matrixU().transpose());
+    u += JPinv * (l.e - l.J * u);
+    P -= JPinv * JP;
+  }
+  return u;
+}
+
+double time (const std::vector<Level>& levels, const int& n, const int& N,
+    Vector& u)
+{
+  ptime start = microsec_clock::universal_time();
+  for (int i = 0; i < N; ++i)
+    u = solve (levels, n, 0.001);
+  return double ((microsec_clock::universal_time() - start)
+      .total_microseconds()) / N;
+}
+
+int main (int argc, char** argv)
+{
+  const int N = (argc > 1 ? std::atoi (argv[1]) : 10000);
+  const int n = (argc > 2 ? std::atoi (argv[2]) : 40);
+  const int G = (argc > 3 ? std::atoi (argv[3]) : 4);
+
+  // Each gripper has two DoF at the end of the configuration. The posture
+  // task constrains all the DoF.
+  std::vector<Level> flat, compressed (1);
+  Level& merged = compressed[0];
+  merged.J = Matrix::Zero (2*G, n);
+  merged.e = Vector::Random (2*G);
+  for (int g = 0; g < G; ++g) {
+    Level l;
+    l.J = Matrix::Zero (2, n);
+    l.J (0, n - 2*(g+1)) = l.J (1, n - 2*g - 1) = 1.;
+    l.e = merged.e.segment<2> (2*g);
+    merged.J.middleRows<2> (2*g) = l.J;
+    flat.push_back (l);
+  }
+  Level posture;
+  posture.J = Matrix::Identity (n, n);
+  posture.e = Vector::Random (n);
+  flat.push_back (posture);
+  compressed.push_back (posture);
+
+  Vector uFlat, uCompressed;
+  const double tFlat = time (flat, n, N, uFlat);
+  const double tCompressed = time (compressed, n, N, uCompressed);
+  if (!uFlat.isApprox (uCompressed, 1e-8)) {
+    std::cerr << "The controls differ." << std::endl;
+    return 1;
+  }
+
+  std::cout << n << " DoF, " << G << " gripper tasks and a posture task, "
+    << N << " ticks\n"
+    << "levels: " << flat.size() << " -> " << compressed.size() << '\n'
+    << "one level per task : " << tFlat << " us per tick\n"
+    << "compressed         : " << tCompressed << " us per tick" << std::endl;
+  return 0;
+}
@@ -0,0 +1,169 @@
+// Copyright 2018 CNRS - Airbus SAS
+// Author: Joseph Mirabel
+//
+// Redistribution and use in source and binary forms, with or without
+// modification, are permitted provided that the following conditions are
+// met:
+
+// 1. Redistributions of source code must retain the above copyright
+// notice, this list of conditions and the following disclaimer.
+
+// 2. Redistributions in binary form must reproduce the above copyright
+// notice, this list of conditions and the following disclaimer in the
+// documentation and/or other materials provided with the distribution.
+
+// THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+// "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+// LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+// A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+// HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+// SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+// LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+// DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+// THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+// (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+// OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#define BOOST_TEST_MODULE convergence_detector
+#include <cmath>
+#include <vector>
+#include <boost/test/included/unit_test.hpp>
+
+#include "convergence-detector.hh"
+
+using dynamicgraph::agimus::condition::Convergence;
+
+/// Exponential decay of time constant tau (in iterations) towards offset,
+/// plus a sinusoidal noise of amplitude noise.
+std::vector<double> scriptedError (const int& n, const double& tau,
+    const double& offset = 0., const double& noise = 0.)
+{
+  std::vector<double> e (n);
+  for (int t = 0; t < n; ++t)
+    e[t] = std::exp (- t / tau) + offset + noise * std::sin (0.7 * t);
+  return e;
+}
+
+/// Time at which converged becomes true, -1 if it does not.
+int detection (Convergence& c, const std::vector<double>& e,
+    const int& start = 0)
+{
+  for (int t = 0; t < (int)e.size(); ++t)
+    if (c.compute (e[t], start, t)) return t;
+  return -1;
+}
+
+/// Number of changes of converged.
+int switches (Convergence& c, const std::vector<double>& e)
+{
+  int n = 0;
+  bool last = false;
+  for (int t = 0; t < (int)e.size(); ++t) {
+    bool converged = c.compute (e[t], 0, t);
+    if (converged != last) ++n;
+    last = converged;
+  }
+  return n;
+}
+
+BOOST_AUTO_TEST_CASE (window)
+{
+  const double thr = 1e-3;
+  const int N = 20;
+  for (int n = N - 1; n <= N + 1; ++n) {
+    Convergence c;
+    c.setThresholds (thr, 2 * thr);
+    c.setWindow (N);
+    for (int t = 0; t < 10; ++t) BOOST_CHECK (!c.compute (1., 0, t));
+    bool converged = false;
+    for (int t = 10; t < 10 + n; ++t) converged = c.compute (thr / 2, 0, t);
+    BOOST_CHECK_EQUAL (converged, n >= N);
+    BOOST_CHECK_EQUAL (c.since(), 10);
+  }
+  // A window of 0 or 1 gives the comparison with the threshold.
+  for (int N = 0; N <= 1; ++N) {
+    Convergence c;
+    c.setThresholds (thr, thr);
+    c.setWindow (N);
+    BOOST_CHECK (!c.compute (thr, 0, 0));
+    BOOST_CHECK ( c.compute (thr / 2, 0, 1));
+  }
+}
+
+BOOST_AUTO_TEST_CASE (hysteresis)
+{
+  const double thr = 1e-3;
+  Convergence c;
+  c.setThresholds (thr, 2 * thr);
+  c.setWindow (3);
+  BOOST_CHECK_EQUAL (detection (c, std::vector<double> (3, thr / 2)), 2);
+  // Between the thresholds, it stays converged.
+  BOOST_CHECK (c.compute (1.5 * thr, 0, 3));
+  BOOST_CHECK (c.compute (2 * thr, 0, 4));
+  BOOST_CHECK_EQUAL (c.since(), 0);
+  // Above the output threshold, the count restarts.
+  BOOST_CHECK (!c.compute (2.1 * thr, 0, 5));
+  BOOST_CHECK_EQUAL (c.since(), -1);
+  BOOST_CHECK (!c.compute (1.5 * thr, 0, 6));
+  BOOST_CHECK_EQUAL (c.since(), -1);
+  BOOST_CHECK (!c.compute (thr / 2, 0, 7));
+  BOOST_CHECK (!c.compute (thr / 2, 0, 8));
+  BOOST_CHECK ( c.compute (thr / 2, 0, 9));
+  BOOST_CHECK_EQUAL (c.since(), 7);
+
+  // The output threshold is at least the input one.
+  Convergence d;
+  d.setThresholds (thr, thr / 2);
+  d.setWindow (1);
+  BOOST_CHECK ( d.compute (thr / 2, 0, 0));
+  BOOST_CHECK ( d.compute (thr, 0, 1));
+  BOOST_CHECK (!d.compute (1.1 * thr, 0, 2));
+
+  // A noisy error around the threshold.
+  const std::vector<double> e = scriptedError (2000, 100., thr, 0.5 * thr);
+  Convergence without, with;
+  without.setThresholds (thr, thr);
+  with.setThresholds (thr, 2 * thr);
+  BOOST_CHECK_GT (switches (without, e), 2);
+  BOOST_CHECK_EQUAL (switches (with, e), 1);
+}
+
+BOOST_AUTO_TEST_CASE (start)
+{
+  const double thr = 1e-3;
+  const int N = 20;
+  Convergence c;
+  c.setThresholds (thr, 2 * thr);
+  c.setWindow (N);
+  // The error is below the threshold before the solver starts.
+  const std::vector<double> e (200, thr / 2);
+  BOOST_CHECK_EQUAL (detection (c, e, 100), 100 + N - 1);
+  BOOST_CHECK_EQUAL (c.since(), 0);
+  // Before start, it does not converge.
+  Convergence d;
+  d.setThresholds (thr, 2 * thr);
+  d.setWindow (0);
+  BOOST_CHECK (!d.compute (thr / 2, 10, 9));
+  BOOST_CHECK ( d.compute (thr / 2, 10, 10));
+}
+
+/// Iterations between the last time the error goes below the threshold
+/// and the detection, on scripted exponential errors.
+BOOST_AUTO_TEST_CASE (latency)
+{
+  const double thr = 1e-3;
+  const int N = 20;
+  const double taus[] = { 50., 100., 400. };
+  for (int i = 0; i < 3; ++i) {
+    const std::vector<double> e = scriptedError (5000, taus[i]);
+    int below = 0;
+    while (e[below] >= thr) ++below;
+    Convergence c;
+    c.setThresholds (thr, 2 * thr);
+    c.setWindow (N);
+    const int t = detection (c, e);
+    BOOST_TEST_MESSAGE ("tau " << taus[i] << ": below threshold at " << below
+        << ", converged at " << t << ", latency " << t - below);
+    BOOST_CHECK_EQUAL (t - below, N - 1);
+  }
+}
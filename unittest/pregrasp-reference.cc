@@ -0,0 +1,241 @@
+// Copyright 2018 CNRS - Airbus SAS
+// Author: Joseph Mirabel
+//
+// Redistribution and use in source and binary forms, with or without
+// modification, are permitted provided that the following conditions are
+// met:
+
+// 1. Redistributions of source code must retain the above copyright
+// notice, this list of conditions and the following disclaimer.
+
+// 2. Redistributions in binary form must reproduce the above copyright
+// notice, this list of conditions and the following disclaimer in the
+// documentation and/or other materials provided with the distribution.
+
+// THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+// "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+// LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+// A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+// HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+// SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+// LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+// DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+// THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+// (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+// OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#define BOOST_TEST_MODULE pregrasp_reference
+#include <boost/test/included/unit_test.hpp>
+
+#include "pregrasp-reference.hh"
+
+using namespace dynamicgraph::agimus::pregrasp;
+
+Transform randomTransform ()
+{
+  Transform M;
+  M.linear() = Eigen::Quaterniond (Eigen::Vector4d::Random()).normalized()
+    .toRotationMatrix();
+  M.translation().setRandom();
+  M.makeAffine();
+  return M;
+}
+
+/// Pose of frame M after moving during dt at velocity v, expressed in M
+/// (linear first).
+Transform integrate (const Transform& M, const Vector& v, const double& dt)
+{
+  Transform dM;
+  const Eigen::Vector3d w = v.tail<3>() * dt;
+  dM.linear() = (w.norm() > 0
+      ? Eigen::AngleAxisd (w.norm(), w.normalized()).toRotationMatrix()
+      : Eigen::Matrix3d::Identity());
+  dM.translation() = v.head<3>() * dt;
+  dM.makeAffine();
+  return M * dM;
+}
+
+BOOST_AUTO_TEST_CASE (relative_pose)
+{
+  for (int i = 0; i < 100; ++i) {
+    Transform oMja (randomTransform()), jaMfa (randomTransform()),
+              oMjb (randomTransform()), jbMfb (randomTransform());
+
+    // Output of the former entities:
+    // - an Inverse_of_matrixHomo computing oMja^-1,
+    // - a Multiply_of_matrixHomo of jaMfa^-1, oMja^-1, oMjb and jbMfb.
+    Transform oMja_inv (oMja.inverse());
+    Transform expected (jaMfa.inverse() * oMja_inv * oMjb * jbMfb);
+
+    BOOST_CHECK (relativePose (oMja, jaMfa, oMjb, jbMfb).isApprox (expected, 1e-10));
+  }
+}
+
+BOOST_AUTO_TEST_CASE (relative_velocity)
+{
+  // The former entities did not compute the velocity. It is compared to a
+  // finite difference of relativePose.
+  const double dt = 1e-6;
+  for (int i = 0; i < 100; ++i) {
+    Transform oMja (randomTransform()), jaMfa (randomTransform()),
+              oMjb (randomTransform()), jbMfb (randomTransform());
+    Vector vja (Vector::Random(6)), vjb (Vector::Random(6)), v;
+
+    Transform faMfb (relativePose (oMja, jaMfa, oMjb, jbMfb));
+    relativeVelocity (jaMfa, faMfb, jbMfb, vja, vjb, v);
+
+    Transform faMfb_dt (relativePose (integrate (oMja, vja, dt), jaMfa,
+          integrate (oMjb, vjb, dt), jbMfb));
+    Transform fbMfb_dt (faMfb.inverse() * faMfb_dt);
+    Eigen::AngleAxisd w (fbMfb_dt.linear());
+    Vector fd (6);
+    fd.head<3>() = fbMfb_dt.translation() / dt;
+    fd.tail<3>() = w.angle() * w.axis() / dt;
+
+    BOOST_CHECK_SMALL ((fd - v).norm(), 1e-4 * (1 + v.norm()));
+  }
+
+  // Zero velocities give a zero velocity.
+  Vector zero (Vector::Zero(6)), v;
+  Transform jaMfa (randomTransform()), jbMfb (randomTransform());
+  relativeVelocity (jaMfa, randomTransform(), jbMfb, zero, zero, v);
+  BOOST_CHECK (v.isZero());
+}
+
+BOOST_AUTO_TEST_CASE (measured_pose_without_history)
+{
+  MeasuredPose pose;
+  Transform wMc (randomTransform()), cMf (randomTransform());
+  // Without history, the delay is ignored and the current camera pose
+  // is used.
+  for (int delay = 0; delay < 3; ++delay) {
+    pose.record (10, Operand (randomTransform(), 10), NULL);
+    BOOST_CHECK (pose.compute (10, delay, Operand (wMc, 10),
+          Operand (cMf, 10), NULL)
+        .isApprox (wMc * cMf));
+  }
+}
+
+BOOST_AUTO_TEST_CASE (measured_pose_history)
+{
+  const int N = 10, T = 50;
+  std::vector<Transform, Eigen::aligned_allocator<Transform> > wMc (T);
+  for (int t = 0; t < T; ++t) wMc[t] = randomTransform();
+  const Transform cMf (randomTransform());
+
+  MeasuredPose pose;
+  pose.setHistorySize (N);
+  BOOST_CHECK_EQUAL (pose.historySize(), (std::size_t)N);
+  for (int t = 0; t < T; ++t) {
+    pose.record (t, Operand (wMc[t], t), NULL);
+    // A measurement up to N-1 ticks old uses the camera pose at the time
+    // of the measurement.
+    for (int delay = 0; delay < N; ++delay) {
+      const Transform& wMf = pose.compute (t, delay, Operand (wMc[t], t),
+          Operand (cMf, 0), NULL);
+      if (t - delay >= 0) {
+        BOOST_CHECK (pose.sample (t - delay) != NULL);
+        BOOST_CHECK (wMf.isApprox (wMc[t - delay] * cMf));
+      } else {
+        // Before the start of the history, the current pose is used.
+        BOOST_CHECK (pose.sample (t - delay) == NULL);
+        BOOST_CHECK (wMf.isApprox (wMc[t] * cMf));
+      }
+    }
+    // A measurement N ticks old or more was overwritten.
+    for (int delay = N; delay < N + 2; ++delay) {
+      BOOST_CHECK (pose.sample (t - delay) == NULL);
+      BOOST_CHECK (pose.compute (t, delay, Operand (wMc[t], t),
+            Operand (cMf, 0), NULL)
+          .isApprox (wMc[t] * cMf));
+    }
+  }
+
+  // A tick which was not recorded is not found.
+  pose.record (T + 1, Operand (wMc[0], T + 1), NULL);
+  BOOST_CHECK (pose.sample (T) == NULL);
+  BOOST_CHECK (pose.sample (T + 1) != NULL);
+}
+
+BOOST_AUTO_TEST_CASE (measured_pose_propagation)
+{
+  // Frame f is on a moving link k. The camera measures f at t - delay.
+  // The pose of f at time t is wMk(t) * kMf.
+  const int N = 10, T = 30, delay = 4;
+  std::vector<Transform, Eigen::aligned_allocator<Transform> > wMc (T), wMk (T);
+  const Transform kMf (randomTransform());
+
+  MeasuredPose pose;
+  pose.setHistorySize (N);
+  for (int t = 0; t < T; ++t) {
+    wMc[t] = randomTransform();
+    wMk[t] = randomTransform();
+    Operand wMk_t (wMk[t], t);
+    pose.record (t, Operand (wMc[t], t), &wMk_t);
+    if (t < delay) continue;
+    const Transform cMf (wMc[t-delay].inverse() * wMk[t-delay] * kMf);
+    BOOST_CHECK (pose.compute (t, delay, Operand (wMc[t], t),
+          Operand (cMf, t), &wMk_t)
+        .isApprox (wMk[t] * kMf));
+  }
+}
+
+BOOST_AUTO_TEST_CASE (last_operands)
+{
+  LastOperands<3> last;
+  int times[3] = { 0, 0, 0 };
+  // The first call is always a change.
+  BOOST_CHECK (last.changed (times));
+  BOOST_CHECK (!last.changed (times));
+  for (int i = 0; i < 3; ++i) {
+    times[i] = 5;
+    BOOST_CHECK (last.changed (times));
+    BOOST_CHECK (!last.changed (times));
+  }
+  // Going back in time is also a change.
+  times[1] = 4;
+  BOOST_CHECK (last.changed (times));
+  BOOST_CHECK (!last.changed (times));
+}
+
+BOOST_AUTO_TEST_CASE (measured_pose_hold)
+{
+  // A fixed camera, whose signal is constant, sees a measurement updated
+  // every 3 ticks.
+  MeasuredPose pose;
+  const Transform wMc (randomTransform());
+  Transform cMf (randomTransform());
+  int cMfTime = 0;
+  Transform wMf (wMc * cMf);
+  for (int t = 0; t < 30; ++t) {
+    if (t % 3 == 0) {
+      cMf = randomTransform();
+      cMfTime = t;
+      wMf = wMc * cMf;
+    }
+    BOOST_CHECK (pose.compute (t, 0, Operand (wMc, 0), Operand (cMf, cMfTime),
+          NULL).isApprox (wMf));
+  }
+
+  // The hold only depends on the times: a value modified without
+  // updating its time is not seen.
+  const Transform held (pose.compute (30, 0, Operand (wMc, 0),
+        Operand (cMf, cMfTime), NULL));
+  BOOST_CHECK (pose.compute (31, 0, Operand (wMc, 0),
+        Operand (randomTransform(), cMfTime), NULL).isApprox (held));
+  // A moving camera is an update.
+  const Transform wMc2 (randomTransform());
+  BOOST_CHECK (pose.compute (32, 0, Operand (wMc2, 32),
+        Operand (cMf, cMfTime), NULL).isApprox (wMc2 * cMf));
+
+  // With a history, the operand time of the camera is the one recorded.
+  pose.setHistorySize (5);
+  for (int t = 40; t < 50; ++t) {
+    pose.record (t, Operand (wMc, 0), NULL);
+    if (t < 42) continue;
+    BOOST_CHECK (pose.compute (t, 2, Operand (wMc, 0), Operand (cMf, 40),
+          NULL).isApprox (wMc * cMf));
+  }
+  BOOST_CHECK (pose.compute (50, 2, Operand (wMc, 0),
+        Operand (randomTransform(), 40), NULL).isApprox (wMc * cMf));
+}
@@ -0,0 +1,121 @@
+// Copyright 2018 CNRS - Airbus SAS
+// Author: Joseph Mirabel
+//
+// Redistribution and use in source and binary forms, with or without
+// modification, are permitted provided that the following conditions are
+// met:
+
+// 1. Redistributions of source code must retain the above copyright
+// notice, this list of conditions and the following disclaimer.
+
+// 2. Redistributions in binary form must reproduce the above copyright
+// notice, this list of conditions and the following disclaimer in the
+// documentation and/or other materials provided with the distribution.
+
+// THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+// "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+// LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+// A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+// HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+// SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+// LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+// DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+// THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+// (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+// OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#define BOOST_TEST_MODULE queue_underrun
+#include <vector>
+#include <boost/test/included/unit_test.hpp>
+
+#include "queue-underrun.hh"
+
+using dynamicgraph::agimus::condition::QueueUnderrun;
+
+/// Queues which lose one value per iteration.
+struct Queues {
+  std::vector<int> sizes;
+  int calls;
+
+  Queues (const int& s0, const int& s1) : calls (0)
+  {
+    sizes.push_back (s0);
+    sizes.push_back (s1);
+  }
+
+  void pop ()
+  {
+    for (std::size_t i = 0; i < sizes.size(); ++i)
+      if (sizes[i] > 0) --sizes[i];
+  }
+};
+
+struct QueueSize {
+  Queues* queues;
+  std::size_t operator() (const std::size_t& i) const
+  {
+    ++queues->calls;
+    return queues->sizes[i];
+  }
+};
+
+/// Read the queues from start to end, as the control loop does, and
+/// return the time of the underrun.
+int read (QueueUnderrun& u, Queues& queues, const int& start, const int& end)
+{
+  QueueSize size = { &queues };
+  for (int t = start; t < end + 5; ++t) {
+    queues.pop();
+    u.compute (t, start, end, queues.sizes.size(), size);
+  }
+  return u.time();
+}
+
+BOOST_AUTO_TEST_CASE (disarmed)
+{
+  QueueUnderrun u;
+  Queues queues (0, 0);
+  QueueSize size = { &queues };
+  for (int t = 0; t < 10; ++t)
+    BOOST_CHECK (!u.compute (t, -1, -1, queues.sizes.size(), size));
+  BOOST_CHECK_EQUAL (queues.calls, 0);
+  // Before start
+  for (int t = 0; t < 10; ++t)
+    BOOST_CHECK (!u.compute (t, 10, 20, queues.sizes.size(), size));
+  BOOST_CHECK_EQUAL (queues.calls, 0);
+}
+
+BOOST_AUTO_TEST_CASE (full_queues)
+{
+  // The queues contain one value per iteration from 10 to 20. They are
+  // empty after the last read, which is not an underrun.
+  for (int margin = 1; margin <= 2; ++margin) {
+    QueueUnderrun u;
+    u.setMargin (margin);
+    Queues queues (10, 10);
+    BOOST_CHECK_EQUAL (read (u, queues, 10, 20), -1);
+    BOOST_CHECK_EQUAL (u.queue(), -1);
+  }
+  // Without margin, the last read is reported.
+  QueueUnderrun u;
+  Queues queues (10, 10);
+  BOOST_CHECK_EQUAL (read (u, queues, 10, 20), 19);
+}
+
+BOOST_AUTO_TEST_CASE (underrun)
+{
+  QueueUnderrun u;
+  u.setMargin (2);
+  Queues queues (10, 5);
+  BOOST_CHECK_EQUAL (read (u, queues, 10, 20), 14);
+  BOOST_CHECK_EQUAL (u.queue(), 1);
+  // The underrun is kept until the queues are read again.
+  QueueSize size = { &queues };
+  const int calls = queues.calls;
+  BOOST_CHECK (u.compute (30, 10, 20, queues.sizes.size(), size));
+  BOOST_CHECK_EQUAL (queues.calls, calls);
+
+  queues.sizes[0] = queues.sizes[1] = 10;
+  BOOST_CHECK_EQUAL (read (u, queues, 40, 50), -1);
+  BOOST_CHECK_EQUAL (u.queue(), -1);
+}
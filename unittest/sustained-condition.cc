@@ -0,0 +1,99 @@
+// Copyright 2018 CNRS - Airbus SAS
+// Author: Joseph Mirabel
+//
+// Redistribution and use in source and binary forms, with or without
+// modification, are permitted provided that the following conditions are
+// met:
+
+// 1. Redistributions of source code must retain the above copyright
+// notice, this list of conditions and the following disclaimer.
+
+// 2. Redistributions in binary form must reproduce the above copyright
+// notice, this list of conditions and the following disclaimer in the
+// documentation and/or other materials provided with the distribution.
+
+// THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+// "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+// LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+// A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+// HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+// SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+// LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+// DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+// THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+// (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+// OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+#define BOOST_TEST_MODULE sustained_condition
+#include <boost/test/included/unit_test.hpp>
+
+#include "sustained-condition.hh"
+
+using dynamicgraph::agimus::condition::Sustained;
+
+/// Value of the sustained condition after the condition held during n
+/// iterations, starting at time t0.
+bool holdDuring (Sustained& s, const int& t0, const int& n)
+{
+  bool res = false;
+  for (int t = t0; t < t0 + n; ++t) res = s.compute (true, t);
+  return res;
+}
+
+BOOST_AUTO_TEST_CASE (duration)
+{
+  const int N = 5;
+  for (int n = N - 1; n <= N + 1; ++n) {
+    Sustained s;
+    s.setDuration (N);
+    BOOST_CHECK_EQUAL (holdDuring (s, 10, n), n >= N);
+  }
+}
+
+BOOST_AUTO_TEST_CASE (first_iterations)
+{
+  const int N = 3;
+  Sustained s;
+  s.setDuration (N);
+  for (int t = 0; t < N - 1; ++t) BOOST_CHECK (!s.compute (true, t));
+  BOOST_CHECK (s.compute (true, N - 1));
+  BOOST_CHECK (s.compute (true, N));
+}
+
+BOOST_AUTO_TEST_CASE (short_duration)
+{
+  for (int N = 0; N <= 1; ++N) {
+    Sustained s;
+    s.setDuration (N);
+    BOOST_CHECK ( s.compute (true , 0));
+    BOOST_CHECK (!s.compute (false, 1));
+    BOOST_CHECK ( s.compute (true , 2));
+  }
+}
+
+BOOST_AUTO_TEST_CASE (interruption)
+{
+  const int N = 5;
+  Sustained s;
+  s.setDuration (N);
+  BOOST_CHECK (!holdDuring (s, 0, N - 1));
+  BOOST_CHECK (!s.compute (false, N - 1));
+  // The count restarts.
+  BOOST_CHECK (!holdDuring (s, N, N - 1));
+  BOOST_CHECK (s.compute (true, 2 * N - 1));
+  BOOST_CHECK (!s.compute (false, 2 * N));
+}
+
+BOOST_AUTO_TEST_CASE (gap)
+{
+  const int N = 5;
+  Sustained s;
+  s.setDuration (N);
+  BOOST_CHECK (!holdDuring (s, 0, N - 1));
+  // The condition is not computed at time N - 1: the count restarts.
+  BOOST_CHECK (!holdDuring (s, N, N - 1));
+  BOOST_CHECK (s.compute (true, 2 * N - 1));
+  // Same after the condition held.
+  BOOST_CHECK (!s.compute (true, 2 * N + 1));
+  BOOST_CHECK (holdDuring (s, 2 * N + 2, N - 1));
+}